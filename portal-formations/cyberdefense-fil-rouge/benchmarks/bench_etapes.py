@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Banc d'essai des solutions : durée et mémoire maximale de chaque étape.
+
+Chaque scénario lance ``solutions/solution_etapeN.py`` (avec ses options)
+dans un dossier temporaire contenant ``data/auth.log``, comme un élève le
+ferait, et mesure :
+- la durée (horloge murale) de chaque répétition ;
+- le pic de mémoire résidente du processus (``ru_maxrss`` via ``os.wait4``).
+
+L'étape 6 ne s'arrête jamais seule : elle est interrompue (Ctrl+C) dès que
+son point de reprise atteint la fin du journal, ce qui mesure le temps de
+rattrapage d'un journal existant.
+
+Les fichiers produits (alertes, index, point de reprise) sont effacés avant
+chaque scénario : la première répétition est « à froid », les suivantes
+profitent de l'index ou du cache disque. Les résultats peuvent être
+enregistrés en JSON (``--json``) et comparés à un relevé précédent
+(``--comparer``).
+
+Usage (depuis le dossier cyberdefense-fil-rouge/) :
+  python benchmarks/bench_etapes.py --lignes 1000000
+  python benchmarks/bench_etapes.py --journal data/auth.log --etapes "7" "7 --processus 0" "7 --index"
+  python benchmarks/bench_etapes.py --lignes 10000000 --json apres.json --comparer avant.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SOLUTIONS = os.path.join(RACINE, "solutions")
+GENERATEUR = os.path.join(RACINE, "generate_auth_log.py")
+
+SCENARIOS = [
+    "1",
+    "2",
+    "3",
+    "4",
+    "4 --processus 0",
+    "5",
+    "5 --processus 0",
+    "6",
+    "7",
+    "7 --processus 0",
+    "7 --index",
+]
+POINT_REPRISE_ETAPE6 = os.path.join("data", ".auth.log.position")
+SCRUTATION = 0.01  # secondes, attente de la fin des processus
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--lignes", type=int, default=1_000_000, help="Taille du journal généré")
+    p.add_argument("--journal", type=str, default=None, help="Utiliser un journal existant au lieu d'en générer un")
+    p.add_argument("--seed", type=int, default=42, help="Graine du journal généré")
+    p.add_argument("--etapes", nargs="+", default=SCENARIOS, help='Scénarios : numéro d\'étape et options, ex. "7 --index"')
+    p.add_argument("--repetitions", type=int, default=1, help="Lancements par scénario")
+    p.add_argument("--delai-max", type=float, default=3600, help="Abandon d'un scénario au-delà de N secondes")
+    p.add_argument("--json", type=str, default=None, help="Enregistrer les résultats dans ce fichier")
+    p.add_argument("--comparer", type=str, default=None, help="Relevé JSON de référence à comparer")
+    return p.parse_args()
+
+
+def compter_lignes(chemin):
+    nombre = 0
+    with open(chemin, "rb") as fichier:
+        for bloc in iter(lambda: fichier.read(1 << 20), b""):
+            nombre += bloc.count(b"\n")
+    return nombre
+
+
+def preparer_dossier(dossier, args):
+    """Crée ``dossier/data/auth.log`` (généré, ou lien vers --journal)."""
+    os.makedirs(os.path.join(dossier, "data"))
+    journal = os.path.join(dossier, "data", "auth.log")
+    if args.journal:
+        os.symlink(os.path.abspath(args.journal), journal)
+    else:
+        print(f"🛠️  Génération d'un journal de {args.lignes:,} lignes...")
+        subprocess.run(
+            [sys.executable, GENERATEUR, "--lines", str(args.lignes), "--out", journal,
+             "--seed", str(args.seed), "--progress-every", "0"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+    return journal
+
+
+def nettoyer(dossier):
+    """Efface tout ce que les solutions ont produit, sauf le journal."""
+    for nom in os.listdir(dossier):
+        if nom != "data":
+            chemin = os.path.join(dossier, nom)
+            shutil.rmtree(chemin) if os.path.isdir(chemin) else os.remove(chemin)
+    data = os.path.join(dossier, "data")
+    for nom in os.listdir(data):
+        if nom != "auth.log":
+            chemin = os.path.join(data, nom)
+            shutil.rmtree(chemin) if os.path.isdir(chemin) else os.remove(chemin)
+
+
+def _recolter(pid, echeance, fin_atteinte=None):
+    """
+    Attend la fin du processus sans ``Popen.wait`` (qui le récolterait avant
+    nous) ; renvoie (statut, ressources) de ``os.wait4``. ``fin_atteinte()``
+    vraie => Ctrl+C ; échéance dépassée => arrêt forcé.
+    """
+    interrompu = False
+    while True:
+        fini, statut, ressources = os.wait4(pid, os.WNOHANG)
+        if fini:
+            return statut, ressources
+        if time.monotonic() > echeance:
+            os.kill(pid, signal.SIGKILL)
+            return os.wait4(pid, 0)[1:]
+        if fin_atteinte is not None and not interrompu and fin_atteinte():
+            os.kill(pid, signal.SIGINT)
+            interrompu = True
+        time.sleep(SCRUTATION)
+
+
+def _rattrapage(dossier, taille):
+    """Étape 6 : vrai quand le point de reprise atteint ``taille`` octets."""
+    chemin = os.path.join(dossier, POINT_REPRISE_ETAPE6)
+
+    def atteint():
+        try:
+            with open(chemin, "r", encoding="utf-8") as fichier:
+                return json.load(fichier).get("position", 0) >= taille
+        except (FileNotFoundError, ValueError):
+            return False
+
+    return atteint
+
+
+def lancer(scenario, dossier, journal, delai_max):
+    """Lance un scénario ; renvoie (durée en s, pic mémoire en Mo, code de retour, stderr)."""
+    etape, *options = shlex.split(scenario)
+    commande = [sys.executable, os.path.join(SOLUTIONS, f"solution_etape{etape}.py"), *options]
+    if etape == "6":
+        # Sans point de reprise, l'étape 6 relit tout le journal
+        nettoyer(dossier)
+    with tempfile.TemporaryFile() as erreurs:
+        debut = time.perf_counter()
+        processus = subprocess.Popen(commande, cwd=dossier, stdout=subprocess.DEVNULL, stderr=erreurs)
+        fin_atteinte = None
+        if etape == "6":
+            fin_atteinte = _rattrapage(dossier, os.path.getsize(journal))
+        # wait4 plutôt que wait : il renvoie aussi les ressources du processus
+        statut, ressources = _recolter(processus.pid, time.monotonic() + delai_max, fin_atteinte)
+        duree = time.perf_counter() - debut
+        processus.returncode = os.waitstatus_to_exitcode(statut)
+        erreurs.seek(0)
+        message = erreurs.read().decode("utf-8", errors="replace").strip()
+
+    # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+    memoire = ressources.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return duree, memoire, processus.returncode, message
+
+
+def charger_reference(chemin):
+    if not chemin:
+        return {}
+    with open(chemin, "r", encoding="utf-8") as fichier:
+        releve = json.load(fichier)
+    # Comparaison en lignes/s : les deux relevés peuvent porter sur des journaux de tailles différentes
+    return {r["scenario"]: releve["lignes"] / min(r["durees"]) for r in releve["resultats"] if r["code_retour"] == 0}
+
+
+def afficher(resultats, lignes, reference):
+    entete = f"{'Scénario':<20} {'1er (s)':>9} {'meilleur (s)':>13} {'lignes/s':>12} {'Mo max':>8}"
+    if reference:
+        entete += f" {'vs réf.':>8}"
+    print("\n" + entete)
+    print("─" * len(entete))
+    for resultat in resultats:
+        if resultat["code_retour"] != 0:
+            print(f"{resultat['scenario']:<20} ❌ échec (code {resultat['code_retour']}) : {resultat['erreur'][-200:]}")
+            continue
+        meilleure = min(resultat["durees"])
+        debit = lignes / meilleure if meilleure else float("inf")
+        ligne = (f"{resultat['scenario']:<20} {resultat['durees'][0]:>9.2f} {meilleure:>13.2f} "
+                 f"{debit:>12,.0f} {resultat['memoire_max_mo']:>8.1f}")
+        debit_reference = reference.get(resultat["scenario"])
+        if debit_reference:
+            ligne += f" {debit / debit_reference:>7.2f}x"
+        print(ligne)
+
+
+def main():
+    args = parse_args()
+    reference = charger_reference(args.comparer)
+    dossier = tempfile.mkdtemp(prefix="bench_etapes_")
+    try:
+        journal = preparer_dossier(dossier, args)
+        lignes = compter_lignes(journal)
+        taille = os.path.getsize(journal)
+        print(f"⏱️  {len(args.etapes)} scénario(s) sur {lignes:,} lignes ({taille / 1e6:,.1f} Mo)")
+
+        resultats = []
+        for scenario in args.etapes:
+            nettoyer(dossier)
+            resultat = {"scenario": scenario, "durees": [], "memoire_max_mo": 0.0, "code_retour": 0, "erreur": ""}
+            for _ in range(args.repetitions):
+                duree, memoire, code, erreur = lancer(scenario, dossier, journal, args.delai_max)
+                resultat["durees"].append(round(duree, 3))
+                resultat["memoire_max_mo"] = max(resultat["memoire_max_mo"], round(memoire, 1))
+                # L'étape 6 s'arrête sur Ctrl+C : son code de retour est normal
+                if code != 0:
+                    resultat["code_retour"], resultat["erreur"] = code, erreur
+                    break
+            print(f"  {scenario:<20} {min(resultat['durees']):.2f} s")
+            resultats.append(resultat)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+    afficher(resultats, lignes, reference)
+
+    if args.json:
+        releve = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)",
+            "lignes": lignes,
+            "octets": taille,
+            "seed": None if args.journal else args.seed,
+            "resultats": resultats,
+        }
+        with open(args.json, "w", encoding="utf-8") as fichier:
+            json.dump(releve, fichier, indent=2, ensure_ascii=False)
+        print(f"\n💾 Résultats enregistrés dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark du découpage des lignes de log : lignes/seconde avant/après.
+
+- avant : extraire_date / extraire_heure / extraire_ip / extraire_user
+          (chaque fonction redécoupe la ligne) + test "STATUS=FAIL" in ligne
+- après : analyser_ligne (un seul découpage, Evenement à __slots__)
+
+Avec --horodatages, mesure le décodage des dates en secondes epoch :
+- avant : datetime.fromisoformat
+- après : decoder_horodatage (jour et seconde du jour mémorisés)
+- lot   : colonnes.decoder_horodatages (NumPy, datetime64), si NumPy est installé
+
+Usage (depuis le dossier cyberdefense-fil-rouge/) :
+  python benchmarks/bench_parseur.py --lignes 5000000
+  python benchmarks/bench_parseur.py --fichier data/auth.log
+  python benchmarks/bench_parseur.py --fichier data/auth.log --horodatages
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "solutions"))
+
+from detection.extraction import (  # noqa: E402
+    analyser_ligne,
+    decoder_horodatage,
+    extraire_date,
+    extraire_heure,
+    extraire_ip,
+    extraire_user,
+)
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--lignes", type=int, default=5_000_000, help="Nombre de lignes synthétiques à analyser")
+    p.add_argument("--fichier", type=str, default=None, help="Mesurer sur un vrai fichier de log")
+    p.add_argument("--seed", type=int, default=42, help="Graine du générateur de lignes")
+    p.add_argument("--taille-bloc", type=int, default=100_000, help="Lignes chronométrées par bloc")
+    p.add_argument("--horodatages", action="store_true", help="Mesurer le décodage des dates au lieu du découpage")
+    return p.parse_args()
+
+
+def blocs_synthetiques(nombre, seed, taille_bloc):
+    """Produit ``nombre`` lignes au format auth.log, par blocs (un lot de lignes distinctes réutilisé)."""
+    rng = random.Random(seed)
+    users = ["admin", "alice", "bob", "root", "charlie", "guest"]
+    lot = []
+    for _ in range(min(nombre, taille_bloc)):
+        ligne = (
+            f"2026-01-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:"
+            f"{rng.randint(0, 59):02d} IP=10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)} "
+            f"STATUS={'FAIL' if rng.random() < 0.3 else 'SUCCESS'} USER={rng.choice(users)}"
+        )
+        lot.append(ligne)
+    restant = nombre
+    while restant > 0:
+        yield lot[:restant]
+        restant -= len(lot)
+
+
+def blocs_fichier(chemin, taille_bloc):
+    """Lit le fichier par blocs de lignes : la lecture n'est pas chronométrée."""
+    with open(chemin, "r") as fichier:
+        while True:
+            bloc = [ligne.strip() for ligne in itertools.islice(fichier, taille_bloc)]
+            if not bloc:
+                return
+            yield bloc
+
+
+def avant(bloc):
+    for ligne in bloc:
+        extraire_date(ligne)
+        extraire_heure(ligne)
+        extraire_ip(ligne)
+        extraire_user(ligne)
+        "STATUS=FAIL" in ligne
+
+
+def apres(bloc):
+    for numero, ligne in enumerate(bloc):
+        analyser_ligne(ligne, numero)
+
+
+def dates_avant(bloc):
+    for ligne in bloc:
+        try:
+            int(datetime.fromisoformat(ligne[:19]).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            pass
+
+
+def dates_apres(bloc):
+    for ligne in bloc:
+        decoder_horodatage(ligne[:19])
+
+
+def mesurer(nom, fonction, blocs):
+    """Chronomètre uniquement le découpage, bloc par bloc."""
+    duree = 0.0
+    nombre = 0
+    for bloc in blocs:
+        debut = time.perf_counter()
+        fonction(bloc)
+        duree += time.perf_counter() - debut
+        nombre += len(bloc)
+    debit = nombre / duree if duree else float("inf")
+    print(f"  {nom:<6} : {nombre:,} lignes en {duree:.2f} s → {debit:,.0f} lignes/s")
+    return debit
+
+
+def main():
+    args = parse_args()
+    if args.fichier:
+        blocs = lambda: blocs_fichier(args.fichier, args.taille_bloc)  # noqa: E731
+        print(f"⏱️  Découpage des lignes de {args.fichier}")
+    else:
+        blocs = lambda: blocs_synthetiques(args.lignes, args.seed, args.taille_bloc)  # noqa: E731
+        print(f"⏱️  Découpage de {args.lignes:,} lignes synthétiques")
+
+    if args.horodatages:
+        print("   (décodage des dates)")
+        debit_avant = mesurer("avant", dates_avant, blocs())
+        debit_apres = mesurer("après", dates_apres, blocs())
+        try:
+            from detection.colonnes import decoder_horodatages
+        except ImportError:
+            decoder_horodatages = None
+        if decoder_horodatages is not None:
+            mesurer("lot", lambda bloc: decoder_horodatages([ligne[:19] for ligne in bloc]), blocs())
+    else:
+        debit_avant = mesurer("avant", avant, blocs())
+        debit_apres = mesurer("après", apres, blocs())
+    print(f"\n📈 Accélération : x{debit_apres / debit_avant:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Génère un faux journal d'authentification (de 1 million à 1 milliard de lignes)
+sans tout garder en mémoire, au format lu par les étapes du fil rouge :
+
+  2026-01-10 09:12:45 sshd[4242]: USER=alice IP=10.12.3.4 STATUS=SUCCESS
+
+Le trafic normal est ponctué d'attaques injectées :
+- rafales de force brute (une IP, dizaines à centaines d'échecs consécutifs) ;
+- connexions hors heures (08h-18h) depuis des IP inhabituelles ;
+- tentatives ciblant le compte admin.
+
+Mêmes paramètres (dont --seed) => même fichier, octet pour octet.
+
+Usage :
+  python generate_auth_log.py --lines 1000000 --out data/auth.log --seed 42
+  python generate_auth_log.py --lines 100000000 --out data/auth_100M.log --bursts 5000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+USERS_CONNUS = ["alice", "bob", "charlie", "diane", "eric", "fatou", "gael", "hugo", "ines", "jules"]
+USERS_ATTAQUES = ["admin", "root", "test", "oracle", "postgres", "ubuntu", "guest", "user"]
+HEURE_DEBUT = 8
+HEURE_FIN = 18
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--lines", type=int, default=1_000_000, help="Nombre de lignes à générer")
+    p.add_argument("--out", type=str, default="data/auth.log", help="Fichier de sortie")
+    p.add_argument("--seed", type=int, default=42, help="Graine pour la reproductibilité")
+    p.add_argument("--start-date", type=str, default="2026-01-01", help="Date de début (YYYY-MM-DD)")
+    p.add_argument("--days-span", type=int, default=30, help="Nombre de jours couverts par le journal")
+    p.add_argument("--users", type=int, default=2_000, help="Nombre d'utilisateurs légitimes")
+    p.add_argument("--ips", type=int, default=5_000, help="Nombre d'IP légitimes")
+    p.add_argument("--bursts", type=int, default=None, help="Rafales de force brute (défaut : 1 pour 10 000 lignes)")
+    p.add_argument("--fail-rate", type=float, default=0.03, help="Taux d'échecs du trafic normal (fautes de frappe)")
+    p.add_argument("--off-hours-rate", type=float, default=0.002, help="Part de connexions hors heures suspectes")
+    p.add_argument("--admin-rate", type=float, default=0.001, help="Part de tentatives sur le compte admin")
+    p.add_argument("--block-size", type=int, default=100_000, help="Lignes écrites par bloc")
+    p.add_argument("--progress-every", type=int, default=10_000_000, help="Afficher la progression toutes les N lignes")
+    return p.parse_args()
+
+
+def ip_externe(rng):
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+class Horloge:
+    """Ligne i -> "YYYY-MM-DD HH:MM:SS", croissant ; une seule mise en forme par seconde."""
+
+    def __init__(self, debut, duree, total):
+        self.debut = debut
+        self.duree = duree
+        self.total = max(total, 1)
+        self._seconde = None
+        self._texte = None
+
+    def epoch(self, i):
+        return self.debut + (i * self.duree) // self.total
+
+    def texte(self, i):
+        seconde = self.epoch(i)
+        if seconde != self._seconde:
+            self._seconde = seconde
+            self._texte = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconde))
+        return self._texte
+
+
+def lignes_normales(rng, horloge, debut, fin, users, ips, args):
+    """Trafic ordinaire des lignes [debut, fin[, avec quelques anomalies ponctuelles."""
+    n = fin - debut
+    choix_users = rng.choices(users, k=n)
+    choix_ips = rng.choices(ips, k=n)
+    tirages = [rng.random() for _ in range(n)]
+    pids = [rng.randint(1000, 65000) for _ in range(n)]
+    seuil_admin = args.admin_rate
+    seuil_nuit = seuil_admin + args.off_hours_rate
+    seuil_echec = seuil_nuit + args.fail_rate
+
+    lignes = []
+    for k in range(n):
+        i = debut + k
+        horodatage = horloge.texte(i)
+        user, ip, statut = choix_users[k], choix_ips[k], "SUCCESS"
+        tirage = tirages[k]
+        if tirage < seuil_admin:
+            # Tentative sur le compte admin depuis l'extérieur
+            user, ip, statut = "admin", ip_externe(rng), "FAIL" if rng.random() < 0.8 else "SUCCESS"
+        elif tirage < seuil_nuit:
+            heure = int(horodatage[11:13])
+            if heure < HEURE_DEBUT or heure >= HEURE_FIN:
+                # Connexion nocturne réussie depuis une IP jamais vue
+                ip = ip_externe(rng)
+        elif tirage < seuil_echec:
+            statut = "FAIL"
+        lignes.append(f"{horodatage} sshd[{pids[k]}]: USER={user} IP={ip} STATUS={statut}\n")
+    return lignes
+
+
+def lignes_rafale(rng, horloge, debut, fin):
+    """Force brute : une IP, des échecs en série sur des comptes courants."""
+    ip = ip_externe(rng)
+    pid = rng.randint(1000, 65000)
+    cibles = rng.sample(USERS_ATTAQUES, k=rng.randint(1, 3))
+    lignes = []
+    for i in range(debut, fin):
+        user = rng.choice(cibles)
+        statut = "SUCCESS" if i == fin - 1 and rng.random() < 0.05 else "FAIL"
+        lignes.append(f"{horloge.texte(i)} sshd[{pid}]: USER={user} IP={ip} STATUS={statut}\n")
+    return lignes
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    debut = int(datetime.strptime(args.start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    horloge = Horloge(debut, args.days_span * 86400, args.lines)
+
+    users = USERS_CONNUS + [f"user{i:05d}" for i in range(max(args.users - len(USERS_CONNUS), 0))]
+    ips = [f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(args.ips)]
+
+    nombre_rafales = args.bursts if args.bursts is not None else args.lines // 10_000
+    debuts_rafales = sorted(rng.sample(range(args.lines), k=min(nombre_rafales, args.lines)))
+
+    ecrites = 0
+    rafales = 0
+    prochain_affichage = args.progress_every
+    with open(args.out, "w", encoding="utf-8", newline="\n") as f:
+        i = 0
+        for debut_rafale in debuts_rafales + [args.lines]:
+            # Trafic normal jusqu'à la prochaine rafale, par blocs
+            while i < min(debut_rafale, args.lines):
+                fin = min(i + args.block_size, debut_rafale)
+                f.writelines(lignes_normales(rng, horloge, i, fin, users, ips, args))
+                ecrites += fin - i
+                i = fin
+            if debut_rafale >= args.lines or debut_rafale < i:
+                continue  # tombe dans la rafale précédente : ignorée
+            fin = min(i + rng.randint(20, 300), args.lines)
+            f.writelines(lignes_rafale(rng, horloge, i, fin))
+            ecrites += fin - i
+            rafales += 1
+            i = fin
+
+            if args.progress_every and ecrites >= prochain_affichage:
+                print(f"{ecrites:,} / {args.lines:,} lignes générées...")
+                prochain_affichage += args.progress_every
+
+    ignorees = len(debuts_rafales) - rafales
+    detail = f", {ignorees:,} chevauchant la précédente ignorées" if ignorees else ""
+    print(f"✅ Terminé : {args.out} ({args.lines:,} lignes, {rafales:,} rafales{detail})")
+
+
+if __name__ == "__main__":
+    main()
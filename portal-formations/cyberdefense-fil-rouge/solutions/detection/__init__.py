@@ -0,0 +1,7 @@
+"""
+Briques partagées par les solutions du fil rouge cyberdéfense.
+
+Les scripts ``solutions/solution_etapeN.py`` importent ce paquet : quand on
+lance ``python solutions/solution_etape4.py``, le dossier ``solutions/`` est
+sur ``sys.path`` et ``import detection`` fonctionne sans installation.
+"""
@@ -0,0 +1,84 @@
+"""
+Adresses IP sous forme d'entiers, agrégation par sous-réseau et Top-K.
+
+Un entier Python occupe moins de mémoire qu'une chaîne comme
+``"192.168.1.10"`` et se hache plus vite. Encodage des clés :
+
+- IPv4 : l'entier 32 bits de l'adresse ;
+- IPv6 : l'entier 128 bits, avec le bit 128 levé pour ne jamais se
+  confondre avec une IPv4 ;
+- texte non canonique ou invalide (``010.0.0.1``, ``2001:0db8::1``...) :
+  la chaîne est gardée telle quelle, pour que le rapport affiche exactement
+  ce qui était dans le journal.
+"""
+
+import heapq
+import socket
+from operator import itemgetter
+
+DRAPEAU_IPV6 = 1 << 128
+MASQUE_IPV6 = DRAPEAU_IPV6 - 1
+
+
+def ip_vers_entier(ip):
+    """Clé entière de ``ip`` (voir l'encodage ci-dessus)."""
+    try:
+        if ":" not in ip:
+            # inet_pton est strict : pas de zéros en tête, exactement 4 octets
+            return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+        brut = socket.inet_pton(socket.AF_INET6, ip)
+    except OSError:
+        return ip
+    if socket.inet_ntop(socket.AF_INET6, brut) != ip:
+        return ip
+    return DRAPEAU_IPV6 | int.from_bytes(brut, "big")
+
+
+def entier_vers_ip(cle):
+    """Texte d'une clé produite par ``ip_vers_entier``."""
+    if isinstance(cle, str):
+        return cle
+    if cle & DRAPEAU_IPV6:
+        return socket.inet_ntop(socket.AF_INET6, (cle & MASQUE_IPV6).to_bytes(16, "big"))
+    return socket.inet_ntop(socket.AF_INET, cle.to_bytes(4, "big"))
+
+
+def reseau(cle, prefixe_v4=24, prefixe_v6=64):
+    """
+    Sous-réseau CIDR d'une clé, sous forme de texte (``"10.0.3.0/24"``).
+    Les clés texte (adresses non canoniques) restent leur propre groupe.
+    """
+    if isinstance(cle, str):
+        return cle
+    if cle & DRAPEAU_IPV6:
+        masque = (MASQUE_IPV6 >> (128 - prefixe_v6)) << (128 - prefixe_v6)
+        base = entier_vers_ip(DRAPEAU_IPV6 | (cle & masque))
+        return f"{base}/{prefixe_v6}"
+    masque = (0xFFFFFFFF >> (32 - prefixe_v4)) << (32 - prefixe_v4)
+    return f"{entier_vers_ip(cle & masque)}/{prefixe_v4}"
+
+
+def agreger_par_reseau(compteurs, prefixe_v4=24, prefixe_v6=64):
+    """
+    {clé IP: n} -> {sous-réseau: [n, nombre d'IP]}, dans l'ordre de première
+    apparition : une force brute distribuée sur un /24 y ressort d'un bloc.
+    """
+    par_reseau = {}
+    for cle, nombre in compteurs.items():
+        nom = reseau(cle, prefixe_v4, prefixe_v6)
+        total = par_reseau.get(nom)
+        if total is None:
+            par_reseau[nom] = [nombre, 1]
+        else:
+            total[0] += nombre
+            total[1] += 1
+    return par_reseau
+
+
+def top_k(compteurs, k, cle=itemgetter(1)):
+    """
+    Les ``k`` plus grands compteurs, par tas borné : O(n log k) au lieu de
+    trier tout le dictionnaire. Même résultat que
+    ``sorted(compteurs.items(), key=cle, reverse=True)[:k]``, ex-aequo compris.
+    """
+    return heapq.nlargest(k, compteurs.items(), key=cle)
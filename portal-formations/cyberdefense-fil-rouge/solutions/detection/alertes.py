@@ -0,0 +1,246 @@
+"""
+Écriture des alertes au fil de l'eau, à mémoire constante.
+
+- les alertes sont formatées puis écrites par paquets (tampon vidé toutes
+  les ``taille_tampon`` alertes ou ``delai_vidage`` secondes) ;
+- deux formats : ``texte`` (``[DATE] [NIVEAU] RAISON - DÉTAILS``, comme
+  l'étape 5) et ``jsonl`` (un objet JSON par ligne, pour un SIEM) ;
+- rotation par taille ou par durée : ``alertes.txt`` devient
+  ``alertes.txt.1`` (le précédent ``.1`` devient ``.2``, etc.). La rotation
+  a lieu à l'alerte suivante, jamais à la fermeture : le dernier fichier
+  n'est jamais vide. Au-delà de ``garder`` fichiers, le plus ancien est
+  supprimé ; les alertes ainsi perdues sont comptées dans ``effacees`` ;
+- fenêtre de suppression par (IP, règles) : la première alerte est écrite,
+  les suivantes pendant ``suppression`` secondes (heure des événements) sont
+  seulement comptées, puis résumées en une ligne à la fin de la fenêtre.
+  Les fenêtres se ferment quand l'heure des événements avance : les
+  alertes doivent arriver dans l'ordre chronologique (l'ordre du journal,
+  comme aux étapes 4 et 5). Une alerte plus ancienne qu'une fenêtre déjà
+  fermée est écrite telle quelle et comptée dans ``hors_ordre``.
+
+En texte, le nombre d'alertes d'un fichier n'est connu qu'à sa fermeture :
+il est écrit en pied de fichier (et non plus en en-tête), dans chaque
+fichier, rotations comprises.
+
+    with EcrivainAlertes("alertes.txt", suppression=300) as ecrivain:
+        for evenement, verdict in evaluer_par_lots(jugements, moteur):
+            ecrivain.ecrire(evenement, verdict)
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+FORMATS = ("texte", "jsonl")
+TAILLE_TAMPON = 1_000     # alertes
+DELAI_VIDAGE = 1.0        # secondes
+FICHIERS_GARDES = 5       # alertes.txt.1 ... alertes.txt.5
+MAX_CLES_SUPPRESSION = 100_000
+
+
+def generer_alerte(date, niveau, raison, details):
+    """Formate une alerte selon le format demandé."""
+    return f"[{date}] [{niveau}] {raison} - {details}"
+
+
+def _date(horodatage):
+    return datetime.fromtimestamp(horodatage, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class _Fenetre:
+    """Fenêtre de suppression ouverte par la première alerte d'une clé (IP, règles)."""
+
+    __slots__ = ("debut", "supprimees", "derniere", "verdict")
+
+    def __init__(self, debut, verdict):
+        self.debut = debut
+        self.supprimees = 0
+        self.derniere = None
+        self.verdict = verdict
+
+
+class EcrivainAlertes:
+    """Écrit les alertes en flux ; ``suppression`` = 0 désactive la déduplication."""
+
+    def __init__(self, chemin, format="texte", suppression=0, taille_max=None, duree_max=None,
+                 garder=FICHIERS_GARDES, taille_tampon=TAILLE_TAMPON, delai_vidage=DELAI_VIDAGE,
+                 max_cles=MAX_CLES_SUPPRESSION):
+        if format not in FORMATS:
+            raise ValueError(f"Format inconnu : {format} (attendu : {', '.join(FORMATS)})")
+        self.chemin = chemin
+        self.format = format
+        self.suppression = suppression
+        self.taille_max = taille_max
+        self.duree_max = duree_max
+        self.garder = garder
+        self.taille_tampon = taille_tampon
+        self.delai_vidage = delai_vidage
+        self.max_cles = max_cles
+
+        self.ecrites = 0
+        self.supprimees = 0
+        self.hors_ordre = 0
+        self.effacees = 0
+        # Alertes écrites dans chaque fichier tourné par cet écrivain (.1 d'abord)
+        self._par_fichier = deque()
+        self._a_tourner = False
+        # Alertes du fichier en cours (pied de fichier)
+        self._ecrites_fichier = 0
+        self._supprimees_fichier = 0
+        # (ip, règles) -> _Fenetre, de la plus ancienne à la plus récente
+        self._fenetres = OrderedDict()
+        self._maintenant = None
+        self._tampon = []
+        self._fichier = None
+        self._ouvert_le = None
+        self._vide_le = time.monotonic()
+        self._ouvrir()
+
+    # --- fichier ---------------------------------------------------------
+
+    def _ouvrir(self):
+        self._fichier = open(self.chemin, "w", encoding="utf-8")
+        self._ouvert_le = time.monotonic()
+        self._ecrites_fichier = self._supprimees_fichier = 0
+        if self.format == "texte":
+            self._fichier.write("=" * 60 + "\n")
+            self._fichier.write("RAPPORT D'ALERTES DE SÉCURITÉ\n")
+            self._fichier.write("=" * 60 + "\n\n")
+
+    def _pied(self):
+        if self.format == "texte":
+            self._fichier.write("\n" + "=" * 60 + "\n")
+            self._fichier.write(f"Nombre total d'alertes : {self._ecrites_fichier}\n")
+            if self._supprimees_fichier:
+                self._fichier.write(f"Alertes similaires supprimées : {self._supprimees_fichier}\n")
+
+    def _tourner(self):
+        """alertes.txt -> alertes.txt.1 -> ... -> alertes.txt.<garder> (le plus ancien est supprimé)."""
+        self._a_tourner = False
+        self._pied()
+        self._fichier.close()
+        for numero in range(self.garder - 1, 0, -1):
+            ancien = f"{self.chemin}.{numero}"
+            if os.path.exists(ancien):
+                os.replace(ancien, f"{self.chemin}.{numero + 1}")
+        self._par_fichier.appendleft(self._ecrites_fichier)
+        if self.garder > 0:
+            os.replace(self.chemin, f"{self.chemin}.1")
+        while len(self._par_fichier) > self.garder:
+            self.effacees += self._par_fichier.pop()
+        self._ouvrir()
+
+    def _ecrire_tampon(self):
+        if self._tampon:
+            self._fichier.write("".join(self._tampon))
+            self._fichier.flush()
+            self._tampon.clear()
+        self._vide_le = time.monotonic()
+
+    def vider(self):
+        """Écrit le tampon ; si une limite est atteinte, le fichier tournera à l'alerte suivante."""
+        self._ecrire_tampon()
+        trop_gros = self.taille_max is not None and self._fichier.tell() >= self.taille_max
+        trop_vieux = self.duree_max is not None and self._vide_le - self._ouvert_le >= self.duree_max
+        if trop_gros or trop_vieux:
+            self._a_tourner = True
+
+    def fermer(self):
+        """Résume les fenêtres encore ouvertes, écrit le tampon et le pied, sans rotation."""
+        for cle in list(self._fenetres):
+            self._clore(cle)
+        self._ecrire_tampon()
+        self._pied()
+        self._fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    # --- écriture --------------------------------------------------------
+
+    def _ajouter(self, texte):
+        if self._a_tourner:
+            self._tourner()
+        self._tampon.append(texte + "\n")
+        if len(self._tampon) >= self.taille_tampon or time.monotonic() - self._vide_le >= self.delai_vidage:
+            self.vider()
+
+    def _formater(self, evenement, verdict):
+        if self.format == "jsonl":
+            return json.dumps(
+                {"date": evenement.date, "niveau": verdict.niveau, "raison": verdict.raison,
+                 "regles": list(verdict.codes), "ip": evenement.ip, "user": evenement.user,
+                 "ligne": evenement.ligne},
+                ensure_ascii=False,
+            )
+        return generer_alerte(evenement.date, verdict.niveau, verdict.raison, evenement.ligne)
+
+    def _resumer(self, cle, fenetre):
+        ip, _ = cle
+        verdict = fenetre.verdict
+        debut = _date(fenetre.debut)
+        fin = fenetre.derniere.date
+        if self.format == "jsonl":
+            return json.dumps(
+                {"date": fin, "niveau": verdict.niveau, "raison": verdict.raison, "regles": list(verdict.codes),
+                 "ip": ip, "supprimees": fenetre.supprimees, "debut_fenetre": debut},
+                ensure_ascii=False,
+            )
+        details = f"{fenetre.supprimees} alertes similaires supprimées pour {ip} (fenêtre ouverte le {debut})"
+        return generer_alerte(fin, verdict.niveau, verdict.raison, details)
+
+    def _clore(self, cle):
+        fenetre = self._fenetres.pop(cle)
+        if fenetre.supprimees:
+            self._ajouter(self._resumer(cle, fenetre))
+
+    def _expirer(self):
+        """Ferme les fenêtres terminées (et les plus anciennes au-delà de ``max_cles``)."""
+        limite = self._maintenant - self.suppression
+        fenetres = self._fenetres
+        while fenetres:
+            cle, fenetre = next(iter(fenetres.items()))
+            if fenetre.debut > limite and len(fenetres) <= self.max_cles:
+                break
+            self._clore(cle)
+
+    def ecrire(self, evenement, verdict):
+        """Écrit (ou compte comme supprimée) une alerte ; renvoie True si elle est écrite."""
+        horodatage = evenement.horodatage if self.suppression and evenement.ip else None
+        if horodatage is None:
+            self._ecrire(evenement, verdict)
+            return True
+
+        if self._maintenant is None or horodatage > self._maintenant:
+            self._maintenant = horodatage
+            self._expirer()
+        elif horodatage <= self._maintenant - self.suppression:
+            # Sa fenêtre serait déjà fermée : écrite sans déduplication
+            self.hors_ordre += 1
+            self._ecrire(evenement, verdict)
+            return True
+        cle = (evenement.ip, verdict.codes)
+        fenetre = self._fenetres.get(cle)
+        if fenetre is not None and horodatage - fenetre.debut < self.suppression:
+            fenetre.supprimees += 1
+            fenetre.derniere = evenement
+            self.supprimees += 1
+            self._supprimees_fichier += 1
+            return False
+
+        if fenetre is not None:
+            self._clore(cle)
+        self._fenetres[cle] = _Fenetre(horodatage, verdict)
+        self._expirer()
+        self._ecrire(evenement, verdict)
+        return True
+
+    def _ecrire(self, evenement, verdict):
+        self._ajouter(self._formater(evenement, verdict))
+        self.ecrites += 1
+        self._ecrites_fichier += 1
@@ -0,0 +1,319 @@
+"""
+Index en colonnes du journal, sur disque, pour relancer les rapports sans reparser.
+
+Le journal est analysé une fois ; chaque champ devient une colonne binaire
+(une valeur par ligne) dans un dossier ``<journal>.index/`` :
+
+    ip.u32  user.u32  statut.u8  heure.u8  epoch.i64
+    ips.txt  users.txt  statuts.txt   (chaînes internées : id = n° de ligne)
+    meta.json                          (inode, octets indexés, nombre de lignes)
+
+À chaque mise à jour, seules les nouvelles lignes complètes sont analysées et
+ajoutées en fin de colonnes. Au chargement, les colonnes sont projetées en
+mémoire (``numpy.memmap``) et le rapport devient une suite d'opérations
+vectorisées (masques, ``np.unique``) au lieu d'une boucle Python par ligne.
+
+Les dates sont décodées par blocs (``decoder_horodatages``) : les chiffres
+de la disposition fixe ``AAAA-MM-JJ HH:MM:SS`` sont lus directement dans un
+tableau de caractères, sans boucle Python par ligne.
+
+``meta.json`` est écrit en dernier : après un arrêt brutal, les octets en trop
+dans les colonnes sont simplement tronqués à la mise à jour suivante.
+"""
+
+import json
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover - dépend de l'environnement
+    raise ImportError("L'index en colonnes nécessite NumPy : pip install numpy") from exc
+
+from .adresses import ip_vers_entier
+from .extraction import HEURE_DEBUT, HEURE_FIN, SEUIL_ECHECS, analyser_ligne, decoder_horodatage
+from .rapport import ActiviteSuspecte, EchecsExacts
+
+AUCUN = 0xFFFFFFFF   # id d'une IP / d'un utilisateur absent de la ligne
+HEURE_INCONNUE = 255
+STATUT_AUCUN = 255
+
+# nom de colonne -> (code array, dtype NumPy)
+COLONNES = {
+    "ip": ("I", np.uint32),
+    "user": ("I", np.uint32),
+    "statut": ("B", np.uint8),
+    "heure": ("B", np.uint8),
+    "epoch": ("q", np.int64),
+}
+DICTIONNAIRES = ("ips", "users", "statuts")
+# Positions des chiffres et des séparateurs dans "AAAA-MM-JJ HH:MM:SS"
+POSITIONS_CHIFFRES = (0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18)
+SEPARATEURS = ((4, "-"), (7, "-"), (10, " "), (13, ":"), (16, ":"))
+LIGNES_PAR_BLOC = 1_000_000
+VERSION = 2  # 2 : heures hors de 0..23 rangées en HEURE_INCONNUE
+
+
+def dossier_index(journal):
+    return journal + ".index"
+
+
+def _lire_meta(dossier):
+    try:
+        with open(os.path.join(dossier, "meta.json"), "r", encoding="utf-8") as fichier:
+            meta = json.load(fichier)
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta if meta.get("version") == VERSION else None
+
+
+def _ecrire_meta(dossier, meta):
+    chemin = os.path.join(dossier, "meta.json")
+    with open(chemin + ".tmp", "w", encoding="utf-8") as fichier:
+        json.dump(meta, fichier)
+    os.replace(chemin + ".tmp", chemin)
+
+
+def _chemin_colonne(dossier, nom):
+    dtype = np.dtype(COLONNES[nom][1])
+    return os.path.join(dossier, f"{nom}.{dtype.kind}{dtype.itemsize * 8}")
+
+
+def _lire_dictionnaire(dossier, nom, taille):
+    chemin = os.path.join(dossier, f"{nom}.txt")
+    try:
+        with open(chemin, "r", encoding="utf-8") as fichier:
+            valeurs = fichier.read().split("\n")[:taille]
+    except FileNotFoundError:
+        valeurs = []
+    return valeurs
+
+
+def decoder_horodatages(dates):
+    """
+    Version par lot de ``extraction.decoder_horodatage`` : liste de dates
+    ``"AAAA-MM-JJ HH:MM:SS"`` -> tableau ``datetime64[s]`` (NaT si invalide).
+    Les rares dates écrites autrement passent par le décodeur ligne à ligne.
+    """
+    # Un caractère = un entier (UCS-4) ; la 20e colonne n'est nulle que pour 19 caractères au plus
+    codes = np.array(dates, dtype="U20").view(np.uint32).reshape(len(dates), 20)
+    chiffres = codes[:, POSITIONS_CHIFFRES].astype(np.int64) - ord("0")
+    valide = ((chiffres >= 0) & (chiffres <= 9)).all(axis=1) & (codes[:, 19] == 0)
+    for position, separateur in SEPARATEURS:
+        valide &= codes[:, position] == ord(separateur)
+    chiffres[~valide] = 0
+
+    def nombre(debut, fin):
+        valeur = chiffres[:, debut]
+        for colonne in range(debut + 1, fin):
+            valeur = valeur * 10 + chiffres[:, colonne]
+        return valeur
+
+    annee, mois, jour = nombre(0, 4), nombre(4, 6), nombre(6, 8)
+    heure, minute, seconde = nombre(8, 10), nombre(10, 12), nombre(12, 14)
+    valide &= (annee >= 1) & (mois >= 1) & (mois <= 12) & (jour >= 1)
+    valide &= (heure < 24) & (minute < 60) & (seconde < 60)
+    debut_mois = ((annee - 1970) * 12 + mois - 1).astype("datetime64[M]")
+    jours = debut_mois.astype("datetime64[D]") + (jour - 1)
+    valide &= jours.astype("datetime64[M]") == debut_mois  # pas de 30 février
+    horodatages = jours.astype("datetime64[s]") + (heure * 3600 + minute * 60 + seconde)
+    horodatages[~valide] = np.datetime64("NaT")
+
+    for i in np.flatnonzero(~valide).tolist():
+        horodatage = decoder_horodatage(dates[i])
+        if horodatage is not None:
+            horodatages[i] = np.datetime64(horodatage, "s")
+    return horodatages
+
+
+def _epoch(dates):
+    """Colonne ``epoch`` : secondes depuis l'epoch, -1 si la date est invalide."""
+    horodatages = decoder_horodatages(dates)
+    return np.where(np.isnat(horodatages), -1, horodatages.astype(np.int64))
+
+
+class _Interneur:
+    """Chaîne -> id, en ne gardant que les nouvelles chaînes à écrire."""
+
+    def __init__(self, valeurs):
+        self.ids = {valeur: i for i, valeur in enumerate(valeurs)}
+        self.nouvelles = []
+
+    def id(self, valeur):
+        if valeur is None:
+            return AUCUN
+        identifiant = self.ids.get(valeur)
+        if identifiant is None:
+            identifiant = self.ids[valeur] = len(self.ids)
+            self.nouvelles.append(valeur)
+        return identifiant
+
+
+def mettre_a_jour(journal, dossier=None):
+    """
+    Crée ou complète l'index de ``journal``. Renvoie le nombre de lignes ajoutées.
+
+    Seules les lignes terminées par un retour à la ligne sont indexées : une
+    ligne en cours d'écriture le sera à la mise à jour suivante.
+    """
+    dossier = dossier or dossier_index(journal)
+    os.makedirs(dossier, exist_ok=True)
+    infos = os.stat(journal)
+
+    meta = _lire_meta(dossier)
+    if meta is None or meta["inode"] != infos.st_ino or meta["position"] > infos.st_size:
+        # Nouveau journal (ou rotation / troncature) : on repart de zéro
+        meta = {"version": VERSION, "inode": infos.st_ino, "position": 0, "lignes": 0,
+                "ips": 0, "users": 0, "statuts": 0}
+
+    # Remettre colonnes et dictionnaires dans l'état décrit par meta.json
+    for nom, (_, dtype) in COLONNES.items():
+        chemin = _chemin_colonne(dossier, nom)
+        with open(chemin, "ab") as fichier:
+            fichier.truncate(meta["lignes"] * np.dtype(dtype).itemsize)
+    interneurs = {}
+    for nom in DICTIONNAIRES:
+        valeurs = _lire_dictionnaire(dossier, nom, meta[nom])
+        with open(os.path.join(dossier, f"{nom}.txt"), "w", encoding="utf-8") as fichier:
+            fichier.write("".join(v + "\n" for v in valeurs))
+        interneurs[nom] = _Interneur(valeurs)
+
+    ips, users, statuts = interneurs["ips"], interneurs["users"], interneurs["statuts"]
+    colonnes = {nom: array(code) for nom, (code, _) in COLONNES.items() if nom != "epoch"}
+    dates = []  # décodées par bloc dans la colonne epoch
+
+    def vider(position):
+        """Ajoute le bloc en cours aux fichiers, puis valide avec meta.json."""
+        for nom, valeurs in colonnes.items():
+            with open(_chemin_colonne(dossier, nom), "ab") as fichier:
+                valeurs.tofile(fichier)
+        with open(_chemin_colonne(dossier, "epoch"), "ab") as fichier:
+            _epoch(dates).astype(COLONNES["epoch"][1]).tofile(fichier)
+        for nom, interneur in interneurs.items():
+            with open(os.path.join(dossier, f"{nom}.txt"), "a", encoding="utf-8") as fichier:
+                fichier.write("".join(v + "\n" for v in interneur.nouvelles))
+            interneur.nouvelles.clear()
+            meta[nom] = len(interneur.ids)
+        meta["lignes"] += len(colonnes["ip"])
+        meta["position"] = position
+        _ecrire_meta(dossier, meta)
+        for valeurs in colonnes.values():
+            del valeurs[:]
+        dates.clear()
+
+    ajoutees = 0
+    position = meta["position"]
+    with open(journal, "rb") as fichier:
+        fichier.seek(position)
+        for brute in fichier:
+            if not brute.endswith(b"\n"):
+                break
+            evenement = analyser_ligne(brute.decode("utf-8", errors="replace").strip())
+            colonnes["ip"].append(ips.id(evenement.ip))
+            colonnes["user"].append(users.id(evenement.user))
+            statut = statuts.id(evenement.statut)
+            colonnes["statut"].append(STATUT_AUCUN if statut == AUCUN else statut)
+            heure = evenement.heure
+            colonnes["heure"].append(HEURE_INCONNUE if heure is None else heure)
+            dates.append(evenement.date)
+            position += len(brute)
+            ajoutees += 1
+            if len(colonnes["ip"]) >= LIGNES_PAR_BLOC:
+                vider(position)
+    vider(position)
+    return ajoutees
+
+
+class IndexColonnes:
+    """Colonnes de l'index projetées en mémoire (lecture seule)."""
+
+    def __init__(self, dossier):
+        meta = _lire_meta(dossier)
+        if meta is None:
+            raise FileNotFoundError(f"Pas d'index valide dans {dossier}")
+        self.meta = meta
+        self.lignes = meta["lignes"]
+        for nom, (_, dtype) in COLONNES.items():
+            if self.lignes:
+                colonne = np.memmap(_chemin_colonne(dossier, nom), dtype=dtype, mode="r", shape=(self.lignes,))
+            else:
+                colonne = np.empty(0, dtype=dtype)
+            setattr(self, nom, colonne)
+        self.ips = _lire_dictionnaire(dossier, "ips", meta["ips"])
+        self.users = _lire_dictionnaire(dossier, "users", meta["users"])
+        self.statuts = _lire_dictionnaire(dossier, "statuts", meta["statuts"])
+
+    @staticmethod
+    def chercher_id(valeurs, valeur):
+        """Id de ``valeur`` dans un dictionnaire de l'index, ou None."""
+        try:
+            return valeurs.index(valeur)
+        except ValueError:
+            return None
+
+
+def _premiers(valeurs, masque):
+    """Pour chaque valeur distincte de valeurs[masque] : (valeur, nombre, première position)."""
+    positions = np.flatnonzero(masque)
+    if positions.size == 0:
+        return []
+    uniques, premiers, nombres = np.unique(valeurs[positions], return_index=True, return_counts=True)
+    return zip(uniques.tolist(), nombres.tolist(), positions[premiers].tolist())
+
+
+class StatistiquesIndex(EchecsExacts):
+    """
+    Mêmes statistiques que rapport.StatistiquesRapport, calculées par
+    requêtes vectorisées sur l'index (utilisable par construire_rapport).
+    """
+
+    def __init__(self, index, plage_heures=None):
+        self.index = index
+        heure = index.heure
+        masque = np.ones(index.lignes, dtype=bool)
+        if plage_heures is not None:
+            masque &= np.isin(heure, np.fromiter(plage_heures, dtype=np.uint8))
+        self._masque = masque
+
+        # Comme ``if ip:`` dans StatistiquesRapport : « IP= » sans valeur ne compte pas
+        avec_ip = index.ip != AUCUN
+        id_vide = index.chercher_id(index.ips, "")
+        if id_vide is not None:
+            avec_ip &= index.ip != id_vide
+        self._avec_ip = avec_ip
+
+        id_echec = index.chercher_id(index.statuts, "FAIL")
+        echecs = masque & avec_ip
+        echecs &= (index.statut == id_echec) if id_echec is not None else False
+        # Dans l'ordre de leur premier échec, comme un dict rempli ligne à ligne
+        premiers_echecs = sorted(_premiers(index.ip, echecs), key=lambda x: x[2])
+        self.echecs_par_ip = {ip_vers_entier(index.ips[ip]): nombre for ip, nombre, _ in premiers_echecs}
+        self._echecs_par_id = np.zeros(len(index.ips), dtype=np.int64)
+        for ip, nombre, _ in premiers_echecs:
+            self._echecs_par_id[ip] = nombre
+
+    def finaliser(self, seuil=SEUIL_ECHECS):
+        index = self.index
+        heure = index.heure
+        connue = heure != HEURE_INCONNUE
+        alertes = connue & ((heure < HEURE_DEBUT) | (heure >= HEURE_FIN))
+        id_admin = index.chercher_id(index.users, "admin")
+        if id_admin is not None:
+            alertes |= index.user == id_admin
+        ips_suspectes = self._echecs_par_id >= seuil
+        if ips_suspectes.any():
+            avec_ip = self._avec_ip
+            alertes |= avec_ip & ips_suspectes[np.where(avec_ip, index.ip, 0)]
+        alertes &= self._masque
+
+        activite = ActiviteSuspecte()
+        activite.alertes = int(np.count_nonzero(alertes))
+        for heure_alerte, nombre, position in _premiers(heure, alertes & connue):
+            activite.heures[heure_alerte] = [nombre, position]
+        avec_user = index.user != AUCUN
+        id_vide = index.chercher_id(index.users, "")
+        if id_vide is not None:
+            avec_user &= index.user != id_vide
+        for user, nombre, position in _premiers(index.user, alertes & avec_user):
+            activite.users[index.users[user]] = [nombre, position]
+        return activite
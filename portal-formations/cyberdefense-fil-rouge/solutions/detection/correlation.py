@@ -0,0 +1,171 @@
+"""
+Corrélation d'événements : attaques en plusieurs étapes, sur fenêtre glissante.
+
+Les règles des étapes 4 et 5 regardent une ligne à la fois (plus le total
+d'échecs de l'IP). Le moteur de corrélation garde un état par compte et par
+IP pour reconnaître :
+
+- ``PULVERISATION`` (password spraying) : au moins ``seuil_ips`` IP
+  différentes échouent sur un même compte en moins de ``fenetre`` secondes.
+  Pour chaque compte, seules les ``seuil_ips`` IP les plus récentes sont
+  gardées (leur dernier échec) : la plus ancienne suffit à dire si la règle
+  est atteinte, comme l'anneau de ``DetecteurFenetre`` ;
+- ``PRISE_DE_CONTROLE`` : une connexion réussie sur un compte après au moins
+  ``seuil_echecs`` échecs sur ce compte (toutes IP confondues) dans la
+  fenêtre ;
+- ``IP_COMPROMISE`` : une connexion réussie depuis une IP qui vient
+  d'accumuler ``seuil_echecs`` échecs (tous comptes confondus).
+
+Une alerte n'est levée qu'une fois par compte (ou IP) et par épisode : son
+état est remis à zéro. Les états sans activité depuis ``fenetre`` secondes
+sont oubliés, et chaque table est plafonnée à ``max_cles`` entrées (les
+moins récemment actives partent d'abord) : la mémoire reste bornée quel que
+soit le nombre de comptes ou d'IP vus. Chaque événement coûte O(1) amorti.
+
+    moteur = MoteurCorrelation()
+    for alerte in moteur.ajouter(evenement, evenement.horodatage):
+        print(alerte.niveau, alerte.raison)
+
+Les alertes ont ``niveau``, ``raison`` et ``codes`` comme un ``Verdict`` :
+elles s'écrivent avec ``EcrivainAlertes`` comme celles des règles.
+"""
+
+from collections import OrderedDict
+
+from .extraction import SEUIL_ECHECS
+from .fenetre import DetecteurFenetre
+
+FENETRE_CORRELATION = 600  # secondes
+SEUIL_IPS = 10             # IP différentes sur un même compte
+MAX_CLES = 100_000         # comptes (ou IP) suivis par table
+
+
+class AlerteCorrelee:
+    """Alerte composite : ``cle`` = compte ou IP visé, ``preuves`` = nombre d'IP ou d'échecs."""
+
+    __slots__ = ("code", "niveau", "raison", "cle", "horodatage", "preuves")
+
+    def __init__(self, code, niveau, raison, cle, horodatage, preuves):
+        self.code = code
+        self.niveau = niveau
+        self.raison = raison
+        self.cle = cle
+        self.horodatage = horodatage
+        self.preuves = preuves
+
+    @property
+    def codes(self):
+        return (self.code,)
+
+    def __repr__(self):
+        return f"AlerteCorrelee({self.code}, cle={self.cle!r}, preuves={self.preuves})"
+
+
+class _Pulverisation:
+    """Dernier échec des ``seuil`` IP les plus récentes sur chaque compte."""
+
+    def __init__(self, seuil, fenetre, max_cles):
+        self.seuil = seuil
+        self.fenetre = fenetre
+        self.max_cles = max_cles
+        # compte -> OrderedDict(ip -> dernier échec), de la moins à la plus récente
+        self._comptes = OrderedDict()
+        self.oublies = 0
+
+    def __len__(self):
+        return len(self._comptes)
+
+    def ajouter(self, user, ip, horodatage, maintenant):
+        """Renvoie le nombre d'IP du compte dans la fenêtre si la règle est atteinte, sinon 0."""
+        comptes = self._comptes
+        ips = comptes.get(user)
+        if ips is None:
+            if len(comptes) >= self.max_cles:
+                comptes.popitem(last=False)
+                self.oublies += 1
+            ips = comptes[user] = OrderedDict()
+        else:
+            comptes.move_to_end(user)
+        ips[ip] = horodatage
+        ips.move_to_end(ip)
+        if len(ips) > self.seuil:
+            ips.popitem(last=False)
+        self._expirer(maintenant)
+
+        if len(ips) < self.seuil or horodatage - next(iter(ips.values())) > self.fenetre:
+            return 0
+        del comptes[user]  # un épisode = une alerte
+        return self.seuil
+
+    def _expirer(self, maintenant):
+        limite = maintenant - self.fenetre
+        comptes = self._comptes
+        while comptes:
+            user, ips = next(iter(comptes.items()))
+            if next(reversed(ips.values())) >= limite:
+                break
+            del comptes[user]
+            self.oublies += 1
+
+
+class MoteurCorrelation:
+    """Règles multi-étapes sur les échecs et succès, par compte et par IP."""
+
+    def __init__(self, fenetre=FENETRE_CORRELATION, seuil_ips=SEUIL_IPS, seuil_echecs=SEUIL_ECHECS,
+                 max_cles=MAX_CLES):
+        self.fenetre = fenetre
+        self.seuil_ips = seuil_ips
+        self.seuil_echecs = seuil_echecs
+        self._pulverisation = _Pulverisation(seuil_ips, fenetre, max_cles)
+        # Échecs récents par compte et par IP : anneaux de DetecteurFenetre
+        self._echecs_compte = DetecteurFenetre(seuil_echecs, fenetre, max_cles)
+        self._echecs_ip = DetecteurFenetre(seuil_echecs, fenetre, max_cles)
+        self._maintenant = None
+        self.alertes = 0
+
+    def __len__(self):
+        """États gardés en mémoire (comptes et IP, toutes tables confondues)."""
+        return len(self._pulverisation) + len(self._echecs_compte) + len(self._echecs_ip)
+
+    def ajouter(self, evenement, horodatage):
+        """Fait avancer les états avec ``evenement`` ; renvoie les alertes levées (souvent [])."""
+        user, ip = evenement.user, evenement.ip
+        if horodatage is None or not user or not ip:
+            return []
+        if self._maintenant is None or horodatage > self._maintenant:
+            self._maintenant = horodatage
+
+        if evenement.echec:
+            self._echecs_compte.ajouter(user, horodatage)
+            self._echecs_ip.ajouter(ip, horodatage)
+            nombre_ips = self._pulverisation.ajouter(user, ip, horodatage, self._maintenant)
+            if not nombre_ips:
+                return []
+            self.alertes += 1
+            return [AlerteCorrelee(
+                "PULVERISATION", "CRITIQUE",
+                f"Pulvérisation de mots de passe : {nombre_ips} IP sur le compte {user}",
+                user, horodatage, nombre_ips,
+            )]
+
+        if evenement.statut != "SUCCESS":
+            return []
+        alertes = []
+        echecs = self._echecs_compte.echecs_recents(user, horodatage)
+        if echecs >= self.seuil_echecs:
+            self._echecs_compte.oublier(user)
+            alertes.append(AlerteCorrelee(
+                "PRISE_DE_CONTROLE", "CRITIQUE",
+                f"Connexion réussie sur {user} après {echecs}+ échecs",
+                user, horodatage, echecs,
+            ))
+        echecs = self._echecs_ip.echecs_recents(ip, horodatage)
+        if echecs >= self.seuil_echecs:
+            self._echecs_ip.oublier(ip)
+            alertes.append(AlerteCorrelee(
+                "IP_COMPROMISE", "CRITIQUE",
+                f"Connexion réussie depuis {ip} après {echecs}+ échecs",
+                ip, horodatage, echecs,
+            ))
+        self.alertes += len(alertes)
+        return alertes
@@ -0,0 +1,121 @@
+"""
+Rapport incrémental : les agrégats sont gardés d'un lancement à l'autre.
+
+L'état (``<journal>.etat``) contient les statistiques du rapport déjà
+calculées et l'octet jusqu'où le journal a été lu. Chaque lancement ne lit
+que les nouvelles lignes complètes et les ajoute aux agrégats : le coût dépend
+des lignes ajoutées depuis la dernière fois (plus la relecture de l'état, dont
+la taille dépend du nombre d'IP et d'utilisateurs, pas du nombre de lignes).
+
+- rotation (nouvel inode) : l'ancien fichier est fini s'il est encore là
+  (``<journal>.1``), puis le nouveau est lu depuis le début ;
+- troncature : lecture depuis le début ;
+dans les deux cas l'historique est conservé. Seul un changement de
+paramètres (plage d'heures, mode esquisses...) repart de zéro.
+
+Les positions passées à ``ajouter`` continuent de croître d'un fichier à
+l'autre (``base`` + octet dans le fichier), pour garder l'ordre des ex-aequo.
+
+L'état est enregistré en JSON (``etat()`` des statistiques, champ par
+champ) : le relire n'exécute aucun code.
+"""
+
+import json
+import os
+
+from .esquisses import StatistiquesEsquisses
+from .extraction import analyser_ligne
+from .rapport import StatistiquesRapport
+
+# 2 : esquisses avec lignes en attente par IP ; 3 : heures hors de 0..23 ignorées ; 4 : JSON
+VERSION = 4
+TYPES = {classe.__name__: classe for classe in (StatistiquesRapport, StatistiquesEsquisses)}
+
+
+def chemin_etat(journal):
+    return journal + ".etat"
+
+
+def _lire_etat(chemin):
+    """État enregistré, ou None (absent, illisible ou d'une autre version : on repart de zéro)."""
+    try:
+        with open(chemin, "r", encoding="utf-8") as fichier:
+            etat = json.load(fichier)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(etat, dict) or etat.get("version") != VERSION:
+        return None
+    try:
+        etat["statistiques"] = TYPES[etat["type"]].depuis_etat(etat["statistiques"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return etat
+
+
+def _ecrire_etat(chemin, etat):
+    """Écriture atomique, comme le point de reprise du suivi."""
+    statistiques = etat["statistiques"]
+    donnees = dict(etat, type=type(statistiques).__name__, statistiques=statistiques.etat())
+    temporaire = chemin + ".tmp"
+    with open(temporaire, "w", encoding="utf-8") as fichier:
+        json.dump(donnees, fichier)
+    os.replace(temporaire, chemin)
+
+
+def _ajouter_fichier(statistiques, chemin, debut, base):
+    """Ajoute les lignes complètes de ``chemin`` à partir de ``debut`` ; renvoie (position, lignes)."""
+    lignes = 0
+    position = debut
+    with open(chemin, "rb") as fichier:
+        fichier.seek(debut)
+        for brute in fichier:
+            if not brute.endswith(b"\n"):
+                break  # ligne en cours d'écriture : au prochain lancement
+            ligne = brute.decode("utf-8", errors="replace").strip()
+            statistiques.ajouter(analyser_ligne(ligne), base + position)
+            position += len(brute)
+            lignes += 1
+    return position, lignes
+
+
+def mettre_a_jour(journal, parametres, plage_heures=None, fabrique=StatistiquesRapport, chemin=None):
+    """
+    Complète l'état de ``journal`` avec ses nouvelles lignes ; renvoie
+    (statistiques, nombre de lignes ajoutées).
+
+    ``parametres`` décrit le calcul (dictionnaire comparable) : s'il diffère
+    de celui de l'état enregistré, les statistiques repartent de zéro avec
+    ``fabrique(plage_heures)``.
+    """
+    chemin = chemin or chemin_etat(journal)
+    infos = os.stat(journal)
+    etat = _lire_etat(chemin)
+    if etat is None or etat["parametres"] != parametres:
+        etat = {"version": VERSION, "parametres": parametres, "inode": infos.st_ino, "position": 0,
+                "base": 0, "statistiques": fabrique(plage_heures)}
+    statistiques = etat["statistiques"]
+    ajoutees = 0
+
+    if etat["inode"] != infos.st_ino:
+        # Rotation depuis le dernier lancement : finir l'ancien fichier s'il est encore là
+        ancien = journal + ".1"
+        try:
+            infos_ancien = os.stat(ancien)
+        except FileNotFoundError:
+            infos_ancien = None
+        fin_ancien = etat["position"]
+        if infos_ancien is not None and infos_ancien.st_ino == etat["inode"]:
+            fin_ancien, ajoutees = _ajouter_fichier(statistiques, ancien, etat["position"], etat["base"])
+            fin_ancien = max(fin_ancien, infos_ancien.st_size)
+        etat["base"] += fin_ancien
+        etat["inode"] = infos.st_ino
+        etat["position"] = 0
+    elif infos.st_size < etat["position"]:
+        # Tronqué (copytruncate) : le contenu actuel est entièrement nouveau
+        etat["base"] += etat["position"]
+        etat["position"] = 0
+
+    etat["position"], lignes = _ajouter_fichier(statistiques, journal, etat["position"], etat["base"])
+    ajoutees += lignes
+    _ecrire_etat(chemin, etat)
+    return statistiques, ajoutees
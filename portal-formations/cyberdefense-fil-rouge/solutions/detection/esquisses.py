@@ -0,0 +1,523 @@
+"""
+Esquisses probabilistes : statistiques du rapport à mémoire bornée.
+
+Quand un scan touche des millions d'IP ou de comptes, les dictionnaires
+exacts du rapport grossissent sans limite. Les esquisses ont une taille fixée
+par la précision demandée, quel que soit le volume :
+
+- ``CountMin`` (epsilon, delta) : nombre d'occurrences d'une clé, jamais
+  sous-estimé, surestimé d'au plus ``epsilon`` x total avec une probabilité
+  ``1 - delta`` ;
+- ``HyperLogLog`` (erreur) : nombre de clés distinctes, erreur relative
+  typique ``erreur`` ;
+- ``ElementsFrequents`` (capacité, algorithme Space-Saving) : les clés les
+  plus fréquentes ; toute clé vue plus de total / capacité fois est gardée.
+
+Toutes se fusionnent (même paramètres) : des esquisses calculées par
+plusieurs processus, ou jour par jour, donnent celles de l'ensemble. Les clés
+sont hachées avec blake2b (et non ``hash()``, qui change d'un processus à
+l'autre) pour que les esquisses restent comparables.
+
+``StatistiquesEsquisses`` s'utilise comme ``rapport.StatistiquesRapport``
+(``ajouter``, ``fusionner``, ``finaliser``) avec ``construire_rapport``.
+Comme lui, il met de côté, par IP, les lignes qui ne seraient suspectes que
+par leur IP, tant que l'IP n'a pas atteint le seuil ; cette table est
+plafonnée à ``max_en_attente`` IP (les moins récemment actives sont
+oubliées, et leurs lignes comptées à part dans ``perdues``).
+
+``enregistrer`` / ``charger`` écrivent et relisent les esquisses en JSON
+compressé (gzip) : des champs explicites et un numéro de version, les
+tables en base64 (entiers 64 bits petit-boutistes). Le chargement ne fait
+que lire des données : on peut cumuler sans risque les fichiers venus
+d'autres machines.
+"""
+
+import base64
+import functools
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import sys
+from array import array
+from collections import OrderedDict
+
+from .adresses import ip_vers_entier
+from .extraction import SEUIL_ECHECS, hors_heures
+from .rapport import ActiviteSuspecte, _compter, _fusionner_compteurs
+
+EPSILON = 0.0001
+DELTA = 0.01
+ERREUR_HLL = 0.01
+CAPACITE = 1_000
+FORMAT_FICHIER = "esquisses"
+VERSION = 3  # 3 : JSON (les versions précédentes étaient des pickles)
+TAILLE_CACHE = 65_536  # IP dont l'empreinte est gardée
+MAX_IPS_EN_ATTENTE = 100_000  # IP sous le seuil dont les lignes sont mises de côté
+
+
+def empreinte(cle):
+    """Hachage 64 bits stable d'une clé (entier d'IP ou texte)."""
+    if isinstance(cle, int):
+        donnees = b"i" + cle.to_bytes(17, "big")
+    else:
+        donnees = b"s" + cle.encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(donnees, digest_size=8).digest(), "big")
+
+
+@functools.lru_cache(maxsize=TAILLE_CACHE)
+def _cle_ip(ip):
+    """(clé entière, empreinte) d'une IP ; les IP actives reviennent souvent : cache borné."""
+    cle = ip_vers_entier(ip)
+    return cle, empreinte(cle)
+
+
+def _vers_texte(donnees):
+    return base64.b64encode(donnees).decode("ascii")
+
+
+def _depuis_texte(texte):
+    return base64.b64decode(texte, validate=True)
+
+
+def _verifier_compatibles(esquisse, autre, *attributs):
+    for attribut in attributs:
+        if getattr(esquisse, attribut) != getattr(autre, attribut):
+            raise ValueError(f"Esquisses incompatibles ({attribut} différents) : impossible de les fusionner")
+
+
+class CountMin:
+    """Compteurs approchés par clé (Count-Min Sketch)."""
+
+    def __init__(self, epsilon=EPSILON, delta=DELTA):
+        self.largeur = math.ceil(math.e / epsilon)
+        self.profondeur = math.ceil(math.log(1 / delta))
+        self.table = array("q", bytes(8 * self.largeur * self.profondeur))
+        self.total = 0
+
+    def _cases(self, h):
+        # Double hachage : profondeur positions tirées d'une seule empreinte
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        largeur = self.largeur
+        return [ligne * largeur + (h1 + ligne * h2) % largeur for ligne in range(self.profondeur)]
+
+    def ajouter(self, h, nombre=1):
+        """``h`` = empreinte(cle). Renvoie la nouvelle estimation de la clé."""
+        table = self.table
+        estimation = None
+        for case in self._cases(h):
+            valeur = table[case] + nombre
+            table[case] = valeur
+            if estimation is None or valeur < estimation:
+                estimation = valeur
+        self.total += nombre
+        return estimation
+
+    def estimer(self, h):
+        table = self.table
+        return min(table[case] for case in self._cases(h))
+
+    def fusionner(self, autre):
+        _verifier_compatibles(self, autre, "largeur", "profondeur")
+        table = self.table
+        for i, valeur in enumerate(autre.table):
+            if valeur:
+                table[i] += valeur
+        self.total += autre.total
+        return self
+
+    def etat(self):
+        table = self.table
+        if sys.byteorder != "little":
+            table = array("q", table)
+            table.byteswap()
+        return {"largeur": self.largeur, "profondeur": self.profondeur, "total": self.total,
+                "table": _vers_texte(table.tobytes())}
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        esquisse = cls.__new__(cls)
+        esquisse.largeur, esquisse.profondeur = int(etat["largeur"]), int(etat["profondeur"])
+        esquisse.table = array("q")
+        esquisse.table.frombytes(_depuis_texte(etat["table"]))
+        if sys.byteorder != "little":
+            esquisse.table.byteswap()
+        if esquisse.largeur < 1 or len(esquisse.table) != esquisse.largeur * esquisse.profondeur:
+            raise ValueError("table Count-Min de taille incohérente")
+        esquisse.total = int(etat["total"])
+        return esquisse
+
+
+class HyperLogLog:
+    """Nombre approché de clés distinctes."""
+
+    def __init__(self, erreur=ERREUR_HLL):
+        # erreur relative ~ 1,04 / sqrt(m), m = 2^bits registres
+        self.bits = min(max(math.ceil(math.log2((1.04 / erreur) ** 2)), 4), 18)
+        self.registres = bytearray(1 << self.bits)
+
+    def ajouter(self, h):
+        """``h`` = empreinte(cle)."""
+        reste_bits = 64 - self.bits
+        registre = h >> reste_bits
+        reste = h & ((1 << reste_bits) - 1)
+        # Position du premier bit à 1 dans le reste (1 = bit de poids fort)
+        rang = reste_bits - reste.bit_length() + 1
+        if rang > self.registres[registre]:
+            self.registres[registre] = rang
+
+    def estimer(self):
+        m = len(self.registres)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimation = alpha * m * m / sum(2.0 ** -r for r in self.registres)
+        vides = self.registres.count(0)
+        if estimation <= 2.5 * m and vides:
+            # Petites cardinalités : comptage des registres vides, plus précis
+            estimation = m * math.log(m / vides)
+        return round(estimation)
+
+    def fusionner(self, autre):
+        _verifier_compatibles(self, autre, "bits")
+        self.registres = bytearray(map(max, self.registres, autre.registres))
+        return self
+
+    def etat(self):
+        return {"bits": self.bits, "registres": _vers_texte(self.registres)}
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        esquisse = cls.__new__(cls)
+        esquisse.bits = int(etat["bits"])
+        esquisse.registres = bytearray(_depuis_texte(etat["registres"]))
+        if not 4 <= esquisse.bits <= 18 or len(esquisse.registres) != 1 << esquisse.bits:
+            raise ValueError("registres HyperLogLog de taille incohérente")
+        return esquisse
+
+
+class ElementsFrequents:
+    """
+    Les clés les plus fréquentes (Space-Saving) : au plus ``capacite``
+    compteurs ; une nouvelle clé remplace la moins fréquente et hérite de son
+    compte (d'où une surestimation bornée, gardée dans ``erreur``).
+    """
+
+    def __init__(self, capacite=CAPACITE):
+        self.capacite = capacite
+        # cle -> [compte, surestimation possible]
+        self.compteurs = {}
+        # (compte, n° d'ordre, cle) ; un compte périmé est corrigé quand il remonte
+        self._tas = []
+        self._ordre = 0
+
+    def _pousser(self, cle, compte):
+        self._ordre += 1
+        heapq.heappush(self._tas, (compte, self._ordre, cle))
+
+    def _moins_frequent(self):
+        """(compte, cle) du plus petit compteur, en corrigeant les entrées périmées du tas."""
+        tas = self._tas
+        while True:
+            compte, _, cle = tas[0]
+            actuel = self.compteurs[cle][0]
+            if actuel == compte:
+                return compte, cle
+            heapq.heapreplace(tas, (actuel, self._ordre + 1, cle))
+            self._ordre += 1
+
+    def ajouter(self, cle, nombre=1):
+        compteur = self.compteurs.get(cle)
+        if compteur is not None:
+            compteur[0] += nombre
+            return
+        if len(self.compteurs) < self.capacite:
+            self.compteurs[cle] = [nombre, 0]
+            self._pousser(cle, nombre)
+            return
+        minimum, remplacee = self._moins_frequent()
+        heapq.heappop(self._tas)
+        del self.compteurs[remplacee]
+        self.compteurs[cle] = [minimum + nombre, minimum]
+        self._pousser(cle, minimum + nombre)
+
+    def minimum(self):
+        """Compte maximal d'une clé absente (0 tant que la capacité n'est pas atteinte)."""
+        if len(self.compteurs) < self.capacite:
+            return 0
+        return self._moins_frequent()[0]
+
+    def fusionner(self, autre):
+        _verifier_compatibles(self, autre, "capacite")
+        # Une clé absente d'un côté a pu y être vue jusqu'à « minimum » fois
+        min_self, min_autre = self.minimum(), autre.minimum()
+        fusion = {}
+        for cle, (compte, erreur) in self.compteurs.items():
+            compte_autre, erreur_autre = autre.compteurs.get(cle, (min_autre, min_autre))
+            fusion[cle] = [compte + compte_autre, erreur + erreur_autre]
+        for cle, (compte, erreur) in autre.compteurs.items():
+            if cle not in fusion:
+                fusion[cle] = [compte + min_self, erreur + min_self]
+        gardees = heapq.nlargest(self.capacite, fusion.items(), key=lambda x: x[1][0])
+        self.compteurs = dict(gardees)
+        self._tas = []
+        for cle, (compte, _) in self.compteurs.items():
+            self._pousser(cle, compte)
+        return self
+
+    def classement(self, k=None):
+        """[(cle, compte)] par compte décroissant (ex-aequo : ordre d'arrivée)."""
+        elements = self.compteurs.items()
+        if k is None:
+            tries = sorted(elements, key=lambda x: -x[1][0])
+        else:
+            tries = heapq.nlargest(k, elements, key=lambda x: x[1][0])
+        return [(cle, compte) for cle, (compte, _) in tries]
+
+    def etat(self):
+        # Liste et non objet JSON : les clés d'IP sont des entiers, et l'ordre départage les ex-aequo
+        return {"capacite": self.capacite,
+                "compteurs": [[cle, compte, erreur] for cle, (compte, erreur) in self.compteurs.items()]}
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        esquisse = cls(int(etat["capacite"]))
+        for cle, compte, erreur in etat["compteurs"]:
+            if not isinstance(cle, (int, str)) or isinstance(cle, bool):
+                raise ValueError(f"clé invalide : {cle!r}")
+            esquisse.compteurs[cle] = [int(compte), int(erreur)]
+            esquisse._pousser(cle, int(compte))
+        if len(esquisse.compteurs) > esquisse.capacite:
+            raise ValueError("plus de compteurs que la capacité")
+        return esquisse
+
+
+class StatistiquesEsquisses:
+    """
+    Statistiques du rapport à mémoire bornée, fusionnables.
+
+    Une ligne qui ne serait suspecte que par son IP est comptée tout de suite
+    si l'IP a déjà atteint le seuil (estimation Count-Min), sinon mise de
+    côté avec l'activité de son IP (nombre, heures, comptes visés) et
+    rattrapée dès que l'IP atteint le seuil, au fil du flux ou à la fusion
+    d'un autre morceau. Seules les lignes des IP oubliées (au-delà de
+    ``max_en_attente`` IP en attente) peuvent manquer : elles sont comptées
+    dans ``perdues``, l'écart maximal avec le calcul exact (hors erreur
+    Count-Min, qui ne fait que surestimer). Les classements (IP,
+    sous-réseaux, utilisateurs) ne portent que sur les ``capacite`` clés les
+    plus fréquentes.
+    """
+
+    approximatif = True
+
+    def __init__(self, plage_heures=None, epsilon=EPSILON, delta=DELTA, erreur_hll=ERREUR_HLL,
+                 capacite=CAPACITE, seuil=SEUIL_ECHECS, max_en_attente=MAX_IPS_EN_ATTENTE):
+        self.plage_heures = plage_heures
+        self.seuil = seuil
+        self.parametres = {"epsilon": epsilon, "delta": delta, "erreur_hll": erreur_hll, "capacite": capacite}
+        self.echecs = CountMin(epsilon, delta)
+        self.ips = HyperLogLog(erreur_hll)
+        self.ips_au_seuil = HyperLogLog(erreur_hll)
+        self.top_ips = ElementsFrequents(capacite)
+        self.alertes = 0
+        self.heures = {}
+        self.users = ElementsFrequents(capacite)
+        self.users_distincts = HyperLogLog(erreur_hll)
+        self.max_en_attente = max_en_attente
+        # IP (entier) sous le seuil -> ActiviteSuspecte de ses lignes, de la moins à la plus récemment active
+        self.en_attente = OrderedDict()
+        self.perdues = 0
+
+    # --- interface commune avec StatistiquesRapport ----------------------
+
+    @property
+    def echecs_par_ip(self):
+        """IP les plus en échec ; compte = le plus précis des deux estimateurs."""
+        return {cle: min(compte, self.echecs.estimer(empreinte(cle))) for cle, compte in self.top_ips.classement()}
+
+    def nombre_echecs(self):
+        return self.echecs.total
+
+    def nombre_ips(self):
+        return self.ips.estimer()
+
+    def nombre_ips_au_seuil(self, seuil=SEUIL_ECHECS):
+        self._verifier_seuil(seuil)
+        return self.ips_au_seuil.estimer()
+
+    def description(self):
+        p = self.parametres
+        return (f"Count-Min ε={p['epsilon']:g} δ={p['delta']:g}, HyperLogLog ±{p['erreur_hll']:.0%}, "
+                f"top {p['capacite']} (Space-Saving)")
+
+    # --- calcul ------------------------------------------------------------
+
+    def _verifier_seuil(self, seuil):
+        if seuil != self.seuil:
+            raise ValueError(f"Esquisses calculées pour un seuil de {self.seuil} échecs, pas {seuil}")
+
+    def _compter_alertes(self, activite):
+        self.alertes += activite.alertes
+        _fusionner_compteurs(self.heures, activite.heures)
+        for user, (nombre, _) in activite.users.items():
+            self.users.ajouter(user, nombre)
+            self.users_distincts.ajouter(empreinte(user))
+
+    def _mettre_de_cote(self, cle, evenement, position):
+        en_attente = self.en_attente
+        activite = en_attente.get(cle)
+        if activite is None:
+            if len(en_attente) >= self.max_en_attente:
+                _, oubliee = en_attente.popitem(last=False)
+                self.perdues += oubliee.alertes
+            activite = en_attente[cle] = ActiviteSuspecte()
+        else:
+            en_attente.move_to_end(cle)
+        activite.ajouter(evenement, position)
+
+    def _rattraper(self, cle):
+        """L'IP ``cle`` a atteint le seuil : ses lignes mises de côté deviennent des alertes."""
+        activite = self.en_attente.pop(cle, None)
+        if activite is not None:
+            self._compter_alertes(activite)
+
+    def _rattraper_au_seuil(self):
+        """Rattrape toutes les IP en attente dont l'estimation atteint le seuil."""
+        for cle in [c for c in self.en_attente if self.echecs.estimer(empreinte(c)) >= self.seuil]:
+            self._rattraper(cle)
+
+    def ajouter(self, evenement, position):
+        heure = evenement.heure
+        if self.plage_heures is not None and heure not in self.plage_heures:
+            return
+
+        alerte = hors_heures(heure) or evenement.user == "admin"
+        ip = evenement.ip
+        if ip:
+            cle, h = _cle_ip(ip)
+            if evenement.echec:
+                echecs = self.echecs.ajouter(h)
+                self.ips.ajouter(h)
+                self.top_ips.ajouter(cle)
+                if echecs >= self.seuil:
+                    self.ips_au_seuil.ajouter(h)
+            elif alerte:
+                echecs = 0  # déjà une alerte : le total de l'IP n'y change rien
+            else:
+                echecs = self.echecs.estimer(h)
+            if echecs >= self.seuil:
+                if self.en_attente:
+                    self._rattraper(cle)
+                alerte = True
+            elif not alerte:
+                self._mettre_de_cote(cle, evenement, position)
+
+        if alerte:
+            self.alertes += 1
+            if heure is not None:
+                _compter(self.heures, heure, position)
+            if evenement.user:
+                self.users.ajouter(evenement.user)
+                self.users_distincts.ajouter(empreinte(evenement.user))
+
+    def fusionner(self, autre):
+        """Ajoute les esquisses d'un autre morceau de journal (ou d'un autre jour)."""
+        if autre.seuil != self.seuil or autre.parametres != self.parametres:
+            raise ValueError("Esquisses calculées avec des paramètres différents : impossible de les fusionner")
+        self.echecs.fusionner(autre.echecs)
+        self.ips.fusionner(autre.ips)
+        self.ips_au_seuil.fusionner(autre.ips_au_seuil)
+        self.top_ips.fusionner(autre.top_ips)
+        self.alertes += autre.alertes
+        _fusionner_compteurs(self.heures, autre.heures)
+        self.users.fusionner(autre.users)
+        self.users_distincts.fusionner(autre.users_distincts)
+
+        # Lignes en attente des deux côtés : celles des IP qui atteignent
+        # maintenant le seuil sont rattrapées, les autres restent en attente
+        self.perdues += autre.perdues
+        for cle, activite in autre.en_attente.items():
+            if cle in self.en_attente:
+                self.en_attente[cle].fusionner(activite)
+                self.en_attente.move_to_end(cle)
+            else:
+                self.en_attente[cle] = activite
+        self._rattraper_au_seuil()
+        while len(self.en_attente) > self.max_en_attente:
+            _, oubliee = self.en_attente.popitem(last=False)
+            self.perdues += oubliee.alertes
+        return self
+
+    def finaliser(self, seuil=SEUIL_ECHECS):
+        self._verifier_seuil(seuil)
+        # IP passées au-dessus du seuil sans nouvelle ligne (collisions Count-Min)
+        self._rattraper_au_seuil()
+        activite = ActiviteSuspecte()
+        activite.alertes = self.alertes
+        activite.heures = dict(self.heures)
+        # Position = rang : _trier garde l'ordre du classement
+        activite.users = {user: [n, rang] for rang, (user, n) in enumerate(self.users.classement())}
+        return activite
+
+    # --- persistance -------------------------------------------------------
+
+    def etat(self):
+        """Contenu sérialisable en JSON, champ par champ."""
+        return {
+            "seuil": self.seuil,
+            "plage_heures": None if self.plage_heures is None else sorted(self.plage_heures),
+            "parametres": self.parametres,
+            "max_en_attente": self.max_en_attente,
+            "echecs": self.echecs.etat(),
+            "ips": self.ips.etat(),
+            "ips_au_seuil": self.ips_au_seuil.etat(),
+            "top_ips": self.top_ips.etat(),
+            "alertes": self.alertes,
+            "heures": [[heure, n, position] for heure, (n, position) in self.heures.items()],
+            "users": self.users.etat(),
+            "users_distincts": self.users_distincts.etat(),
+            "en_attente": [[cle, activite.etat()] for cle, activite in self.en_attente.items()],
+            "perdues": self.perdues,
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        parametres = etat["parametres"]
+        if set(parametres) != {"epsilon", "delta", "erreur_hll", "capacite"}:
+            raise ValueError(f"paramètres inattendus : {sorted(parametres)}")
+        plage_heures = etat["plage_heures"]
+        statistiques = cls(None if plage_heures is None else {int(h) for h in plage_heures},
+                           seuil=int(etat["seuil"]), max_en_attente=int(etat["max_en_attente"]), **parametres)
+        statistiques.echecs = CountMin.depuis_etat(etat["echecs"])
+        statistiques.ips = HyperLogLog.depuis_etat(etat["ips"])
+        statistiques.ips_au_seuil = HyperLogLog.depuis_etat(etat["ips_au_seuil"])
+        statistiques.top_ips = ElementsFrequents.depuis_etat(etat["top_ips"])
+        statistiques.alertes = int(etat["alertes"])
+        statistiques.heures = {int(heure): [int(n), int(position)] for heure, n, position in etat["heures"]}
+        statistiques.users = ElementsFrequents.depuis_etat(etat["users"])
+        statistiques.users_distincts = HyperLogLog.depuis_etat(etat["users_distincts"])
+        for cle, activite in etat["en_attente"]:
+            statistiques.en_attente[cle] = ActiviteSuspecte.depuis_etat(activite)
+        statistiques.perdues = int(etat["perdues"])
+        return statistiques
+
+    def enregistrer(self, chemin):
+        with gzip.open(chemin, "wt", encoding="utf-8") as fichier:
+            json.dump({"format": FORMAT_FICHIER, "version": VERSION, **self.etat()}, fichier)
+
+    @classmethod
+    def charger(cls, chemin):
+        """Relit des esquisses enregistrées ; ValueError si le fichier n'en contient pas de valides."""
+        try:
+            with gzip.open(chemin, "rt", encoding="utf-8") as fichier:
+                donnees = json.load(fichier)
+        except (gzip.BadGzipFile, EOFError, ValueError) as exc:
+            raise ValueError(f"{chemin} : fichier d'esquisses illisible ({exc})") from exc
+        if not isinstance(donnees, dict) or donnees.get("format") != FORMAT_FICHIER:
+            raise ValueError(f"{chemin} : ce n'est pas un fichier d'esquisses")
+        if donnees.get("version") != VERSION:
+            raise ValueError(f"{chemin} : format d'esquisses {donnees.get('version')} non pris en charge")
+        try:
+            return cls.depuis_etat(donnees)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"{chemin} : fichier d'esquisses invalide ({exc!r})") from exc
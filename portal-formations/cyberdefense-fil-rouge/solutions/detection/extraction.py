@@ -0,0 +1,196 @@
+"""
+Extraction des champs d'une ligne de log.
+
+Format d'une ligne : ``2026-01-10 09:12:45 IP=192.168.1.10 STATUS=FAIL USER=admin``
+(l'ordre des champs ``CLE=valeur`` après la date peut varier).
+
+``analyser_ligne`` découpe la ligne une seule fois et renvoie un Evenement.
+Son heure vaut None si elle est illisible ou hors de 0..23 : une ligne sans
+heure valide ne déclenche pas la règle « hors heures » et ne compte dans
+aucune statistique par heure, quel que soit le chemin (texte, règles par
+lots, index en colonnes, esquisses). ``hors_heures`` est cette règle.
+Les fonctions ``extraire_*`` redécoupent la ligne à chaque appel : elles sont
+conservées pour les exercices et comme référence du banc de mesure
+``benchmarks/bench_parseur.py``.
+
+``decoder_horodatage`` convertit la date d'une ligne en secondes depuis
+l'epoch en profitant de la disposition fixe ``AAAA-MM-JJ HH:MM:SS`` : le
+début de chaque jour est calculé une fois puis mémorisé (un jour couvre des
+dizaines de milliers de lignes), de même que les secondes de chaque
+« HH:MM:SS » : une date coûte deux recherches dans un dictionnaire et une
+addition. Les lignes d'une même seconde se suivent : la dernière date
+décodée est gardée telle quelle.
+"""
+
+from datetime import date, datetime, timezone
+
+HEURE_DEBUT = 8
+HEURE_FIN = 18
+SEUIL_ECHECS = 5
+
+_JOUR_EPOCH = date(1970, 1, 1).toordinal()
+MAX_JOURS_MEMORISES = 4096
+# Tables mémorisées (dates valides seulement) :
+# "AAAA-MM-JJ" -> secondes epoch de minuit (UTC), "HH:MM:SS" -> secondes depuis minuit
+_debuts_jour = {}
+_secondes_du_jour = {}
+# Dernière date décodée et son résultat (mémo d'une seconde)
+_derniere = ("", None)
+
+
+def extraire_ip(ligne):
+    """Extrait l'IP d'une ligne de log."""
+    debut_ip = ligne.find("IP=")
+    if debut_ip != -1:
+        partie_ip = ligne[debut_ip + 3:]
+        ip = partie_ip.split()[0]
+        return ip
+    return None
+
+
+def extraire_heure(ligne):
+    """Extrait l'heure d'une ligne de log."""
+    parties = ligne.split()
+    if len(parties) >= 2:
+        date_heure = parties[1]
+        heure_str = date_heure.split(":")[0]
+        try:
+            return int(heure_str)
+        except ValueError:
+            return None
+    return None
+
+
+def extraire_user(ligne):
+    """Extrait le nom d'utilisateur d'une ligne de log."""
+    debut_user = ligne.find("USER=")
+    if debut_user != -1:
+        partie_user = ligne[debut_user + 5:]
+        user = partie_user.split()[0] if partie_user.split() else ""
+        return user
+    return None
+
+
+def extraire_date(ligne):
+    """Extrait "date heure" d'une ligne de log."""
+    parties = ligne.split()
+    if len(parties) >= 2:
+        return f"{parties[0]} {parties[1]}"
+    return "DATE_INCONNUE"
+
+
+def hors_heures(heure, debut=HEURE_DEBUT, fin=HEURE_FIN):
+    """Heure valide (0..23) en dehors de [debut, fin[ ; False pour une heure inconnue (None)."""
+    return heure is not None and (heure < debut or heure >= fin)
+
+
+def _debut_jour(jour):
+    """Secondes epoch de minuit pour ``"AAAA-MM-JJ"`` (mémorisé), ou None."""
+    try:
+        if jour[4] != "-" or jour[7] != "-":
+            return None
+        debut = (date(int(jour[0:4]), int(jour[5:7]), int(jour[8:10])).toordinal() - _JOUR_EPOCH) * 86400
+    except ValueError:
+        return None
+    if len(_debuts_jour) >= MAX_JOURS_MEMORISES:
+        _debuts_jour.clear()
+    _debuts_jour[jour] = debut
+    return debut
+
+
+def _seconde_du_jour(heure):
+    """Secondes depuis minuit pour ``"HH:MM:SS"`` (mémorisé, 86 400 valeurs au plus), ou None."""
+    if len(heure) != 8 or heure[2] != ":" or heure[5] != ":" or not (heure[:2] + heure[3:5] + heure[6:]).isdigit():
+        return None
+    heures, minutes, secondes = int(heure[:2]), int(heure[3:5]), int(heure[6:])
+    if heures >= 24 or minutes >= 60 or secondes >= 60:
+        return None
+    seconde = _secondes_du_jour[heure] = heures * 3600 + minutes * 60 + secondes
+    return seconde
+
+
+def decoder_horodatage(texte):
+    """
+    ``"AAAA-MM-JJ HH:MM:SS"`` -> secondes depuis l'epoch (lue comme UTC), ou
+    None si la date est invalide. Les autres écritures ISO 8601 passent par
+    ``datetime.fromisoformat``.
+    """
+    global _derniere
+    derniere, resultat = _derniere
+    if texte == derniere:
+        return resultat
+
+    if len(texte) == 19 and texte[10] == " ":
+        # Deux recherches dans des tables mémorisées : jour, puis seconde du jour
+        debut = _debuts_jour.get(texte[:10])
+        if debut is None:
+            debut = _debut_jour(texte[:10])
+        seconde = _secondes_du_jour.get(texte[11:])
+        if seconde is None:
+            seconde = _seconde_du_jour(texte[11:])
+        resultat = None if debut is None or seconde is None else debut + seconde
+    else:
+        try:
+            resultat = int(datetime.fromisoformat(texte).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            resultat = None
+    _derniere = (texte, resultat)
+    return resultat
+
+
+class Evenement:
+    """Une ligne de log découpée en champs (``numero`` = position dans le flux, ``heure`` = 0..23 ou None)."""
+
+    __slots__ = ("numero", "ligne", "date", "heure", "ip", "user", "statut")
+
+    def __init__(self, numero, ligne, date, heure, ip, user, statut):
+        self.numero = numero
+        self.ligne = ligne
+        self.date = date
+        self.heure = heure
+        self.ip = ip
+        self.user = user
+        self.statut = statut
+
+    @property
+    def echec(self):
+        return self.statut == "FAIL"
+
+    @property
+    def horodatage(self):
+        """Secondes depuis l'epoch (heure du log lue comme UTC), ou None."""
+        return decoder_horodatage(self.date)
+
+    def __repr__(self):
+        return (
+            f"Evenement(numero={self.numero!r}, date={self.date!r}, ip={self.ip!r}, "
+            f"user={self.user!r}, statut={self.statut!r})"
+        )
+
+
+def analyser_ligne(ligne, numero=0):
+    """Découpe une ligne en un seul passage et renvoie un Evenement."""
+    parties = ligne.split()
+    date = "DATE_INCONNUE"
+    heure = ip = user = statut = None
+
+    if len(parties) >= 2:
+        date = f"{parties[0]} {parties[1]}"
+        try:
+            heure = int(parties[1].partition(":")[0])
+        except ValueError:
+            pass
+        else:
+            if not 0 <= heure < 24:
+                heure = None
+
+    for partie in parties:
+        cle, _, valeur = partie.partition("=")
+        if cle == "IP":
+            ip = valeur
+        elif cle == "USER":
+            user = valeur
+        elif cle == "STATUS":
+            statut = valeur
+
+    return Evenement(numero, ligne, date, heure, ip, user, statut)
@@ -0,0 +1,120 @@
+"""
+Détection de force brute sur fenêtre glissante, à mémoire bornée.
+
+Règle : au moins ``seuil`` échecs d'une même IP en moins de ``fenetre``
+secondes. Pour chaque IP, on garde seulement les ``seuil`` derniers
+horodatages dans un anneau (``array`` d'entiers, sans objet par valeur) :
+l'échec le plus ancien de l'anneau suffit à dire si la règle est atteinte.
+
+Les IP sont rangées de la moins récemment active à la plus active :
+- une IP sans échec depuis ``fenetre`` secondes ne peut plus déclencher la
+  règle, elle est oubliée ;
+- au-delà de ``max_ips``, la moins récemment active est oubliée.
+
+Chaque événement coûte O(1) (amorti) et la mémoire est plafonnée, même
+face à un botnet qui utilise des millions d'IP sources différentes.
+"""
+
+from array import array
+from collections import OrderedDict
+
+from .extraction import SEUIL_ECHECS
+
+FENETRE_SECONDES = 300
+MAX_IPS_SUIVIES = 100_000
+
+
+class DetecteurFenetre:
+    """« ``seuil`` échecs d'une IP en moins de ``fenetre`` secondes »."""
+
+    def __init__(self, seuil=SEUIL_ECHECS, fenetre=FENETRE_SECONDES, max_ips=MAX_IPS_SUIVIES):
+        if seuil < 1:
+            raise ValueError("seuil doit être >= 1")
+        self.seuil = seuil
+        self.fenetre = fenetre
+        self.max_ips = max_ips
+        # ip -> anneau : [nombre d'échecs écrits, t_1, ..., t_seuil]
+        self._anneaux = OrderedDict()
+        self._maintenant = None
+        self.ips_oubliees = 0
+
+    def __len__(self):
+        return len(self._anneaux)
+
+    def _dernier(self, anneau):
+        return anneau[(anneau[0] - 1) % self.seuil + 1]
+
+    def ajouter(self, ip, horodatage):
+        """
+        Enregistre un échec de ``ip`` à ``horodatage`` (secondes).
+        Renvoie True si l'IP atteint le seuil dans la fenêtre.
+        """
+        if self._maintenant is None or horodatage > self._maintenant:
+            self._maintenant = horodatage
+
+        anneau = self._anneaux.get(ip)
+        if anneau is None:
+            if len(self._anneaux) >= self.max_ips:
+                self._anneaux.popitem(last=False)
+                self.ips_oubliees += 1
+            anneau = array("q", [0] * (self.seuil + 1))
+            self._anneaux[ip] = anneau
+        else:
+            self._anneaux.move_to_end(ip)
+
+        anneau[anneau[0] % self.seuil + 1] = horodatage
+        anneau[0] += 1
+        self._expirer()
+
+        if anneau[0] < self.seuil:
+            return False
+        # La case suivante contient le plus ancien des ``seuil`` derniers échecs
+        plus_ancien = anneau[anneau[0] % self.seuil + 1]
+        return horodatage - plus_ancien <= self.fenetre
+
+    def charger(self, ip, horodatages):
+        """
+        Reprend les derniers échecs connus de ``ip`` (par exemple relus d'un
+        MagasinReputation au redémarrage), sans lever d'alerte.
+        """
+        for horodatage in sorted(horodatages)[-self.seuil:]:
+            if self._maintenant is None or horodatage > self._maintenant:
+                self._maintenant = horodatage
+            anneau = self._anneaux.get(ip)
+            if anneau is None:
+                if len(self._anneaux) >= self.max_ips:
+                    self._anneaux.popitem(last=False)
+                    self.ips_oubliees += 1
+                anneau = self._anneaux[ip] = array("q", [0] * (self.seuil + 1))
+            anneau[anneau[0] % self.seuil + 1] = horodatage
+            anneau[0] += 1
+        if ip in self._anneaux:
+            self._anneaux.move_to_end(ip)
+
+    def _expirer(self):
+        limite = self._maintenant - self.fenetre
+        anneaux = self._anneaux
+        while anneaux:
+            ip, anneau = next(iter(anneaux.items()))
+            if self._dernier(anneau) >= limite:
+                break
+            del anneaux[ip]
+            self.ips_oubliees += 1
+
+    def oublier(self, ip):
+        """Efface les échecs de ``ip`` (par exemple une fois l'alerte levée)."""
+        self._anneaux.pop(ip, None)
+
+    def echecs_recents(self, ip, maintenant=None):
+        """
+        Nombre d'échecs de ``ip`` dans la fenêtre qui se termine à ``maintenant``
+        (par défaut, le plus récent échec vu), au plus ``seuil``.
+        """
+        anneau = self._anneaux.get(ip)
+        if anneau is None:
+            return 0
+        if maintenant is None:
+            maintenant = self._maintenant
+        limite = maintenant - self.fenetre
+        valeurs = anneau[1:] if anneau[0] >= self.seuil else anneau[1:anneau[0] + 1]
+        return sum(1 for t in valeurs if t >= limite)
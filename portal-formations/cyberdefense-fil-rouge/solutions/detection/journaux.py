@@ -0,0 +1,80 @@
+"""
+Ensembles de journaux : motif glob ou liste de fichiers, compressés ou non.
+
+Sur un serveur, l'historique ressemble à :
+
+    auth.log  auth.log.1  auth.log.2.gz  auth.log.3.gz ...
+
+``developper`` transforme un chemin, un motif (``data/auth.log*``) ou une
+liste en fichiers rangés du plus ancien au plus récent (``.3.gz`` avant
+``.2.gz``, avant ``.1``, avant ``auth.log``). ``ouvrir`` reconnaît gzip, bzip2
+et xz à leurs premiers octets et les décompresse au fil de la lecture : une
+semaine d'historique s'analyse sans rien décompresser sur le disque.
+"""
+
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+import re
+
+# Premiers octets -> fonction d'ouverture
+SIGNATURES = (
+    (b"\x1f\x8b", gzip.open),
+    (b"BZh", bz2.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+)
+_ROTATION = re.compile(r"^(?P<base>.*?)(?:\.(?P<numero>\d+))?(?:\.(?:gz|bz2|xz|lzma))?$")
+
+
+def _ouvreur(chemin):
+    with open(chemin, "rb") as fichier:
+        debut = fichier.read(6)
+    for signature, ouvreur in SIGNATURES:
+        if debut.startswith(signature):
+            return ouvreur
+    return None
+
+
+def est_compresse(chemin):
+    return _ouvreur(chemin) is not None
+
+
+def ouvrir(chemin, texte=False):
+    """Ouvre un journal, compressé ou non, en binaire (ou en texte UTF-8 si ``texte``)."""
+    ouvreur = _ouvreur(chemin)
+    if ouvreur is None:
+        if texte:
+            return open(chemin, "r", encoding="utf-8", errors="replace")
+        return open(chemin, "rb")
+    fichier = ouvreur(chemin, "rb")
+    if texte:
+        return io.TextIOWrapper(fichier, encoding="utf-8", errors="replace")
+    return fichier
+
+
+def ordre_chronologique(chemin):
+    """Clé de tri : par série (dossier, nom de base), puis du numéro de rotation le plus grand au plus petit."""
+    correspondance = _ROTATION.match(os.path.basename(chemin))
+    numero = int(correspondance["numero"]) if correspondance["numero"] else 0
+    return os.path.dirname(chemin), correspondance["base"], -numero
+
+
+def developper(journaux):
+    """Chemin, motif glob ou liste des deux -> fichiers, du plus ancien au plus récent."""
+    if isinstance(journaux, (str, os.PathLike)):
+        journaux = [journaux]
+    chemins = []
+    for motif in journaux:
+        motif = os.fspath(motif)
+        if any(caractere in motif for caractere in "*?["):
+            trouves = glob.glob(motif)
+            if not trouves:
+                raise FileNotFoundError(f"Aucun fichier ne correspond à {motif}")
+            # Les fichiers de travail (état, index, point de reprise) ne sont pas des journaux
+            chemins.extend(c for c in trouves if os.path.isfile(c) and not c.endswith((".etat", ".tmp")))
+        else:
+            chemins.append(motif)
+    return sorted(dict.fromkeys(chemins), key=ordre_chronologique)
@@ -0,0 +1,251 @@
+"""
+Métriques de la surveillance, au format texte de Prometheus.
+
+- ``Compteur`` : ne fait que croître (lignes lues, alertes...) ;
+- ``Jauge`` : valeur instantanée, fixée par ``definir`` ou calculée au moment
+  de l'export par une fonction (octets non lus, taille de la file) : rien
+  n'est fait dans la boucle de traitement ;
+- ``Histogramme`` : répartition de durées dans des tranches fixes.
+
+Côté boucle chaude, une mesure coûte une addition sur un attribut. Les
+durées des règles sont chronométrées sur une ligne sur ``echantillon``
+(``ChronoRegles``) : le reste des lignes ne paie qu'un décompte.
+
+Le registre s'exporte dans un fichier (collecteur « textfile » de
+node_exporter, réécrit de façon atomique) ou sur un point HTTP local :
+
+    registre = Registre()
+    lues = registre.compteur("detection_lignes_lues_total", "Lignes lues")
+    registre.servir(9108)            # http://127.0.0.1:9108/metrics
+    ...
+    lues.ajouter()
+"""
+
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tranches des durées par ligne (secondes) : de 1 µs à 10 ms
+TRANCHES_DUREE = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+ECHANTILLON = 64           # une ligne chronométrée sur 64
+PERIODE_ECRITURE = 10.0    # secondes entre deux écritures du fichier
+
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquettes(etiquettes):
+    if not etiquettes:
+        return ""
+    return "{" + ",".join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in etiquettes) + "}"
+
+
+def _nombre(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    if isinstance(valeur, float) and valeur.is_integer() and abs(valeur) < 1e15:
+        return str(int(valeur))
+    return repr(valeur)
+
+
+class Compteur:
+    TYPE = "counter"
+    __slots__ = ("etiquettes", "valeur")
+
+    def __init__(self, etiquettes=()):
+        self.etiquettes = etiquettes
+        self.valeur = 0
+
+    def ajouter(self, n=1):
+        self.valeur += n
+
+    def lignes(self, nom):
+        yield f"{nom}{_etiquettes(self.etiquettes)} {_nombre(self.valeur)}"
+
+
+class Jauge:
+    TYPE = "gauge"
+    __slots__ = ("etiquettes", "valeur", "fonction")
+
+    def __init__(self, etiquettes=(), fonction=None):
+        self.etiquettes = etiquettes
+        self.valeur = 0
+        self.fonction = fonction
+
+    def definir(self, valeur):
+        self.valeur = valeur
+
+    def lignes(self, nom):
+        valeur = self.valeur
+        if self.fonction is not None:
+            try:
+                valeur = self.fonction()
+            except (OSError, ValueError):
+                return  # fichier en pleine rotation : la série est omise de cet export
+        yield f"{nom}{_etiquettes(self.etiquettes)} {_nombre(valeur)}"
+
+
+class Histogramme:
+    TYPE = "histogram"
+    __slots__ = ("etiquettes", "tranches", "comptes", "somme")
+
+    def __init__(self, etiquettes=(), tranches=TRANCHES_DUREE):
+        self.etiquettes = etiquettes
+        self.tranches = tuple(sorted(tranches))
+        # Une case par tranche, plus la dernière pour « au-delà »
+        self.comptes = [0] * (len(self.tranches) + 1)
+        self.somme = 0.0
+
+    def observer(self, valeur):
+        self.comptes[bisect.bisect_left(self.tranches, valeur)] += 1
+        self.somme += valeur
+
+    def lignes(self, nom):
+        cumul = 0
+        for borne, compte in zip(self.tranches + (float("inf"),), self.comptes):
+            cumul += compte
+            etiquettes = self.etiquettes + (("le", _nombre(float(borne))),)
+            yield f"{nom}_bucket{_etiquettes(etiquettes)} {cumul}"
+        yield f"{nom}_sum{_etiquettes(self.etiquettes)} {_nombre(self.somme)}"
+        yield f"{nom}_count{_etiquettes(self.etiquettes)} {cumul}"
+
+
+class Registre:
+    """Ensemble des métriques exportées ; une série = un nom + des étiquettes."""
+
+    def __init__(self):
+        # nom -> (type, aide, {étiquettes: métrique})
+        self._familles = {}
+        self._verrou = threading.Lock()
+        self._serveur = None
+        self._ecrivain = None
+
+    def _obtenir(self, classe, nom, aide, etiquettes, **options):
+        cle = tuple(sorted(etiquettes.items()))
+        with self._verrou:
+            famille = self._familles.get(nom)
+            if famille is None:
+                famille = self._familles[nom] = (classe.TYPE, aide, {})
+            elif famille[0] != classe.TYPE:
+                raise ValueError(f"{nom} est déjà déclarée comme {famille[0]}")
+            series = famille[2]
+            if cle not in series:
+                series[cle] = classe(cle, **options)
+            return series[cle]
+
+    def compteur(self, nom, aide, **etiquettes):
+        return self._obtenir(Compteur, nom, aide, etiquettes)
+
+    def jauge(self, nom, aide, fonction=None, **etiquettes):
+        """``fonction()`` (si fournie) donne la valeur au moment de l'export."""
+        return self._obtenir(Jauge, nom, aide, etiquettes, fonction=fonction)
+
+    def histogramme(self, nom, aide, tranches=TRANCHES_DUREE, **etiquettes):
+        return self._obtenir(Histogramme, nom, aide, etiquettes, tranches=tranches)
+
+    def exporter(self):
+        """Toutes les séries, au format texte de Prometheus (version 0.0.4)."""
+        with self._verrou:
+            familles = [(nom, type_, aide, list(series.values()))
+                        for nom, (type_, aide, series) in self._familles.items()]
+        sortie = []
+        for nom, type_, aide, series in familles:
+            sortie.append(f"# HELP {nom} {aide}")
+            sortie.append(f"# TYPE {nom} {type_}")
+            for serie in series:
+                sortie.extend(serie.lignes(nom))
+        return "\n".join(sortie) + "\n"
+
+    # --- export ----------------------------------------------------------
+
+    def ecrire(self, chemin):
+        """Écriture atomique (le collecteur ne lit jamais un fichier à moitié écrit)."""
+        temporaire = chemin + ".tmp"
+        with open(temporaire, "w", encoding="utf-8") as fichier:
+            fichier.write(self.exporter())
+        os.replace(temporaire, chemin)
+
+    def ecrire_periodiquement(self, chemin, periode=PERIODE_ECRITURE):
+        """Réécrit ``chemin`` toutes les ``periode`` secondes, depuis un thread dédié."""
+        arret = threading.Event()
+
+        def boucle():
+            while not arret.wait(periode):
+                self.ecrire(chemin)
+
+        thread = threading.Thread(target=boucle, name="metriques-fichier", daemon=True)
+        thread.start()
+        self._ecrivain = (chemin, arret, thread)
+
+    def servir(self, port, hote="127.0.0.1"):
+        """Sert ``/metrics`` sur ``hote:port`` depuis un thread dédié ; renvoie le serveur."""
+        registre = self
+
+        class Requete(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                corps = registre.exporter().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass  # pas une ligne par interrogation dans la console
+
+        self._serveur = ThreadingHTTPServer((hote, port), Requete)
+        self._serveur.daemon_threads = True
+        threading.Thread(target=self._serveur.serve_forever, name="metriques-http", daemon=True).start()
+        return self._serveur
+
+    def fermer(self):
+        """Arrête le serveur et le thread d'écriture (le fichier est écrit une dernière fois)."""
+        if self._serveur is not None:
+            self._serveur.shutdown()
+            self._serveur.server_close()
+            self._serveur = None
+        if self._ecrivain is not None:
+            chemin, arret, thread = self._ecrivain
+            arret.set()
+            thread.join()
+            self.ecrire(chemin)
+            self._ecrivain = None
+
+
+class ChronoRegles:
+    """
+    Durée d'évaluation de chaque règle, chronométrée sur une ligne sur
+    ``echantillon`` :
+
+        mesurer = chrono.ligne()          # True une fois sur ``echantillon``
+        if mesurer: debut = time.perf_counter()
+        ...
+        if mesurer: chrono.observer("force_brute", time.perf_counter() - debut)
+    """
+
+    def __init__(self, registre, echantillon=ECHANTILLON, nom="detection_duree_regle_secondes"):
+        self.registre = registre
+        self.echantillon = echantillon
+        self.nom = nom
+        self._restant = 1
+        self._histogrammes = {}
+
+    def ligne(self):
+        self._restant -= 1
+        if self._restant:
+            return False
+        self._restant = self.echantillon
+        return True
+
+    def observer(self, regle, secondes):
+        histogramme = self._histogrammes.get(regle)
+        if histogramme is None:
+            histogramme = self._histogrammes[regle] = self.registre.histogramme(
+                self.nom, f"Durée d'évaluation d'une ligne par règle (1 ligne sur {self.echantillon})", regle=regle
+            )
+        histogramme.observer(secondes)
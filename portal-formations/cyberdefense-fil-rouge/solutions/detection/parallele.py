@@ -0,0 +1,230 @@
+"""
+Analyse d'un gros journal sur plusieurs cœurs.
+
+Un fichier texte seul est découpé en plages d'octets qui commencent toutes
+au début d'une ligne ; chaque processus analyse sa plage et renvoie des
+statistiques partielles, fusionnées ensuite dans l'ordre du fichier.
+
+Un ensemble de journaux (rotation, fichiers compressés, qu'on ne peut pas
+découper sans tout décompresser) est réparti à raison d'un fichier par
+tâche, fusionné du plus ancien au plus récent.
+
+Les règles des étapes 4 et 5 se répartissent de la même façon
+(``echecs_paralleles`` puis ``alertes_paralleles``) : chaque processus
+renvoie les alertes de sa tâche, remises dans l'ordre des tâches. La mémoire
+est celle des alertes d'au plus ``processus`` + 1 tâches à la fois : des
+plages de quelques Mo d'un fichier texte seul, mais un fichier entier par
+tâche pour un ensemble de journaux.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .extraction import analyser_ligne
+from .journaux import developper, est_compresse, ouvrir
+from .pipeline import juger_avec_totaux
+from .prefiltre import compter_echecs_par_ip
+from .rapport import StatistiquesRapport
+
+# Position d'une ligne = n° du fichier x DECALAGE_FICHIER + octet dans le fichier décompressé
+DECALAGE_FICHIER = 1 << 48
+# Règles (étapes 4 et 5) : un fichier texte seul est découpé en plages d'environ
+# OCTETS_PAR_TACHE, pour que les alertes en attente de chaque tâche restent petites
+OCTETS_PAR_TACHE = 4 << 20
+
+
+def decouper(chemin, nombre):
+    """Découpe ``chemin`` en au plus ``nombre`` plages (début, fin) alignées sur les lignes."""
+    taille = os.path.getsize(chemin)
+    bornes = [0]
+    with open(chemin, "rb") as fichier:
+        for i in range(1, nombre):
+            cible = taille * i // nombre
+            if cible <= bornes[-1]:
+                continue
+            # Se placer juste avant la cible puis finir la ligne en cours :
+            # si la cible est déjà un début de ligne, on y reste
+            fichier.seek(cible - 1)
+            fichier.readline()
+            borne = fichier.tell()
+            if bornes[-1] < borne < taille:
+                bornes.append(borne)
+    bornes.append(taille)
+    return [(debut, fin) for debut, fin in zip(bornes, bornes[1:]) if debut < fin]
+
+
+def lignes_plage(chemin, debut, fin):
+    """(position, ligne) des lignes qui commencent dans [debut, fin[ (position = octet de début)."""
+    with open(chemin, "rb") as fichier:
+        fichier.seek(debut)
+        position = debut
+        for brute in fichier:
+            if position >= fin:
+                break
+            yield position, brute.decode("utf-8", errors="replace").strip()
+            position += len(brute)
+
+
+def lignes_fichier(chemin, decalage=0):
+    """(position, ligne) de tout un fichier, compressé ou non (position = ``decalage`` + octet)."""
+    position = decalage
+    with ouvrir(chemin) as fichier:
+        for brute in fichier:
+            yield position, brute.decode("utf-8", errors="replace").strip()
+            position += len(brute)
+
+
+def _statistiques(lignes, plage_heures, fabrique):
+    statistiques = fabrique(plage_heures)
+    for position, ligne in lignes:
+        statistiques.ajouter(analyser_ligne(ligne), position)
+    return statistiques
+
+
+def statistiques_plage(chemin, debut, fin, plage_heures=None, fabrique=StatistiquesRapport):
+    """
+    Statistiques des lignes qui commencent dans [debut, fin[ (position = octet
+    de début). ``fabrique(plage_heures)`` crée l'objet de statistiques.
+    """
+    return _statistiques(lignes_plage(chemin, debut, fin), plage_heures, fabrique)
+
+
+def statistiques_fichier(chemin, decalage=0, plage_heures=None, fabrique=StatistiquesRapport):
+    """Statistiques d'un fichier entier, compressé ou non (position = ``decalage`` + octet)."""
+    return _statistiques(lignes_fichier(chemin, decalage), plage_heures, fabrique)
+
+
+def _statistiques_plage(args):
+    return statistiques_plage(*args)
+
+
+def _statistiques_fichier(args):
+    return statistiques_fichier(*args)
+
+
+def _taches(chemins, processus):
+    """(fonction, arguments) de chaque tâche : plages d'un fichier texte seul, sinon un fichier par tâche."""
+    if len(chemins) == 1 and not est_compresse(chemins[0]):
+        nombre = max(processus, -(-os.path.getsize(chemins[0]) // OCTETS_PAR_TACHE))
+        return [(lignes_plage, (chemins[0], d, f)) for d, f in decouper(chemins[0], nombre)]
+    return [(lignes_fichier, (c, i * DECALAGE_FICHIER)) for i, c in enumerate(chemins)]
+
+
+def statistiques_paralleles(journaux, processus=None, plage_heures=None, fabrique=StatistiquesRapport):
+    """
+    Statistiques de tout le journal (ou de l'ensemble de journaux), calculées
+    par ``processus`` processus. ``fabrique`` doit pouvoir être envoyée aux
+    processus (classe, ou ``functools.partial`` d'une classe).
+    """
+    processus = processus or os.cpu_count() or 1
+    chemins = developper(journaux)
+    if len(chemins) == 1 and not est_compresse(chemins[0]):
+        taches = [(chemins[0], d, f, plage_heures, fabrique) for d, f in decouper(chemins[0], processus)]
+        calcul = _statistiques_plage
+    else:
+        taches = [(c, i * DECALAGE_FICHIER, plage_heures, fabrique) for i, c in enumerate(chemins)]
+        calcul = _statistiques_fichier
+    total = fabrique(plage_heures)
+    with ProcessPoolExecutor(max_workers=min(processus, len(taches)) or 1) as executeur:
+        # map() rend les résultats dans l'ordre des tâches : fusion dans l'ordre des fichiers
+        for partielles in executeur.map(calcul, taches):
+            total.fusionner(partielles)
+    return total
+
+
+# --- étapes 4 et 5 : règles de détection -----------------------------------
+
+def echecs_paralleles(journaux, processus=None):
+    """{ip: nombre d'échecs} de l'ensemble de journaux, un fichier par processus (préfiltre)."""
+    processus = processus or os.cpu_count() or 1
+    chemins = developper(journaux)
+    echecs_par_ip = {}
+    with ProcessPoolExecutor(max_workers=min(processus, len(chemins)) or 1) as executeur:
+        # Fusion dans l'ordre des fichiers : mêmes clés, dans le même ordre, qu'en séquentiel
+        for echecs in executeur.map(compter_echecs_par_ip, chemins):
+            for ip, nombre in echecs.items():
+                echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + nombre
+    return echecs_par_ip
+
+
+# Règles de chaque processus : (moteur, echecs_par_ip, évaluateur court-circuit ou None)
+_regles = None
+
+
+def _preparer_regles(fichier_regles, semantique, echecs_par_ip, court_circuit):
+    global _regles
+    # Importé ici : le rapport parallèle (étape 7) n'a pas besoin de NumPy
+    from .regles import MoteurRegles
+
+    moteur = MoteurRegles.depuis_fichier(fichier_regles, semantique=semantique)
+    evaluateur = moteur.court_circuit(echecs_par_ip) if court_circuit else None
+    _regles = (moteur, echecs_par_ip, evaluateur)
+
+
+def _alertes(tache):
+    """
+    Alertes d'une tâche : (lignes jointes par "\n", positions, Verdict), et
+    les mesures de l'évaluateur court-circuit. Un seul texte s'envoie bien
+    plus vite d'un processus à l'autre qu'un Evenement par alerte.
+    """
+    from .regles import evaluer_par_lots
+
+    lire, arguments = tache
+    moteur, echecs_par_ip, evaluateur = _regles
+    lignes, positions, verdicts = [], [], []
+    if evaluateur is None:
+        evenements = (analyser_ligne(ligne, position) for position, ligne in lire(*arguments))
+        jugements = juger_avec_totaux(evenements, echecs_par_ip, moteur.seuil_echecs)
+        for evenement, verdict in evaluer_par_lots(jugements, moteur):
+            lignes.append(evenement.ligne)
+            positions.append(evenement.numero)
+            verdicts.append(verdict)
+        return ("\n".join(lignes), positions, verdicts), None
+    for position, ligne in lire(*arguments):
+        verdict = evaluateur.evaluer(ligne)
+        if verdict is not None:
+            lignes.append(ligne)
+            positions.append(position)
+            verdicts.append(verdict)
+    return ("\n".join(lignes), positions, verdicts), evaluateur.relever()
+
+
+def alertes_paralleles(journaux, fichier_regles, semantique, echecs_par_ip, processus=None, evaluateur=None):
+    """
+    (evenement, Verdict) de chaque alerte, dans l'ordre du fichier (ou des
+    fichiers), les règles étant évaluées par ``processus`` processus ;
+    ``evenement.numero`` est la position de la ligne, comme dans
+    ``statistiques_paralleles``.
+
+    Les règles (``fichier_regles``, ``semantique``) et les totaux
+    ``echecs_par_ip`` sont envoyés une fois à chaque processus. Sans
+    ``evaluateur``, elles sont évaluées par lots (``regles.evaluer_par_lots``) ;
+    avec un ``EvaluateurCourtCircuit``, ligne à ligne, et les mesures des
+    processus s'ajoutent aux siennes (``selectivite()``).
+    """
+    processus = processus or os.cpu_count() or 1
+    taches = _taches(developper(journaux), processus)
+    with ProcessPoolExecutor(
+        max_workers=min(processus, len(taches)) or 1,
+        initializer=_preparer_regles,
+        initargs=(fichier_regles, semantique, echecs_par_ip, evaluateur is not None),
+    ) as executeur:
+        # Au plus ``processus`` tâches soumises d'avance : les alertes
+        # calculées attendent leur tour sans s'accumuler en mémoire
+        en_cours = deque()
+        for tache in taches:
+            en_cours.append(executeur.submit(_alertes, tache))
+            if len(en_cours) > processus:
+                yield from _recevoir(en_cours.popleft(), evaluateur)
+        while en_cours:
+            yield from _recevoir(en_cours.popleft(), evaluateur)
+
+
+def _recevoir(futur, evaluateur):
+    (texte, positions, verdicts), releve = futur.result()
+    if evaluateur is not None:
+        evaluateur.cumuler(releve)
+    # Seules les lignes d'alerte sont redécoupées ici
+    for position, ligne, verdict in zip(positions, texte.split("\n"), verdicts):
+        yield analyser_ligne(ligne, position), verdict
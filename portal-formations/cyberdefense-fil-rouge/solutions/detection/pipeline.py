@@ -0,0 +1,76 @@
+"""
+Pipeline de détection en flux : lecture → analyse → comptage → règles → alertes.
+
+Chaque étape est un générateur : le journal est lu ligne par ligne, sans
+jamais être chargé entièrement en mémoire (pas de ``readlines()``).
+
+La règle « IP avec 5+ échecs » dépend du total d'échecs de l'IP sur tout le
+journal. Les étapes 4 et 5 lisent donc le journal deux fois : les échecs
+sont comptés d'abord (``prefiltre.compter_echecs_par_ip``, un compteur par
+IP), puis chaque ligne est jugée dans l'ordre du fichier :
+
+    echecs_par_ip = compter_echecs_par_ip("data/auth.log")
+    evenements = analyser(lire_lignes("data/auth.log"))
+    for evenement, raison in appliquer_regles(evenements, est_suspect, echecs_par_ip):
+        print(f"[{raison}] {evenement.ligne}")
+
+Les règles elles-mêmes peuvent être évaluées par lots avec
+``regles.evaluer_par_lots(juger_avec_totaux(evenements, echecs_par_ip), moteur)``.
+
+Il n'y a pas de variante en une seule lecture : pour juger une ligne sans
+connaître le total final de son IP, il faudrait garder en attente les lignes
+de toutes les IP encore sous le seuil, soit presque tout le journal, et les
+alertes ne sortiraient plus dans l'ordre du fichier. Un flux qu'on ne peut
+pas relire (suivi en continu, étape 6) utilise plutôt une fenêtre glissante
+(``fenetre.DetecteurFenetre``).
+"""
+
+from .extraction import SEUIL_ECHECS, analyser_ligne
+from .journaux import developper, ouvrir
+
+
+def lire_lignes(journaux):
+    """
+    Produit les lignes une par une, sans le retour à la ligne. ``journaux`` :
+    un fichier, un motif glob ou une liste (voir ``journaux.developper`` ;
+    les fichiers compressés sont décompressés à la volée).
+    """
+    for chemin in developper(journaux):
+        with ouvrir(chemin, texte=True) as fichier:
+            for ligne in fichier:
+                yield ligne.strip()
+
+
+def analyser(lignes):
+    """Transforme chaque ligne brute en Evenement (un seul découpage par ligne)."""
+    for numero, ligne in enumerate(lignes):
+        yield analyser_ligne(ligne, numero)
+
+
+def juger_avec_totaux(evenements, echecs_par_ip, seuil=SEUIL_ECHECS):
+    """
+    Produit, pour chaque événement, le couple ``(evenement, ip_suspecte)`` ;
+    ``ip_suspecte`` vaut True si l'IP totalise au moins ``seuil`` échecs.
+    ``echecs_par_ip`` contient les totaux de tout le journal (par exemple
+    comptés par ``prefiltre.compter_echecs_par_ip``) : le verdict est
+    immédiat et les événements sortent dans l'ordre du fichier.
+    """
+    for evenement in evenements:
+        ip = evenement.ip
+        yield evenement, bool(ip) and echecs_par_ip.get(ip, 0) >= seuil
+
+
+def _evaluer(jugements, evaluer):
+    for evenement, ip_suspecte in jugements:
+        resultat = evaluer(evenement, ip_suspecte)
+        if resultat is not None:
+            yield evenement, resultat
+
+
+def appliquer_regles(evenements, evaluer, echecs_par_ip, seuil=SEUIL_ECHECS):
+    """
+    Applique ``evaluer(evenement, ip_suspecte)`` (résultat de l'alerte ou
+    ``None``) aux jugements de ``juger_avec_totaux`` ; produit
+    ``(evenement, resultat)``.
+    """
+    return _evaluer(juger_avec_totaux(evenements, echecs_par_ip, seuil), evaluer)
@@ -0,0 +1,68 @@
+"""
+Préfiltre octet par octet : ne décoder que les lignes d'échec.
+
+La plupart des lignes d'un journal sont des succès. Plutôt que de décoder et
+découper chaque ligne en Python, on projette le fichier en mémoire (mmap) et
+on saute d'une occurrence de ``STATUS=FAIL`` à la suivante avec
+``mmap.find``, qui s'exécute en C. Seules les lignes trouvées sont décodées
+puis analysées.
+
+Les fichiers compressés ne peuvent pas être projetés : ils sont lus en flux
+et le motif est cherché dans chaque ligne (toujours sans la décoder).
+"""
+
+import mmap
+
+from .extraction import analyser_ligne
+from .journaux import developper, est_compresse, ouvrir
+
+MOTIF_ECHEC = b"STATUS=FAIL"
+
+
+def lignes_contenant(chemin, motif=MOTIF_ECHEC):
+    """Produit, dans l'ordre du fichier, les lignes (str) qui contiennent ``motif``."""
+    if est_compresse(chemin):
+        # Pas de mmap sur un flux compressé : lecture ligne à ligne
+        with ouvrir(chemin) as fichier:
+            for brute in fichier:
+                if motif in brute:
+                    yield brute.decode("utf-8", errors="replace").strip()
+        return
+    with open(chemin, "rb") as fichier:
+        if fichier.seek(0, 2) == 0:
+            return  # mmap refuse les fichiers vides
+        with mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ) as donnees:
+            taille = len(donnees)
+            trouve = donnees.find(motif)
+            while trouve != -1:
+                debut = donnees.rfind(b"\n", 0, trouve) + 1
+                fin = donnees.find(b"\n", trouve)
+                if fin == -1:
+                    fin = taille
+                yield donnees[debut:fin].decode("utf-8", errors="replace").strip()
+                trouve = donnees.find(motif, fin)
+
+
+def evenements_echec(journaux):
+    """
+    Evenement de chaque échec (``numero`` = rang parmi les échecs) ;
+    ``journaux`` : fichier, motif glob ou liste, du plus ancien au plus récent.
+    """
+    numero = 0
+    for chemin in developper(journaux):
+        for ligne in lignes_contenant(chemin):
+            evenement = analyser_ligne(ligne, numero)
+            # Le motif peut apparaître ailleurs que dans STATUS (ex. STATUS=FAILED)
+            if evenement.echec:
+                yield evenement
+                numero += 1
+
+
+def compter_echecs_par_ip(journaux):
+    """{ip: nombre d'échecs} sans décoder les lignes de succès."""
+    echecs_par_ip = {}
+    for evenement in evenements_echec(journaux):
+        ip = evenement.ip
+        if ip:
+            echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + 1
+    return echecs_par_ip
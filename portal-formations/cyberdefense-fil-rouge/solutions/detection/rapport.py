@@ -0,0 +1,292 @@
+"""
+Statistiques du rapport de sécurité (étape 7), calculables par morceaux.
+
+Une ligne est une alerte si son IP totalise 5+ échecs, si elle est hors
+heures ou si elle vise ``admin``. Les deux dernières règles ne dépendent que
+de la ligne ; la première dépend du total de l'IP sur tout le journal. Les
+lignes qui ne seraient suspectes que par leur IP sont donc comptées à part,
+par IP, et ajoutées au rapport à la fin si l'IP atteint le seuil.
+
+Les IP sont comptées sous forme d'entiers (voir ``adresses``).
+
+Ainsi, des StatistiquesRapport calculées sur des morceaux du journal se
+fusionnent exactement (``fusionner``), dans l'ordre du fichier, et donnent
+le même rapport qu'une lecture séquentielle.
+"""
+
+import heapq
+from datetime import datetime
+
+from .adresses import agreger_par_reseau, entier_vers_ip, ip_vers_entier, top_k
+from .extraction import SEUIL_ECHECS, hors_heures
+
+TOP_N = 5
+
+
+def _compter(compteurs, cle, position, nombre=1):
+    """compteurs[cle] = [nombre, première position] (position = ordre dans le fichier)."""
+    valeur = compteurs.get(cle)
+    if valeur is None:
+        compteurs[cle] = [nombre, position]
+    else:
+        valeur[0] += nombre
+        if position < valeur[1]:
+            valeur[1] = position
+
+
+def _fusionner_compteurs(compteurs, autres):
+    for cle, (nombre, position) in autres.items():
+        _compter(compteurs, cle, position, nombre)
+
+
+def _ordre(element):
+    cle, (nombre, position) = element
+    return -nombre, position
+
+
+def _trier(compteurs, k=None):
+    """Par nombre décroissant, les ex-aequo dans l'ordre du fichier ; les ``k`` premiers."""
+    if k is None:
+        tries = sorted(compteurs.items(), key=_ordre)
+    else:
+        tries = heapq.nsmallest(k, compteurs.items(), key=_ordre)
+    return [(cle, n) for cle, (n, _) in tries]
+
+
+class ActiviteSuspecte:
+    """Alertes comptées par heure et par utilisateur."""
+
+    __slots__ = ("alertes", "heures", "users")
+
+    def __init__(self):
+        self.alertes = 0
+        self.heures = {}
+        self.users = {}
+
+    def ajouter(self, evenement, position):
+        self.alertes += 1
+        if evenement.heure is not None:
+            _compter(self.heures, evenement.heure, position)
+        if evenement.user:
+            _compter(self.users, evenement.user, position)
+
+    def fusionner(self, autre):
+        self.alertes += autre.alertes
+        _fusionner_compteurs(self.heures, autre.heures)
+        _fusionner_compteurs(self.users, autre.users)
+
+    def etat(self):
+        """Contenu sérialisable en JSON (listes de triplets : les heures sont des clés entières)."""
+        return {
+            "alertes": self.alertes,
+            "heures": [[heure, n, position] for heure, (n, position) in self.heures.items()],
+            "users": [[user, n, position] for user, (n, position) in self.users.items()],
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        activite = cls()
+        activite.alertes = int(etat["alertes"])
+        activite.heures = {int(heure): [int(n), int(position)] for heure, n, position in etat["heures"]}
+        activite.users = {str(user): [int(n), int(position)] for user, n, position in etat["users"]}
+        return activite
+
+
+class EchecsExacts:
+    """
+    Chiffres du rapport tirés d'un dictionnaire exact ``echecs_par_ip``
+    (voir esquisses.StatistiquesEsquisses pour la version approchée).
+    """
+
+    approximatif = False
+
+    def nombre_echecs(self):
+        return sum(self.echecs_par_ip.values())
+
+    def nombre_ips(self):
+        return len(self.echecs_par_ip)
+
+    def nombre_ips_au_seuil(self, seuil=SEUIL_ECHECS):
+        return sum(1 for n in self.echecs_par_ip.values() if n >= seuil)
+
+
+class StatistiquesRapport(EchecsExacts):
+    """
+    Agrégats du rapport, fusionnables d'un morceau de journal à l'autre.
+
+    ``plage_heures`` (ensemble d'heures, optionnel) restreint l'analyse aux
+    événements de ces heures.
+    """
+
+    def __init__(self, plage_heures=None):
+        self.plage_heures = plage_heures
+        self.echecs_par_ip = {}
+        # Alertes certaines (hors heures, admin)
+        self.certaines = ActiviteSuspecte()
+        # Alertes qui dépendent du total d'échecs de l'IP : ip -> ActiviteSuspecte
+        self.selon_ip = {}
+
+    def ajouter(self, evenement, position):
+        """Compte un événement ; ``position`` croît dans l'ordre du fichier."""
+        heure = evenement.heure
+        if self.plage_heures is not None and heure not in self.plage_heures:
+            return
+
+        ip = evenement.ip
+        if ip:
+            ip = ip_vers_entier(ip)
+            if evenement.echec:
+                self.echecs_par_ip[ip] = self.echecs_par_ip.get(ip, 0) + 1
+
+        if hors_heures(heure) or evenement.user == "admin":
+            self.certaines.ajouter(evenement, position)
+        elif ip:
+            activite = self.selon_ip.get(ip)
+            if activite is None:
+                activite = self.selon_ip[ip] = ActiviteSuspecte()
+            activite.ajouter(evenement, position)
+
+    def fusionner(self, autre):
+        """Ajoute les statistiques d'un morceau situé APRÈS celui-ci dans le fichier."""
+        for ip, nombre in autre.echecs_par_ip.items():
+            self.echecs_par_ip[ip] = self.echecs_par_ip.get(ip, 0) + nombre
+        self.certaines.fusionner(autre.certaines)
+        for ip, activite in autre.selon_ip.items():
+            if ip in self.selon_ip:
+                self.selon_ip[ip].fusionner(activite)
+            else:
+                self.selon_ip[ip] = activite
+        return self
+
+    def finaliser(self, seuil=SEUIL_ECHECS):
+        """Ajoute les alertes des IP qui atteignent le seuil ; renvoie l'activité totale."""
+        total = ActiviteSuspecte()
+        total.fusionner(self.certaines)
+        for ip, activite in self.selon_ip.items():
+            if self.echecs_par_ip.get(ip, 0) >= seuil:
+                total.fusionner(activite)
+        return total
+
+    def etat(self):
+        """Contenu sérialisable en JSON ; les clés d'IP (entiers ou texte) restent dans des listes."""
+        return {
+            "plage_heures": None if self.plage_heures is None else sorted(self.plage_heures),
+            "echecs_par_ip": [[ip, nombre] for ip, nombre in self.echecs_par_ip.items()],
+            "certaines": self.certaines.etat(),
+            "selon_ip": [[ip, activite.etat()] for ip, activite in self.selon_ip.items()],
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        plage_heures = etat["plage_heures"]
+        statistiques = cls(None if plage_heures is None else {int(h) for h in plage_heures})
+        statistiques.echecs_par_ip = {ip: int(nombre) for ip, nombre in etat["echecs_par_ip"]}
+        statistiques.certaines = ActiviteSuspecte.depuis_etat(etat["certaines"])
+        statistiques.selon_ip = {ip: ActiviteSuspecte.depuis_etat(activite) for ip, activite in etat["selon_ip"]}
+        return statistiques
+
+
+def plage_heures(texte):
+    """"22-6" -> {22, 23, 0, ..., 5} ; "8-18" -> {8, ..., 17} (fin exclue)."""
+    debut, _, fin = texte.partition("-")
+    debut = int(debut)
+    fin = int(fin) if fin else debut + 1
+    if not (0 <= debut < 24 and 0 <= fin <= 24):
+        raise ValueError(f"Plage d'heures invalide : {texte}")
+    if debut < fin:
+        return frozenset(range(debut, fin))
+    return frozenset(range(debut, 24)) | frozenset(range(0, fin))
+
+
+def statistiques_sequentielles(evenements, plage_heures=None, fabrique=StatistiquesRapport):
+    """Calcule les statistiques (``fabrique(plage_heures)``) en une passe sur un flux d'Evenement."""
+    statistiques = fabrique(plage_heures)
+    for evenement in evenements:
+        statistiques.ajouter(evenement, evenement.numero)
+    return statistiques
+
+
+def construire_rapport(statistiques, seuil=SEUIL_ECHECS, top=TOP_N, reseaux=None, genere_le=None):
+    """
+    Texte du rapport de sécurité. ``statistiques`` fournit ``echecs_par_ip``
+    (clés de ``adresses.ip_vers_entier``), les méthodes de ``EchecsExacts``
+    et ``finaliser(seuil)`` : StatistiquesRapport, colonnes.StatistiquesIndex
+    ou esquisses.StatistiquesEsquisses (chiffres approchés, marqués « ≈ »).
+
+    ``reseaux`` = (préfixe IPv4, préfixe IPv6) ajoute le classement des
+    sous-réseaux, par exemple (24, 64).
+    """
+    activite = statistiques.finaliser(seuil)
+    echecs_par_ip = statistiques.echecs_par_ip
+    if genere_le is None:
+        genere_le = datetime.now()
+    environ = "≈ " if statistiques.approximatif else ""
+
+    # Les IP avec le plus d'échecs (top N, par tas borné)
+    ip_triees = top_k(echecs_par_ip, top)
+
+    # Les heures avec le plus d'activité (top N)
+    heures_triees = _trier(activite.heures, top)
+
+    rapport = f"""
+{'='*60}
+RAPPORT DE SÉCURITÉ - ANALYSE GLOBALE
+{'='*60}
+
+📊 STATISTIQUES GÉNÉRALES
+{'─'*60}
+Nombre total d'alertes détectées : {environ}{activite.alertes}
+Nombre total d'échecs d'authentification : {statistiques.nombre_echecs()}
+Nombre d'IP distinctes : {environ}{statistiques.nombre_ips()}
+"""
+    if statistiques.approximatif:
+        rapport += f"Mode esquisses : {statistiques.description()}\n"
+        if statistiques.perdues:
+            rapport += (f"  (jusqu'à {statistiques.perdues} alertes de plus : lignes d'IP oubliées "
+                        f"avant d'atteindre le seuil)\n")
+    rapport += f"""
+🚨 TOP {top} DES IP LES PLUS SUSPECTES
+{'─'*60}
+"""
+    for i, (ip, nombre) in enumerate(ip_triees, 1):
+        rapport += f"{i}. {entier_vers_ip(ip)} : {nombre} échecs\n"
+
+    if reseaux is not None:
+        prefixe_v4, prefixe_v6 = reseaux
+        par_reseau = agreger_par_reseau(echecs_par_ip, prefixe_v4, prefixe_v6)
+        rapport += f"""
+🌐 TOP {top} DES SOUS-RÉSEAUX (/{prefixe_v4} en IPv4, /{prefixe_v6} en IPv6)
+{'─'*60}
+"""
+        for i, (nom, (nombre, nombre_ips)) in enumerate(top_k(par_reseau, top, lambda x: x[1][0]), 1):
+            rapport += f"{i}. {nom} : {nombre} échecs ({nombre_ips} IP)\n"
+
+    rapport += f"""
+⏰ TOP {top} DES HEURES AVEC ACTIVITÉ SUSPECTE
+{'─'*60}
+"""
+    for i, (heure, nombre) in enumerate(heures_triees, 1):
+        rapport += f"{i}. {heure}h00 : {nombre} événements suspects\n"
+
+    rapport += f"""
+👤 UTILISATEURS CIBLÉS
+{'─'*60}
+"""
+    if statistiques.approximatif:
+        rapport += f"  ({environ}{statistiques.users_distincts.estimer()} utilisateurs distincts, les plus visés ci-dessous)\n"
+    for user, nombre in _trier(activite.users):
+        rapport += f"  {user} : {nombre} tentatives suspectes\n"
+
+    rapport += f"""
+💡 RECOMMANDATIONS
+{'─'*60}
+1. Bloquer les IP avec 5+ échecs ({environ}{statistiques.nombre_ips_au_seuil(seuil)} IP concernées)
+2. Renforcer la sécurité du compte admin
+3. Surveiller particulièrement les heures {', '.join([str(h) for h, _ in heures_triees[:3]])}h
+4. Mettre en place une alerte automatique pour les connexions hors heures
+
+{'='*60}
+Rapport généré le : {genere_le.strftime('%Y-%m-%d %H:%M:%S')}
+{'='*60}
+"""
+    return rapport
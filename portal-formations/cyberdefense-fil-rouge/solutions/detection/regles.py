@@ -0,0 +1,420 @@
+"""
+Moteur de règles déclaratif, évalué par lots avec des masques NumPy.
+
+Les règles sont décrites dans un fichier JSON (voir ``regles_defaut.json``) :
+
+    {"nom": "HORS_HEURES", "type": "plage_horaire", "debut": 8, "fin": 18,
+     "niveau": "WARNING", "libelle": "Connexion hors heures normales"}
+
+Types de règles :
+- ``seuil_echecs`` (``seuil``) : l'IP totalise au moins ``seuil`` échecs
+  (une seule règle de ce type : le total de l'IP est jugé une fois par
+  ligne, avec ce seuil, voir ``pipeline.juger_avec_totaux``) ;
+- ``plage_horaire`` (``debut``, ``fin``) : connexion en dehors de [debut, fin[ ;
+- ``utilisateurs`` (``utilisateurs``) : compte visé dans la liste.
+
+Chaque règle est compilée en un prédicat qui prend un lot d'événements (des
+colonnes NumPy) et renvoie un masque booléen. Ajouter une règle ajoute une
+opération vectorisée par lot, pas de code Python par ligne.
+
+Sémantiques de correspondance :
+- ``premiere`` : la première règle qui correspond, dans l'ordre du fichier ;
+- ``toutes`` : toutes les règles qui correspondent (raisons jointes par
+  " | "), niveau = le plus sévère ;
+- ``severite_max`` : la règle la plus sévère (à égalité, la première).
+
+Quand les totaux d'échecs par IP sont connus d'avance (préfiltre), les
+règles peuvent aussi être évaluées ligne à ligne avec court-circuit
+(``EvaluateurCourtCircuit``, ``evaluer_en_flux``) :
+- chaque règle devient une recherche dans une table précalculée (24 heures,
+  ``frozenset`` des comptes surveillés, ensemble interné des IP au-delà du
+  seuil) ;
+- chaque règle ne lit dans la ligne brute que le champ dont elle a besoin :
+  une ligne tranchée par une règle bon marché ne paie ni l'extraction des
+  autres champs, ni la construction d'un Evenement ;
+- les règles sont essayées de la plus prioritaire à la moins prioritaire
+  et l'évaluation s'arrête à la première qui correspond (``premiere``,
+  ``severite_max``) : pour confirmer un verdict, toutes les règles plus
+  prioritaires doivent de toute façon être écartées, cet ordre est donc
+  celui qui en évalue le moins ;
+- la sélectivité et le coût de chaque règle sont mesurés au fil du flux
+  (``selectivite()``) : de quoi voir quelle règle coûte le plus, et
+  laquelle ne sert presque jamais.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover - dépend de l'environnement
+    raise ImportError("Le moteur de règles nécessite NumPy : pip install numpy") from exc
+
+from .extraction import SEUIL_ECHECS, analyser_ligne
+
+FICHIER_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regles_defaut.json")
+NIVEAUX = ("INFO", "WARNING", "CRITIQUE")
+SEMANTIQUES = ("premiere", "toutes", "severite_max")
+TAILLE_LOT = 4096
+ECHANTILLON_COUT = 64  # une ligne chronométrée sur 64
+
+# Résultat d'une évaluation : niveau, raison lisible, codes des règles déclenchées
+Verdict = namedtuple("Verdict", ["niveau", "raison", "codes"])
+
+Regle = namedtuple("Regle", ["nom", "libelle", "niveau", "champs", "predicat"])
+
+
+class Lot:
+    """Colonnes d'un lot d'événements (seulement celles dont les règles ont besoin)."""
+
+    __slots__ = ("taille", "heure", "user", "ip_suspecte")
+
+    def __init__(self, taille):
+        self.taille = taille
+        self.heure = self.user = self.ip_suspecte = None
+
+
+# --- compilation des règles ------------------------------------------------
+
+def _compiler_seuil_echecs(definition, moteur):
+    # Toutes les règles de ce type liraient la même colonne ip_suspecte,
+    # calculée avec un seul seuil : une deuxième règle serait jugée au mauvais seuil
+    if moteur.regle_seuil is not None:
+        raise ValueError(
+            f"Une seule règle seuil_echecs est possible ({moteur.regle_seuil} et {definition['nom']})"
+        )
+    moteur.regle_seuil = definition["nom"]
+    moteur.seuil_echecs = int(definition.get("seuil", SEUIL_ECHECS))
+    return ("ip_suspecte",), lambda lot: lot.ip_suspecte
+
+
+def _compiler_plage_horaire(definition, moteur):
+    debut, fin = int(definition["debut"]), int(definition["fin"])
+    # Table de 25 cases : index 0 = heure inconnue, puis 0h..23h
+    table = np.zeros(25, dtype=bool)
+    for heure in range(24):
+        table[heure + 1] = heure < debut or heure >= fin
+    return ("heure",), lambda lot: table[lot.heure + 1]
+
+
+def _compiler_utilisateurs(definition, moteur):
+    ids = np.array([moteur.surveiller_user(nom) for nom in definition["utilisateurs"]], dtype=np.int64)
+    return ("user",), lambda lot: np.isin(lot.user, ids)
+
+
+TYPES = {
+    "seuil_echecs": _compiler_seuil_echecs,
+    "plage_horaire": _compiler_plage_horaire,
+    "utilisateurs": _compiler_utilisateurs,
+}
+
+
+class MoteurRegles:
+    """Règles compilées + sémantique de correspondance."""
+
+    def __init__(self, config, semantique=None):
+        self.semantique = semantique or config.get("semantique", "premiere")
+        if self.semantique not in SEMANTIQUES:
+            raise ValueError(f"Sémantique inconnue : {self.semantique} (attendu : {', '.join(SEMANTIQUES)})")
+        self.seuil_echecs = SEUIL_ECHECS
+        self.regle_seuil = None  # nom de la règle seuil_echecs
+        # Seuls les comptes cités par une règle ont un id : la table ne grossit pas
+        self._ids_users = {}
+        self.regles = []
+        self.definitions = config["regles"]
+        for definition in config["regles"]:
+            type_regle = definition["type"]
+            if type_regle not in TYPES:
+                raise ValueError(f"Type de règle inconnu : {type_regle}")
+            niveau = definition.get("niveau", "WARNING")
+            if niveau not in NIVEAUX:
+                raise ValueError(f"Niveau inconnu : {niveau}")
+            champs, predicat = TYPES[type_regle](definition, self)
+            nom = definition["nom"]
+            self.regles.append(Regle(nom, definition.get("libelle", nom), niveau, champs, predicat))
+        if len(self.regles) > 62:
+            raise ValueError("62 règles au maximum")
+        self.champs = {champ for regle in self.regles for champ in regle.champs}
+        # Verdicts déjà construits, par code de correspondance
+        self._verdicts = {}
+
+    @classmethod
+    def depuis_fichier(cls, chemin=FICHIER_DEFAUT, semantique=None):
+        with open(chemin, "r", encoding="utf-8") as fichier:
+            return cls(json.load(fichier), semantique)
+
+    def surveiller_user(self, user):
+        """Id interne d'un compte surveillé (les autres comptes valent -1)."""
+        identifiant = self._ids_users.get(user)
+        if identifiant is None:
+            identifiant = self._ids_users[user] = len(self._ids_users)
+        return identifiant
+
+    def rangs(self):
+        """Priorité de chaque règle (plus grand = l'emporte) pour ``premiere`` / ``severite_max``."""
+        nombre = len(self.regles)
+        if self.semantique == "severite_max":
+            # Sévérité d'abord, puis l'ordre des règles pour départager
+            return [NIVEAUX.index(r.niveau) * nombre + (nombre - i) for i, r in enumerate(self.regles)]
+        return [nombre - i for i in range(nombre)]
+
+    def court_circuit(self, echecs_par_ip):
+        """Évaluateur ligne à ligne, avec les totaux d'échecs ``echecs_par_ip`` déjà connus."""
+        return EvaluateurCourtCircuit(self, echecs_par_ip)
+
+    # --- évaluation --------------------------------------------------------
+
+    def construire_lot(self, evenements, ip_suspectes):
+        lot = Lot(len(evenements))
+        if "heure" in self.champs:
+            lot.heure = np.fromiter(
+                (-1 if e.heure is None else e.heure for e in evenements),
+                dtype=np.int64, count=lot.taille,
+            )
+        if "user" in self.champs:
+            ids = self._ids_users
+            lot.user = np.fromiter((ids.get(e.user, -1) for e in evenements), dtype=np.int64, count=lot.taille)
+        if "ip_suspecte" in self.champs:
+            lot.ip_suspecte = np.fromiter(ip_suspectes, dtype=bool, count=lot.taille)
+        return lot
+
+    def _codes(self, correspondances):
+        """Un entier par événement qui identifie le verdict (-1 / 0 = aucun)."""
+        if self.semantique == "toutes":
+            poids = (1 << np.arange(len(self.regles), dtype=np.int64))[:, None]
+            return (correspondances * poids).sum(axis=0)
+        scores = correspondances * np.array(self.rangs())[:, None]
+        return np.where(correspondances.any(axis=0), scores.argmax(axis=0), -1)
+
+    def _verdict(self, code):
+        verdict = self._verdicts.get(code)
+        if verdict is None:
+            if self.semantique == "toutes":
+                regles = [r for i, r in enumerate(self.regles) if code >> i & 1]
+            else:
+                regles = [self.regles[code]]
+            niveau = max((r.niveau for r in regles), key=NIVEAUX.index)
+            verdict = Verdict(niveau, " | ".join(r.libelle for r in regles), tuple(r.nom for r in regles))
+            self._verdicts[code] = verdict
+        return verdict
+
+    def evaluer_lot(self, evenements, ip_suspectes):
+        """Produit (evenement, Verdict) pour chaque événement du lot qui déclenche une règle."""
+        if not evenements or not self.regles:
+            return
+        lot = self.construire_lot(evenements, ip_suspectes)
+        correspondances = np.vstack([regle.predicat(lot) for regle in self.regles])
+        codes = self._codes(correspondances)
+        aucun = 0 if self.semantique == "toutes" else -1
+        for i in np.flatnonzero(codes != aucun).tolist():
+            yield evenements[i], self._verdict(int(codes[i]))
+
+
+def evaluer_par_lots(jugements, moteur, taille_lot=TAILLE_LOT):
+    """
+    ``jugements`` : couples (evenement, ip_suspecte), par exemple produits par
+    ``pipeline.juger_avec_totaux``. Produit (evenement, Verdict) pour chaque alerte.
+    """
+    evenements, suspectes = [], []
+    for evenement, ip_suspecte in jugements:
+        evenements.append(evenement)
+        suspectes.append(ip_suspecte)
+        if len(evenements) >= taille_lot:
+            yield from moteur.evaluer_lot(evenements, suspectes)
+            evenements, suspectes = [], []
+    yield from moteur.evaluer_lot(evenements, suspectes)
+
+
+# --- évaluation ligne à ligne, avec court-circuit ---------------------------
+
+def _valeur_champ(ligne, cle):
+    """Valeur du dernier champ ``cle`` (ex. " IP=") de la ligne brute, comme analyser_ligne, ou None."""
+    debut = ligne.rfind(cle)
+    if debut == -1:
+        if not ligne.startswith(cle[1:]):
+            return None
+        debut = len(cle) - 1
+    else:
+        debut += len(cle)
+    fin = ligne.find(" ", debut)
+    return ligne[debut:] if fin == -1 else ligne[debut:fin]
+
+
+def _predicat_seuil_echecs(definition, moteur, echecs_par_ip):
+    # Seuil de la règle (le même que juger_avec_totaux) ; IP internées une fois pour toutes
+    seuil = int(definition.get("seuil", SEUIL_ECHECS))
+    suspectes = frozenset(sys.intern(ip) for ip, nombre in echecs_par_ip.items() if ip and nombre >= seuil)
+    return lambda ligne: _valeur_champ(ligne, " IP=") in suspectes
+
+
+def _predicat_plage_horaire(definition, moteur, echecs_par_ip):
+    debut, fin = int(definition["debut"]), int(definition["fin"])
+    table = tuple(heure < debut or heure >= fin for heure in range(24))
+    # Même table de 24 cases, indexée par le texte "HH" de la disposition fixe "AAAA-MM-JJ HH:MM:SS"
+    par_texte = {f"{heure:02d}": hors_heures for heure, hors_heures in enumerate(table)}
+
+    def predicat(ligne):
+        if ligne[13:14] == ":" and ligne.find(" ") == 10:
+            hors_heures = par_texte.get(ligne[11:13])
+            if hors_heures is not None:
+                return hors_heures
+        heure = analyser_ligne(ligne).heure  # autre disposition : découpage complet
+        return heure is not None and table[heure]
+    return predicat
+
+
+def _predicat_utilisateurs(definition, moteur, echecs_par_ip):
+    comptes = frozenset(definition["utilisateurs"])
+    return lambda ligne: _valeur_champ(ligne, " USER=") in comptes
+
+
+PREDICATS_LIGNE = {
+    "seuil_echecs": _predicat_seuil_echecs,
+    "plage_horaire": _predicat_plage_horaire,
+    "utilisateurs": _predicat_utilisateurs,
+}
+
+
+def _surcout_chrono():
+    """Durée (ns) de deux appels à perf_counter_ns, retirée des mesures de coût."""
+    mesures = []
+    for _ in range(200):
+        debut = time.perf_counter_ns()
+        mesures.append(time.perf_counter_ns() - debut)
+    return min(mesures)
+
+
+class _RegleLigne:
+    """Une règle compilée pour l'évaluation ligne à ligne, et ses mesures."""
+
+    __slots__ = ("index", "predicat", "evaluations", "correspondances", "mesures", "duree_ns", "surcout")
+
+    def __init__(self, index, predicat, surcout=0):
+        self.index = index
+        self.predicat = predicat
+        self.evaluations = 0
+        self.correspondances = 0
+        self.mesures = 0
+        self.duree_ns = 0
+        self.surcout = surcout
+
+    def cout_ns(self):
+        """Durée moyenne d'une évaluation (ns), chronomètre déduit."""
+        if not self.mesures:
+            return 0.0
+        return max(self.duree_ns / self.mesures - self.surcout, 0.0)
+
+    def selectivite(self):
+        """Part des lignes évaluées pour lesquelles la règle correspond."""
+        return self.correspondances / self.evaluations if self.evaluations else 0.0
+
+
+class EvaluateurCourtCircuit:
+    """
+    Verdicts identiques à ``MoteurRegles.evaluer_lot``, ligne à ligne.
+
+    Avec ``premiere`` et ``severite_max``, la première règle qui correspond
+    (dans l'ordre de priorité) donne le verdict et les suivantes ne sont pas
+    évaluées. Avec ``toutes``, chaque règle est évaluée : le gain vient alors
+    seulement des tables et de l'extraction limitée aux champs utiles.
+    """
+
+    def __init__(self, moteur, echecs_par_ip, echantillon=ECHANTILLON_COUT):
+        self.moteur = moteur
+        self.echantillon = echantillon
+        self.toutes = moteur.semantique == "toutes"
+        surcout = _surcout_chrono()
+        self.regles = [
+            _RegleLigne(i, PREDICATS_LIGNE[definition["type"]](definition, moteur, echecs_par_ip), surcout)
+            for i, definition in enumerate(moteur.definitions)
+        ]
+        rangs = moteur.rangs()
+        self._ordre = sorted(self.regles, key=lambda regle: -rangs[regle.index])
+        self._restant = 1
+
+    def evaluer(self, ligne):
+        """Verdict de la ligne brute ``ligne``, ou None."""
+        self._restant -= 1
+        if not self._restant:
+            self._restant = self.echantillon
+            return self._evaluer(ligne, self._chronometrer)
+        if not self.toutes:
+            for regle in self._ordre:
+                regle.evaluations += 1
+                if regle.predicat(ligne):
+                    regle.correspondances += 1
+                    return self.moteur._verdict(regle.index)
+            return None
+        return self._evaluer(ligne, self._appliquer)
+
+    @staticmethod
+    def _appliquer(regle, ligne):
+        return regle.predicat(ligne)
+
+    @staticmethod
+    def _chronometrer(regle, ligne):
+        debut = time.perf_counter_ns()
+        correspond = regle.predicat(ligne)
+        regle.duree_ns += time.perf_counter_ns() - debut
+        regle.mesures += 1
+        return correspond
+
+    def _evaluer(self, ligne, appliquer):
+        if not self.toutes:
+            for regle in self._ordre:
+                regle.evaluations += 1
+                if appliquer(regle, ligne):
+                    regle.correspondances += 1
+                    return self.moteur._verdict(regle.index)
+            return None
+
+        code = 0
+        for regle in self._ordre:
+            regle.evaluations += 1
+            if appliquer(regle, ligne):
+                regle.correspondances += 1
+                code |= 1 << regle.index
+        return self.moteur._verdict(code) if code else None
+
+    def relever(self):
+        """Mesures accumulées depuis le dernier relevé (une par règle), remises à zéro."""
+        releve = []
+        for regle in self.regles:
+            releve.append((regle.evaluations, regle.correspondances, regle.mesures, regle.duree_ns))
+            regle.evaluations = regle.correspondances = regle.mesures = regle.duree_ns = 0
+        return releve
+
+    def cumuler(self, releve):
+        """Ajoute le ``relever()`` d'un autre évaluateur des mêmes règles (autre processus)."""
+        for regle, (evaluations, correspondances, mesures, duree_ns) in zip(self.regles, releve):
+            regle.evaluations += evaluations
+            regle.correspondances += correspondances
+            regle.mesures += mesures
+            regle.duree_ns += duree_ns
+
+    def selectivite(self):
+        """Par règle, dans l'ordre d'évaluation : nom, évaluations, correspondances, sélectivité, coût (ns)."""
+        return [
+            {
+                "regle": self.moteur.regles[regle.index].nom,
+                "evaluations": regle.evaluations,
+                "correspondances": regle.correspondances,
+                "selectivite": regle.selectivite(),
+                "cout_ns": regle.cout_ns(),
+            }
+            for regle in self._ordre
+        ]
+
+
+def evaluer_en_flux(lignes, evaluateur):
+    """
+    Produit (evenement, Verdict) pour chaque ligne qui déclenche une règle,
+    dans l'ordre du flux ; seules ces lignes sont entièrement analysées.
+    """
+    for numero, ligne in enumerate(lignes):
+        verdict = evaluateur.evaluer(ligne)
+        if verdict is not None:
+            yield analyser_ligne(ligne, numero), verdict
@@ -0,0 +1,295 @@
+"""
+Réputation des IP, conservée d'un lancement à l'autre (SQLite, mode WAL).
+
+Pour chaque IP : nombre total d'échecs, premier et dernier échec, derniers
+horodatages d'échec (de quoi reconstruire la fenêtre glissante), nombre
+d'alertes et date de la dernière ; l'historique des alertes est dans une
+table à part.
+
+La boucle de détection n'attend jamais le disque :
+- ``echec`` et ``alerte`` ne font que compléter des dictionnaires en mémoire ;
+- un thread dédié les récupère toutes les ``periode`` secondes et les écrit
+  en une transaction (upserts par paquets, ``executemany``).
+
+Au redémarrage, ``recentes`` ne relit que les IP actives dans la dernière
+fenêtre : un attaquant juste sous le seuil ne repart pas de zéro.
+
+Si une écriture échoue (base verrouillée, en lecture seule, disque plein),
+rien n'est perdu : ce qui devait être écrit est remis en attente et le
+thread réessaie, en espaçant les essais (jusqu'à ``ATTENTE_MAX`` secondes).
+Après ``ECHECS_MAX`` échecs de suite, l'erreur est renvoyée à l'appelant au
+prochain ``echec`` / ``alerte``, et ``fermer`` la renvoie aussi si la
+dernière écriture échoue.
+
+Les écritures et le point de reprise du suivi sont sauvegardés chacun de
+leur côté : après un arrêt brutal (pas un Ctrl+C), les dernières lignes
+peuvent être relues et comptées deux fois.
+
+    reputation = MagasinReputation("data/reputation.db")
+    for ip, horodatages in reputation.recentes(300):
+        detecteur.charger(ip, horodatages)
+    ...
+    reputation.echec(ip, horodatage)
+"""
+
+import sqlite3
+import threading
+
+from .extraction import SEUIL_ECHECS
+
+PERIODE_ECRITURE = 1.0   # secondes entre deux écritures
+ATTENTE_MAX = 60.0       # secondes entre deux essais, au plus, après des échecs
+ECHECS_MAX = 5           # échecs d'écriture de suite avant de prévenir l'appelant
+TAILLE_REQUETE = 500     # IP par requête « IN (...) » (limite de variables SQLite)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ips (
+    ip TEXT PRIMARY KEY,
+    echecs INTEGER NOT NULL,
+    premier INTEGER,
+    dernier INTEGER,
+    recents TEXT NOT NULL DEFAULT '',
+    alertes INTEGER NOT NULL DEFAULT 0,
+    derniere_alerte INTEGER
+);
+CREATE INDEX IF NOT EXISTS ips_dernier ON ips (dernier);
+CREATE TABLE IF NOT EXISTS alertes (
+    ip TEXT NOT NULL,
+    horodatage INTEGER NOT NULL,
+    raison TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alertes_ip ON alertes (ip, horodatage);
+"""
+
+UPSERT = """
+INSERT INTO ips (ip, echecs, premier, dernier, recents, alertes, derniere_alerte)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (ip) DO UPDATE SET
+    echecs = excluded.echecs,
+    premier = excluded.premier,
+    dernier = excluded.dernier,
+    recents = excluded.recents,
+    alertes = excluded.alertes,
+    derniere_alerte = excluded.derniere_alerte
+"""
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+class _EnAttente:
+    """Ce qui est arrivé à une IP depuis la dernière écriture."""
+
+    __slots__ = ("echecs", "premier", "dernier", "recents", "alertes", "derniere_alerte")
+
+    def __init__(self):
+        self.echecs = 0
+        self.premier = None
+        self.dernier = None
+        self.recents = []
+        self.alertes = 0
+        self.derniere_alerte = None
+
+    def fusionner(self, autre):
+        """Ajoute ``autre``, arrivé après (les horodatages sont recoupés par ``resumer``)."""
+        self.echecs += autre.echecs
+        self.premier = _min(self.premier, autre.premier)
+        self.dernier = _max(self.dernier, autre.dernier)
+        self.recents.extend(autre.recents)
+        self.alertes += autre.alertes
+        self.derniere_alerte = _max(self.derniere_alerte, autre.derniere_alerte)
+
+    def resumer(self, garder):
+        """Reporte les horodatages dans premier / dernier, puis ne garde que les ``garder`` plus récents."""
+        recents = self.recents
+        if recents:
+            recents.sort()
+            self.premier = _min(self.premier, recents[0])
+            self.dernier = _max(self.dernier, recents[-1])
+            del recents[:-garder]
+
+
+class MagasinReputation:
+    """Réputation par IP dans ``chemin`` ; ``seuil`` = horodatages récents gardés par IP."""
+
+    def __init__(self, chemin, seuil=SEUIL_ECHECS, periode=PERIODE_ECRITURE):
+        self.chemin = chemin
+        self.seuil = seuil
+        self.periode = periode
+        self.ecritures = 0
+        self.echecs_ecriture = 0  # échecs de suite (remis à zéro par une écriture réussie)
+        self.erreur = None
+        # Une seule connexion : lue ici au démarrage, puis utilisée par le seul thread d'écriture
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False, isolation_level=None)
+        self._connexion.execute("PRAGMA journal_mode=WAL")
+        self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.executescript(SCHEMA)
+        self._plafond = 4 * seuil
+        self._attente = {}
+        self._historique = []
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        """IP modifiées depuis la dernière écriture."""
+        return len(self._attente)
+
+    # --- boucle chaude ---------------------------------------------------
+
+    def _verifier(self):
+        if self.echecs_ecriture >= ECHECS_MAX:
+            raise RuntimeError(
+                f"Réputation : {self.echecs_ecriture} écritures de suite ont échoué dans {self.chemin} "
+                f"({len(self._attente)} IP en attente)"
+            ) from self.erreur
+
+    def echec(self, ip, horodatage):
+        self._verifier()
+        with self._verrou:
+            entree = self._attente.get(ip)
+            if entree is None:
+                entree = self._attente[ip] = _EnAttente()
+            entree.echecs += 1
+            recents = entree.recents
+            recents.append(horodatage)
+            if len(recents) > self._plafond:
+                # Seuls les ``seuil`` plus récents servent : premier / dernier sont calculés avant de couper
+                entree.resumer(self.seuil)
+
+    def alerte(self, ip, horodatage, raison):
+        self._verifier()
+        with self._verrou:
+            entree = self._attente.get(ip)
+            if entree is None:
+                entree = self._attente[ip] = _EnAttente()
+            entree.alertes += 1
+            entree.derniere_alerte = _max(entree.derniere_alerte, horodatage)
+            self._historique.append((ip, horodatage, raison))
+
+    # --- écriture --------------------------------------------------------
+
+    def demarrer(self):
+        """Lance le thread d'écriture périodique."""
+        self._thread = threading.Thread(target=self._boucle, name="reputation", daemon=True)
+        self._thread.start()
+        return self
+
+    def _boucle(self):
+        attente = self.periode
+        while not self._arret.wait(attente):
+            try:
+                self.ecrire()
+            except (sqlite3.Error, OSError):
+                # Données remises en attente par ``ecrire`` : on réessaie, de moins en moins souvent
+                attente = min(self.periode * 2 ** self.echecs_ecriture, ATTENTE_MAX)
+            else:
+                attente = self.periode
+
+    def _existantes(self, ips):
+        existantes = {}
+        for debut in range(0, len(ips), TAILLE_REQUETE):
+            paquet = ips[debut:debut + TAILLE_REQUETE]
+            requete = f"SELECT * FROM ips WHERE ip IN ({','.join('?' * len(paquet))})"
+            for ligne in self._connexion.execute(requete, paquet):
+                existantes[ligne[0]] = ligne
+        return existantes
+
+    def ecrire(self):
+        """Écrit ce qui est en attente, en une transaction ; renvoie le nombre d'IP écrites."""
+        with self._verrou:
+            attente, self._attente = self._attente, {}
+            historique, self._historique = self._historique, []
+        if not attente and not historique:
+            return 0
+        try:
+            lignes = self._ecrire(attente, historique)
+        except (sqlite3.Error, OSError) as exc:
+            self._remettre(attente, historique)
+            self.echecs_ecriture += 1
+            self.erreur = exc
+            raise
+        self.echecs_ecriture = 0
+        self.erreur = None
+        self.ecritures += 1
+        return lignes
+
+    def _remettre(self, attente, historique):
+        """Remet en attente ce qui n'a pas pu être écrit, avant ce qui est arrivé depuis."""
+        with self._verrou:
+            for ip, entree in self._attente.items():
+                ancienne = attente.get(ip)
+                if ancienne is None:
+                    attente[ip] = entree
+                else:
+                    ancienne.fusionner(entree)
+            self._attente = attente
+            self._historique = historique + self._historique
+
+    def _ecrire(self, attente, historique):
+        existantes = self._existantes(list(attente))
+        lignes = []
+        for ip, entree in attente.items():
+            entree.resumer(self.seuil)
+            _, echecs, premier, dernier, recents, alertes, derniere_alerte = existantes.get(
+                ip, (ip, 0, None, None, "", 0, None)
+            )
+            horodatages = sorted([int(t) for t in recents.split()] + entree.recents)
+            lignes.append((
+                ip,
+                echecs + entree.echecs,
+                _min(premier, entree.premier),
+                _max(dernier, entree.dernier),
+                " ".join(map(str, horodatages[-self.seuil:])),
+                alertes + entree.alertes,
+                _max(derniere_alerte, entree.derniere_alerte),
+            ))
+
+        with self._connexion:
+            self._connexion.execute("BEGIN")
+            self._connexion.executemany(UPSERT, lignes)
+            self._connexion.executemany("INSERT INTO alertes VALUES (?, ?, ?)", historique)
+        return len(lignes)
+
+    def fermer(self):
+        """Arrête le thread et écrit ce qui reste en attente (l'erreur est renvoyée si c'est impossible)."""
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.ecrire()
+        finally:
+            self._connexion.close()
+
+    # --- lecture ---------------------------------------------------------
+
+    def recentes(self, fenetre, limite=None):
+        """
+        (ip, horodatages) des IP dont le dernier échec date de moins de
+        ``fenetre`` secondes avant le plus récent de la base, de la moins à la
+        plus récemment active ; au plus ``limite`` IP (les plus récentes).
+        """
+        (plus_recent,) = self._connexion.execute("SELECT MAX(dernier) FROM ips").fetchone()
+        if plus_recent is None:
+            return []
+        requete = "SELECT ip, recents FROM ips WHERE dernier >= ? ORDER BY dernier DESC"
+        parametres = [plus_recent - fenetre]
+        if limite is not None:
+            requete += " LIMIT ?"
+            parametres.append(limite)
+        lignes = self._connexion.execute(requete, parametres).fetchall()
+        return [(ip, [int(t) for t in recents.split()]) for ip, recents in reversed(lignes)]
+
+    def infos(self, ip):
+        """Réputation enregistrée de ``ip`` (dictionnaire), ou None."""
+        curseur = self._connexion.execute("SELECT * FROM ips WHERE ip = ?", (ip,))
+        ligne = curseur.fetchone()
+        if ligne is None:
+            return None
+        return dict(zip([colonne[0] for colonne in curseur.description], ligne))
@@ -0,0 +1,305 @@
+"""
+Suivi d'un journal en continu (à la ``tail -F``), réveillé par les écritures.
+
+- attente des modifications via inotify (Linux), sinon scrutation rapide ;
+- détection de la rotation (changement d'inode) et de la troncature (taille
+  inférieure à la position lue) : l'ancien fichier est lu jusqu'au bout avant
+  de passer au nouveau ;
+- point de reprise (inode + position) sauvegardé dans un fichier JSON, pour
+  reprendre après un redémarrage sans tout relire. Une ligne n'est comptée
+  comme lue qu'une fois traitée : au pire, la dernière ligne en cours de
+  traitement est relue au redémarrage, jamais perdue.
+
+    suiveur = SuiveurJournal("data/auth.log", point_reprise="data/.auth.log.position")
+    for ligne in suiveur.lignes():
+        ...
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import time
+
+# Masques inotify (voir <sys/inotify.h>)
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+MASQUE_DOSSIER = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EN_TETE_INOTIFY = struct.Struct("iIII")
+
+INTERVALLE_SCRUTATION = 0.2  # secondes, mode sans inotify
+DELAI_MAX_ATTENTE = 1.0      # filet de sécurité même avec inotify
+SAUVEGARDE_TOUTES_LES = 50_000  # lignes
+
+
+class AttenteInotify:
+    """Bloque jusqu'à une modification dans le dossier du journal (Linux)."""
+
+    def __init__(self, chemin):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        self._dossiers = {}  # descripteur de surveillance -> dossier
+        try:
+            self.surveiller(chemin)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def surveiller(self, chemin):
+        """Ajoute le dossier de ``chemin`` (plusieurs journaux peuvent partager une attente)."""
+        # On surveille le dossier : la création du nouveau fichier après une
+        # rotation y est visible, contrairement à une surveillance du fichier seul
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        if dossier in self._dossiers.values():
+            return
+        descripteur = self._libc.inotify_add_watch(self._fd, os.fsencode(dossier), MASQUE_DOSSIER)
+        if descripteur < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch a échoué sur {dossier}")
+        self._dossiers[descripteur] = dossier
+
+    def fileno(self):
+        return self._fd
+
+    def fichiers_modifies(self):
+        """Vide la file d'événements ; renvoie les chemins (absolus) concernés."""
+        chemins = set()
+        try:
+            while True:
+                donnees = os.read(self._fd, 65536)
+                if not donnees:
+                    break
+                # struct inotify_event { int wd; uint32 mask, cookie, len; char name[len]; }
+                decalage = 0
+                while decalage + EN_TETE_INOTIFY.size <= len(donnees):
+                    descripteur, _, _, longueur = EN_TETE_INOTIFY.unpack_from(donnees, decalage)
+                    decalage += EN_TETE_INOTIFY.size
+                    nom = donnees[decalage:decalage + longueur].rstrip(b"\0")
+                    decalage += longueur
+                    dossier = self._dossiers.get(descripteur)
+                    if dossier is not None and nom:
+                        chemins.add(os.path.join(dossier, os.fsdecode(nom)))
+        except BlockingIOError:
+            pass
+        return chemins
+
+    def attendre(self, delai):
+        pret, _, _ = select.select([self._fd], [], [], delai)
+        if pret:
+            # Seul le réveil nous intéresse
+            self.fichiers_modifies()
+
+    def fermer(self):
+        os.close(self._fd)
+
+
+class AttenteScrutation:
+    """Repli portable : scrutation rapide (latence < intervalle)."""
+
+    def __init__(self, intervalle=INTERVALLE_SCRUTATION):
+        self.intervalle = intervalle
+
+    def attendre(self, delai):
+        time.sleep(min(delai, self.intervalle))
+
+    def fermer(self):
+        pass
+
+
+def creer_attente(chemin, intervalle=INTERVALLE_SCRUTATION):
+    """inotify si disponible, sinon scrutation rapide."""
+    try:
+        return AttenteInotify(chemin)
+    except (OSError, AttributeError):
+        return AttenteScrutation(intervalle)
+
+
+def lire_point_reprise(chemin):
+    try:
+        with open(chemin, "r", encoding="utf-8") as fichier:
+            return json.load(fichier)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ecrire_point_reprise(chemin, donnees):
+    """Écriture atomique : un arrêt brutal ne laisse jamais un fichier à moitié écrit."""
+    temporaire = chemin + ".tmp"
+    with open(temporaire, "w", encoding="utf-8") as fichier:
+        json.dump(donnees, fichier)
+    os.replace(temporaire, chemin)
+
+
+class SuiveurJournal:
+    """Produit les nouvelles lignes complètes d'un journal, au fil des écritures."""
+
+    def __init__(self, chemin, point_reprise=None, attente=None, delai_max=DELAI_MAX_ATTENTE):
+        self.chemin = chemin
+        self.point_reprise = point_reprise
+        self.attente = attente if attente is not None else creer_attente(chemin)
+        self.delai_max = delai_max
+        self._fichier = None
+        self._inode = None
+        self.position = 0   # début de la première ligne non encore consommée
+        self._partiel = b""  # dernière ligne pas encore terminée par "\n"
+        self._rotation_vue = False
+
+    # --- ouverture / reprise ---------------------------------------------
+
+    def _ouvrir(self, chemin, position=0):
+        self._fichier = open(chemin, "rb")
+        self._inode = os.fstat(self._fichier.fileno()).st_ino
+        if position > os.fstat(self._fichier.fileno()).st_size:
+            position = 0  # tronqué pendant l'arrêt
+        self._fichier.seek(position)
+        self.position = position
+        self._partiel = b""
+        self._rotation_vue = False
+
+    def ouvrir(self, etat=None):
+        """
+        Ouvre le journal à la position ``etat`` ({"inode", "position"}), ou à
+        celle du fichier de point de reprise, ou au début.
+        """
+        if etat is None and self.point_reprise:
+            etat = lire_point_reprise(self.point_reprise)
+        if etat is None:
+            self._ouvrir(self.chemin)
+            return
+        try:
+            inode_actuel = os.stat(self.chemin).st_ino
+        except FileNotFoundError:
+            inode_actuel = None
+        if etat["inode"] == inode_actuel:
+            self._ouvrir(self.chemin, etat["position"])
+            return
+        # Rotation pendant l'arrêt : finir l'ancien fichier s'il est encore là
+        ancien = self.chemin + ".1"
+        try:
+            if os.stat(ancien).st_ino == etat["inode"]:
+                self._ouvrir(ancien, etat["position"])
+                self._rotation_vue = True
+                return
+        except FileNotFoundError:
+            pass
+        self._ouvrir(self.chemin)
+
+    def etat(self):
+        """Point de reprise correspondant aux lignes déjà rendues."""
+        return {"inode": self._inode, "position": self.position}
+
+    def octets_restants(self):
+        """Octets écrits dans le fichier courant mais pas encore lus."""
+        if self._fichier is None:
+            return 0
+        return max(os.fstat(self._fichier.fileno()).st_size - self.position - len(self._partiel), 0)
+
+    def fermer(self):
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+
+    def _sauvegarder(self):
+        if self.point_reprise and self._fichier is not None:
+            ecrire_point_reprise(self.point_reprise, self.etat())
+
+    # --- rotation / troncature ----------------------------------------------
+
+    def _verifier_fichier(self):
+        """
+        Appelée en fin de fichier. Renvoie True s'il faut relire tout de suite
+        (ancien fichier à finir, nouveau fichier ouvert ou fichier tronqué).
+        """
+        try:
+            infos = os.stat(self.chemin)
+        except FileNotFoundError:
+            return False  # renommé, le nouveau fichier n'est pas encore créé
+
+        if infos.st_ino != self._inode:
+            if not self._rotation_vue:
+                # Des lignes ont pu être écrites dans l'ancien fichier juste avant
+                # la rotation : une dernière lecture avant de basculer
+                self._rotation_vue = True
+                return True
+            self._fichier.close()
+            self._ouvrir(self.chemin)
+            return True
+
+        if infos.st_size < self.position:
+            self._fichier.seek(0)
+            self.position = 0
+            self._partiel = b""
+            return True
+        return False
+
+    # --- lecture ---------------------------------------------------------
+
+    def _suivante(self):
+        """
+        Prochaine ligne complète, en octets, avec le nombre d'octets dont elle
+        fait avancer la position ; None si rien de neuf pour l'instant.
+        """
+        while True:
+            donnees = self._fichier.readline()
+            if donnees.endswith(b"\n"):
+                brute = self._partiel + donnees
+                self._partiel = b""
+                return brute, len(brute)
+
+            self._partiel += donnees
+            ancien_inode = self._inode
+            partiel = self._partiel
+            if not self._verifier_fichier():
+                return None
+            if self._inode != ancien_inode and partiel:
+                # Dernière ligne de l'ancien fichier, jamais terminée
+                return partiel, 0
+
+    def lire_lot(self, max_lignes):
+        """
+        Non bloquant : jusqu'à ``max_lignes`` lignes déjà écrites ([] si rien de
+        neuf). La position avance avec le lot ; c'est à l'appelant de conserver
+        ``etat()`` une fois le lot traité.
+        """
+        lot = []
+        while len(lot) < max_lignes:
+            suivante = self._suivante()
+            if suivante is None:
+                break
+            brute, longueur = suivante
+            lot.append(brute.decode("utf-8", errors="replace").rstrip("\r\n"))
+            self.position += longueur
+        return lot
+
+    def lignes(self):
+        """Générateur infini des lignes (sans retour à la ligne), décodées en UTF-8."""
+        self.ouvrir()
+        depuis_sauvegarde = 0
+        try:
+            while True:
+                suivante = self._suivante()
+                if suivante is None:
+                    self._sauvegarder()
+                    depuis_sauvegarde = 0
+                    self.attente.attendre(self.delai_max)
+                    continue
+                brute, longueur = suivante
+                yield brute.decode("utf-8", errors="replace").rstrip("\r\n")
+                # Le consommateur a traité la ligne : elle peut être sautée au redémarrage
+                self.position += longueur
+                depuis_sauvegarde += 1
+                if depuis_sauvegarde >= SAUVEGARDE_TOUTES_LES:
+                    self._sauvegarder()
+                    depuis_sauvegarde = 0
+        finally:
+            self._sauvegarder()
+            self.fermer()
+            self.attente.fermer()
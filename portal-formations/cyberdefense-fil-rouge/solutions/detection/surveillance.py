@@ -0,0 +1,210 @@
+"""
+Surveillance simultanée de nombreux journaux (un par machine), avec asyncio.
+
+    lecteurs (une tâche par journal)  ──►  file bornée  ──►  traitement (un seul)
+
+- chaque journal est suivi par un SuiveurJournal (rotation, troncature),
+  lu par lots sans jamais bloquer la boucle ;
+- tous les lots passent par une même file bornée vers un traitement unique :
+  l'état de détection (par exemple un DetecteurFenetre) est partagé par toutes
+  les sources, sans verrou ;
+- contre-pression : quand le traitement prend du retard, la file se remplit
+  et les lecteurs attendent au lieu d'accumuler des lignes en mémoire ;
+- un seul descripteur inotify pour tous les dossiers surveillés : seules les
+  sources dont le fichier a changé sont réveillées (sinon, scrutation) ;
+- le point de reprise ({chemin: {"inode", "position"}}) ne retient que les
+  lots traités : après un arrêt, les lots encore dans la file sont relus.
+
+Pour chaque source, ``retards()`` donne les octets écrits mais pas encore
+lus, les lignes en file et la latence (lecture -> fin du traitement) du
+dernier lot.
+
+    surveillance = SurveillanceMultiple(chemins, traiter, point_reprise="data/.surveillance.json")
+    asyncio.run(surveillance.executer())
+"""
+
+import asyncio
+import os
+import time
+
+from .suivi import (
+    DELAI_MAX_ATTENTE,
+    INTERVALLE_SCRUTATION,
+    SAUVEGARDE_TOUTES_LES,
+    AttenteInotify,
+    AttenteScrutation,
+    SuiveurJournal,
+    ecrire_point_reprise,
+    lire_point_reprise,
+)
+
+TAILLE_LOT = 1_000   # lignes lues d'un coup dans une source
+TAILLE_FILE = 64     # lots en attente de traitement, toutes sources confondues
+DELAI_SAUVEGARDE = 1.0  # secondes entre deux sauvegardes quand tout est à jour
+
+
+class Source:
+    """Un journal surveillé et ses compteurs."""
+
+    __slots__ = ("chemin", "suiveur", "reveil", "etat_traite", "lues", "traitees", "en_file", "latence")
+
+    def __init__(self, chemin, suiveur):
+        self.chemin = chemin
+        self.suiveur = suiveur
+        self.reveil = asyncio.Event()
+        self.etat_traite = None
+        self.lues = 0
+        self.traitees = 0
+        self.en_file = 0
+        self.latence = 0.0
+
+
+class SurveillanceMultiple:
+    """
+    Suit ``chemins`` en parallèle et appelle ``traiter(source, lignes)`` pour
+    chaque lot, toujours depuis la même tâche, dans l'ordre de chaque fichier.
+    """
+
+    def __init__(self, chemins, traiter, point_reprise=None, taille_lot=TAILLE_LOT, taille_file=TAILLE_FILE,
+                 delai_max=DELAI_MAX_ATTENTE, intervalle=INTERVALLE_SCRUTATION):
+        self.traiter = traiter
+        self.point_reprise = point_reprise
+        self.taille_lot = taille_lot
+        self.taille_file = taille_file
+        self.delai_max = delai_max
+        self.intervalle = intervalle
+        # Les suiveurs n'attendent jamais eux-mêmes : c'est la boucle qui les réveille
+        self.sources = [Source(chemin, SuiveurJournal(chemin, attente=AttenteScrutation())) for chemin in chemins]
+        self._par_chemin = {os.path.abspath(source.chemin): source for source in self.sources}
+        self._inotify = None
+
+    # --- réveil des lecteurs ---------------------------------------------
+
+    def _installer_reveil(self, boucle):
+        try:
+            self._inotify = AttenteInotify(self.sources[0].chemin)
+            for source in self.sources[1:]:
+                self._inotify.surveiller(source.chemin)
+        except (OSError, AttributeError):
+            if self._inotify is not None:
+                self._inotify.fermer()
+            self._inotify = None
+            return False
+        boucle.add_reader(self._inotify.fileno(), self._sur_inotify)
+        return True
+
+    def _sur_inotify(self):
+        for chemin in self._inotify.fichiers_modifies():
+            source = self._par_chemin.get(chemin)
+            if source is not None:
+                source.reveil.set()
+
+    async def _scruter(self):
+        """Repli sans inotify : réveille toutes les sources à intervalle régulier."""
+        while True:
+            await asyncio.sleep(self.intervalle)
+            for source in self.sources:
+                source.reveil.set()
+
+    # --- lecteurs / traitement -------------------------------------------
+
+    async def _lire(self, source, file):
+        suiveur = source.suiveur
+        while True:
+            lot = suiveur.lire_lot(self.taille_lot)
+            if lot:
+                source.lues += len(lot)
+                source.en_file += len(lot)
+                # Bloque ici tant que la file est pleine : c'est la contre-pression
+                await file.put((source, lot, suiveur.etat(), time.monotonic()))
+                # put() ne rend pas la main si la file a de la place : on la rend
+                # pour qu'une source très active n'affame pas les autres
+                await asyncio.sleep(0)
+                continue
+            source.reveil.clear()
+            try:
+                await asyncio.wait_for(source.reveil.wait(), self.delai_max)
+            except asyncio.TimeoutError:
+                pass  # filet de sécurité : rotation manquée, système de fichiers réseau...
+
+    async def _traiter(self, file):
+        depuis_sauvegarde = 0
+        derniere_sauvegarde = time.monotonic()
+        while True:
+            source, lot, etat, lu_a = await file.get()
+            self.traiter(source, lot)
+            source.etat_traite = etat
+            source.en_file -= len(lot)
+            source.traitees += len(lot)
+            source.latence = time.monotonic() - lu_a
+            depuis_sauvegarde += len(lot)
+            maintenant = time.monotonic()
+            if depuis_sauvegarde >= SAUVEGARDE_TOUTES_LES or (
+                file.empty() and maintenant - derniere_sauvegarde >= DELAI_SAUVEGARDE
+            ):
+                self.sauvegarder()
+                depuis_sauvegarde = 0
+                derniere_sauvegarde = maintenant
+
+    # --- point de reprise ------------------------------------------------
+
+    def sauvegarder(self):
+        if not self.point_reprise:
+            return
+        etats = {source.chemin: source.etat_traite for source in self.sources if source.etat_traite is not None}
+        ecrire_point_reprise(self.point_reprise, etats)
+
+    def _ouvrir(self):
+        etats = (lire_point_reprise(self.point_reprise) if self.point_reprise else None) or {}
+        for source in self.sources:
+            source.suiveur.ouvrir(etats.get(source.chemin))
+            source.etat_traite = source.suiveur.etat()
+
+    # --- exécution -------------------------------------------------------
+
+    def retards(self):
+        """Par source : lignes lues / traitées / en file, octets non lus, latence (s)."""
+        return [
+            {
+                "source": source.chemin,
+                "lues": source.lues,
+                "traitees": source.traitees,
+                "en_file": source.en_file,
+                "octets_non_lus": source.suiveur.octets_restants(),
+                "latence": source.latence,
+            }
+            for source in self.sources
+        ]
+
+    async def executer(self, rapport=None, periode_rapport=10.0):
+        """
+        Surveille jusqu'à annulation (Ctrl+C). ``rapport(retards)`` est appelé
+        toutes les ``periode_rapport`` secondes s'il est fourni.
+        """
+        boucle = asyncio.get_running_loop()
+        self._ouvrir()
+        file = asyncio.Queue(self.taille_file)
+        taches = [asyncio.create_task(self._lire(source, file)) for source in self.sources]
+        taches.append(asyncio.create_task(self._traiter(file)))
+        if not self._installer_reveil(boucle):
+            taches.append(asyncio.create_task(self._scruter()))
+        if rapport is not None:
+            taches.append(asyncio.create_task(self._rapporter(rapport, periode_rapport)))
+        try:
+            await asyncio.gather(*taches)
+        finally:
+            for tache in taches:
+                tache.cancel()
+            await asyncio.gather(*taches, return_exceptions=True)
+            self.sauvegarder()
+            if self._inotify is not None:
+                boucle.remove_reader(self._inotify.fileno())
+                self._inotify.fermer()
+            for source in self.sources:
+                source.suiveur.fermer()
+
+    async def _rapporter(self, rapport, periode):
+        while True:
+            await asyncio.sleep(periode)
+            rapport(self.retards())
+
@@ -0,0 +1,5 @@
+"""
+Tests des briques de ``detection`` et des solutions des étapes.
+
+Depuis le dossier cyberdefense-fil-rouge/ : ``python -m pytest -q solutions``.
+"""
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SOLUTIONS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+GENERATEUR = os.path.join(SOLUTIONS, "..", "generate_auth_log.py")
+
+# Petit journal fixe : quelques rafales de force brute, connexions hors heures et admin
+LIGNES = 3000
+GRAINE = 7
+
+
+@pytest.fixture(scope="session")
+def dossier_journal(tmp_path_factory):
+    """Dossier de travail contenant ``data/auth.log`` (toujours le même journal)."""
+    dossier = tmp_path_factory.mktemp("journal")
+    (dossier / "data").mkdir()
+    subprocess.run(
+        [sys.executable, GENERATEUR, "--lines", str(LIGNES), "--seed", str(GRAINE), "--days-span", "2",
+         "--bursts", "4", "--out", str(dossier / "data" / "auth.log")],
+        check=True, capture_output=True,
+    )
+    return dossier
+
+
+@pytest.fixture(scope="session")
+def lignes_journal(dossier_journal):
+    with open(dossier_journal / "data" / "auth.log", encoding="utf-8") as fichier:
+        return [ligne.strip() for ligne in fichier]
+
+
+def lancer_etape(numero, dossier, *options):
+    """Lance ``solution_etape<numero>.py`` dans ``dossier`` comme un élève ; renvoie sa sortie."""
+    resultat = subprocess.run(
+        [sys.executable, os.path.join(SOLUTIONS, f"solution_etape{numero}.py"), *options],
+        cwd=dossier, check=True, capture_output=True, text=True, encoding="utf-8",
+    )
+    return resultat.stdout
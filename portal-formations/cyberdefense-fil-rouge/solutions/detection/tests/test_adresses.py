@@ -0,0 +1,46 @@
+import pytest
+
+from detection.adresses import agreger_par_reseau, entier_vers_ip, ip_vers_entier, reseau, top_k
+
+
+@pytest.mark.parametrize("ip", ["0.0.0.0", "192.168.1.10", "255.255.255.255", "::1", "2001:db8::1", "::"])
+def test_aller_retour(ip):
+    cle = ip_vers_entier(ip)
+    assert isinstance(cle, int)
+    assert entier_vers_ip(cle) == ip
+
+
+def test_ipv4_et_ipv6_distinctes():
+    # ::1 et 0.0.0.1 ont le même entier sans le drapeau IPv6
+    assert ip_vers_entier("::1") != ip_vers_entier("0.0.0.1")
+
+
+@pytest.mark.parametrize("ip", ["010.0.0.1", "2001:0db8::1", "1.2.3", "", "n/a"])
+def test_texte_non_canonique_garde_tel_quel(ip):
+    assert ip_vers_entier(ip) == ip
+    assert entier_vers_ip(ip) == ip
+    assert reseau(ip) == ip
+
+
+def test_reseau():
+    assert reseau(ip_vers_entier("10.0.3.77")) == "10.0.3.0/24"
+    assert reseau(ip_vers_entier("10.0.3.77"), prefixe_v4=16) == "10.0.0.0/16"
+    assert reseau(ip_vers_entier("10.0.3.77"), prefixe_v4=32) == "10.0.3.77/32"
+    assert reseau(ip_vers_entier("2001:db8:1:2:3::9")) == "2001:db8:1:2::/64"
+    assert reseau(ip_vers_entier("2001:db8:1:2:3::9"), prefixe_v6=32) == "2001:db8::/32"
+
+
+def test_agreger_par_reseau():
+    compteurs = {ip_vers_entier(ip): n for ip, n in [("10.0.3.1", 4), ("192.168.1.5", 7), ("10.0.3.200", 2),
+                                                     ("2001:db8::1", 1), ("2001:db8::2", 3), ("010.0.3.1", 5)]}
+    assert agreger_par_reseau(compteurs) == {"10.0.3.0/24": [6, 2], "192.168.1.0/24": [7, 1],
+                                             "2001:db8::/64": [4, 2], "010.0.3.1": [5, 1]}
+    # Ordre de première apparition
+    assert list(agreger_par_reseau(compteurs)) == ["10.0.3.0/24", "192.168.1.0/24", "2001:db8::/64", "010.0.3.1"]
+    assert agreger_par_reseau(compteurs, prefixe_v4=8)["10.0.0.0/8"] == [6, 2]
+
+
+def test_top_k_comme_un_tri():
+    compteurs = {f"ip{i}": (i * 7) % 5 for i in range(20)}
+    for k in (0, 1, 3, 5, 20, 30):
+        assert top_k(compteurs, k) == sorted(compteurs.items(), key=lambda x: x[1], reverse=True)[:k]
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from detection.alertes import EcrivainAlertes
+from detection.extraction import analyser_ligne
+from detection.regles import Verdict
+
+ADMIN = Verdict("CRITIQUE", "Compte admin", ("ADMIN",))
+NUIT = Verdict("WARNING", "Hors heures", ("HORS_HEURES",))
+
+
+def _evenement(minute, seconde=0, ip="1.1.1.1"):
+    return analyser_ligne(f"2026-01-10 22:{minute:02d}:{seconde:02d} USER=admin IP={ip} STATUS=FAIL")
+
+
+def _alertes(chemin):
+    with open(chemin, encoding="utf-8") as fichier:
+        return [ligne.rstrip("\n") for ligne in fichier if ligne.startswith("[")]
+
+
+def _total(chemin):
+    with open(chemin, encoding="utf-8") as fichier:
+        pieds = [ligne for ligne in fichier if ligne.startswith("Nombre total d'alertes : ")]
+    assert len(pieds) == 1
+    return int(pieds[0].rsplit(" ", 1)[1])
+
+
+def test_format_inconnu(tmp_path):
+    with pytest.raises(ValueError):
+        EcrivainAlertes(str(tmp_path / "alertes.txt"), format="xml")
+
+
+def test_fenetre_de_suppression(tmp_path):
+    chemin = str(tmp_path / "alertes.txt")
+    with EcrivainAlertes(chemin, suppression=300) as ecrivain:
+        ecrites = [
+            ecrivain.ecrire(_evenement(0), ADMIN),
+            ecrivain.ecrire(_evenement(1), ADMIN),             # même fenêtre : supprimée
+            ecrivain.ecrire(_evenement(2), NUIT),              # autres règles : autre clé
+            ecrivain.ecrire(_evenement(3, ip="2.2.2.2"), ADMIN),  # autre IP : autre clé
+            ecrivain.ecrire(_evenement(4, 59), ADMIN),         # 299 s : encore supprimée
+            ecrivain.ecrire(_evenement(5), ADMIN),             # 300 s : nouvelle fenêtre
+        ]
+    assert ecrites == [True, False, True, True, False, True]
+    assert (ecrivain.ecrites, ecrivain.supprimees, ecrivain.hors_ordre) == (4, 2, 0)
+    alertes = _alertes(chemin)
+    assert len(alertes) == 5
+    # Le résumé de la fenêtre fermée vient avant la première alerte de la suivante
+    assert alertes[3] == ("[2026-01-10 22:04:59] [CRITIQUE] Compte admin - 2 alertes similaires supprimées "
+                          "pour 1.1.1.1 (fenêtre ouverte le 2026-01-10 22:00:00)")
+    assert alertes[4].startswith("[2026-01-10 22:05:00] [CRITIQUE] Compte admin - ")
+    assert _total(chemin) == 4
+
+
+def test_fenetres_fermees_a_la_fermeture_et_hors_ordre(tmp_path):
+    chemin = str(tmp_path / "alertes.jsonl")
+    with EcrivainAlertes(chemin, format="jsonl", suppression=60) as ecrivain:
+        ecrivain.ecrire(_evenement(10), ADMIN)
+        ecrivain.ecrire(_evenement(10, 30), ADMIN)
+        # Plus ancienne que la fenêtre de suppression : écrite telle quelle
+        ecrivain.ecrire(_evenement(0), ADMIN)
+    assert ecrivain.hors_ordre == 1
+    with open(chemin, encoding="utf-8") as fichier:
+        objets = [json.loads(ligne) for ligne in fichier]
+    assert [o.get("supprimees") for o in objets] == [None, None, 1]
+    assert objets[0]["regles"] == ["ADMIN"] and objets[0]["ip"] == "1.1.1.1"
+
+
+def test_sans_ip_jamais_supprimee(tmp_path):
+    chemin = str(tmp_path / "alertes.txt")
+    sans_ip = analyser_ligne("2026-01-10 22:00:00 USER=admin STATUS=FAIL")
+    with EcrivainAlertes(chemin, suppression=300) as ecrivain:
+        assert all(ecrivain.ecrire(sans_ip, ADMIN) for _ in range(3))
+    assert len(_alertes(chemin)) == 3
+
+
+def test_rotation_pied_dans_chaque_fichier(tmp_path):
+    chemin = str(tmp_path / "alertes.txt")
+    with EcrivainAlertes(chemin, taille_max=1, taille_tampon=2, garder=10) as ecrivain:
+        for seconde in range(7):
+            ecrivain.ecrire(_evenement(0, seconde), ADMIN)
+    # Un fichier par vidage de deux alertes ; le dernier reçoit la septième
+    assert [_total(f"{chemin}.{n}") for n in (3, 2, 1)] == [2, 2, 2]
+    assert _total(chemin) == 1
+    assert ecrivain.effacees == 0
+    dates = [a[1:20] for n in (3, 2, 1) for a in _alertes(f"{chemin}.{n}")] + [a[1:20] for a in _alertes(chemin)]
+    assert dates == [f"2026-01-10 22:00:{s:02d}" for s in range(7)]
+
+
+def test_pas_de_rotation_a_la_fermeture(tmp_path):
+    chemin = str(tmp_path / "alertes.txt")
+    with EcrivainAlertes(chemin, taille_max=1, taille_tampon=2) as ecrivain:
+        for seconde in range(4):
+            ecrivain.ecrire(_evenement(0, seconde), ADMIN)
+    # Limite atteinte au dernier vidage : pas de nouveau fichier vide
+    assert _total(chemin) == 2
+    assert _total(f"{chemin}.1") == 2
+    assert not os.path.exists(f"{chemin}.2")
+
+
+def test_alertes_effacees_au_dela_de_garder(tmp_path):
+    chemin = str(tmp_path / "alertes.txt")
+    with EcrivainAlertes(chemin, taille_max=1, taille_tampon=2, garder=2) as ecrivain:
+        for seconde in range(9):
+            ecrivain.ecrire(_evenement(0, seconde), ADMIN)
+    assert not os.path.exists(f"{chemin}.3")
+    assert ecrivain.effacees == 4
+    restantes = _total(chemin) + _total(f"{chemin}.1") + _total(f"{chemin}.2")
+    assert restantes + ecrivain.effacees == ecrivain.ecrites == 9
+
+
+def test_garder_zero(tmp_path):
+    chemin = str(tmp_path / "alertes.txt")
+    with EcrivainAlertes(chemin, taille_max=1, taille_tampon=2, garder=0) as ecrivain:
+        for seconde in range(3):
+            ecrivain.ecrire(_evenement(0, seconde), ADMIN)
+    assert not os.path.exists(f"{chemin}.1")
+    assert (_total(chemin), ecrivain.effacees) == (1, 2)
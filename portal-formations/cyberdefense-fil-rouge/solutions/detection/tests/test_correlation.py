@@ -0,0 +1,91 @@
+from detection.correlation import MoteurCorrelation
+from detection.extraction import analyser_ligne
+
+
+def _evenement(user, ip, statut="FAIL"):
+    return analyser_ligne(f"2026-01-10 22:00:00 USER={user} IP={ip} STATUS={statut}")
+
+
+def _codes(alertes):
+    return [(alerte.code, alerte.cle, alerte.preuves) for alerte in alertes]
+
+
+def test_pulverisation():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=3, seuil_echecs=100)
+    assert moteur.ajouter(_evenement("alice", "1.1.1.1"), 0) == []
+    # La même IP ne compte qu'une fois
+    assert moteur.ajouter(_evenement("alice", "1.1.1.1"), 10) == []
+    assert moteur.ajouter(_evenement("bob", "2.2.2.2"), 15) == []
+    assert moteur.ajouter(_evenement("alice", "2.2.2.2"), 20) == []
+    alertes = moteur.ajouter(_evenement("alice", "3.3.3.3"), 30)
+    assert _codes(alertes) == [("PULVERISATION", "alice", 3)]
+    assert alertes[0].codes == ("PULVERISATION",) and alertes[0].niveau == "CRITIQUE"
+    # Une alerte par épisode : l'état du compte repart de zéro
+    assert moteur.ajouter(_evenement("alice", "4.4.4.4"), 31) == []
+    assert moteur.alertes == 1
+
+
+def test_pulverisation_hors_fenetre():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=3, seuil_echecs=100)
+    for horodatage, ip in [(0, "1.1.1.1"), (40, "2.2.2.2"), (80, "3.3.3.3")]:
+        assert moteur.ajouter(_evenement("alice", ip), horodatage) == []
+    # Seules les trois IP les plus récentes sont gardées : 2, 3 et 4 tiennent dans la fenêtre
+    assert _codes(moteur.ajouter(_evenement("alice", "4.4.4.4"), 90)) == [("PULVERISATION", "alice", 3)]
+
+
+def test_prise_de_controle():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=100, seuil_echecs=3)
+    for horodatage, ip in [(0, "1.1.1.1"), (5, "2.2.2.2"), (10, "3.3.3.3")]:
+        moteur.ajouter(_evenement("alice", ip), horodatage)
+    assert moteur.ajouter(_evenement("bob", "9.9.9.9", "SUCCESS"), 20) == []
+    # Aucune IP n'a trois échecs : seul le compte est signalé
+    alertes = moteur.ajouter(_evenement("alice", "4.4.4.4", "SUCCESS"), 20)
+    assert _codes(alertes) == [("PRISE_DE_CONTROLE", "alice", 3)]
+    assert moteur.ajouter(_evenement("alice", "4.4.4.4", "SUCCESS"), 21) == []
+
+
+def test_ip_compromise():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=100, seuil_echecs=3)
+    for horodatage, user in [(0, "alice"), (5, "bob"), (10, "carol")]:
+        moteur.ajouter(_evenement(user, "6.6.6.6"), horodatage)
+    alertes = moteur.ajouter(_evenement("dave", "6.6.6.6", "SUCCESS"), 20)
+    assert _codes(alertes) == [("IP_COMPROMISE", "6.6.6.6", 3)]
+    assert moteur.ajouter(_evenement("erin", "6.6.6.6", "SUCCESS"), 21) == []
+
+
+def test_les_deux_a_la_fois():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=100, seuil_echecs=3)
+    for horodatage in range(3):
+        moteur.ajouter(_evenement("root", "6.6.6.6"), horodatage)
+    alertes = moteur.ajouter(_evenement("root", "6.6.6.6", "SUCCESS"), 5)
+    assert _codes(alertes) == [("PRISE_DE_CONTROLE", "root", 3), ("IP_COMPROMISE", "6.6.6.6", 3)]
+    assert moteur.alertes == 2
+
+
+def test_expiration():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=3, seuil_echecs=3)
+    for horodatage, ip in [(0, "1.1.1.1"), (1, "2.2.2.2"), (2, "1.1.1.1")]:
+        moteur.ajouter(_evenement("alice", ip), horodatage)
+    assert len(moteur) == 4
+    # Succès trop tard : les échecs sont sortis de la fenêtre
+    assert moteur.ajouter(_evenement("alice", "1.1.1.1", "SUCCESS"), 100) == []
+    # Un autre compte fait avancer le temps : les anciens états sont oubliés
+    moteur.ajouter(_evenement("bob", "9.9.9.9"), 200)
+    assert len(moteur) == 3
+    assert moteur.ajouter(_evenement("alice", "3.3.3.3"), 201) == []
+
+
+def test_memoire_bornee():
+    moteur = MoteurCorrelation(fenetre=3600, seuil_ips=3, seuil_echecs=3, max_cles=50)
+    for n in range(1000):
+        moteur.ajouter(_evenement(f"user{n}", f"10.0.{n // 256}.{n % 256}"), n)
+    assert len(moteur) == 150
+    assert moteur._pulverisation.oublies == 950
+
+
+def test_evenements_incomplets_ignores():
+    moteur = MoteurCorrelation(fenetre=60, seuil_ips=1, seuil_echecs=1)
+    assert moteur.ajouter(_evenement("alice", "1.1.1.1"), None) == []
+    assert moteur.ajouter(analyser_ligne("2026-01-10 22:00:00 USER=alice STATUS=FAIL"), 0) == []
+    assert moteur.ajouter(analyser_ligne("2026-01-10 22:00:00 IP=1.1.1.1 STATUS=FAIL"), 0) == []
+    assert len(moteur) == 0 and moteur.alertes == 0
@@ -0,0 +1,114 @@
+import functools
+import json
+import os
+
+from detection import cumul
+from detection.esquisses import StatistiquesEsquisses
+from detection.extraction import analyser_ligne
+from detection.rapport import StatistiquesRapport
+
+PARAMETRES = {"heures": None, "esquisses": None}
+
+
+def _ecrire(chemin, lignes, mode="a"):
+    with open(chemin, mode, encoding="utf-8") as fichier:
+        fichier.writelines(f"{ligne}\n" for ligne in lignes)
+
+
+def _resume(statistiques):
+    activite = statistiques.finaliser()
+    return (activite.alertes, statistiques.nombre_echecs(), {h: n for h, (n, _) in activite.heures.items()},
+            {u: n for u, (n, _) in activite.users.items()})
+
+
+def _attendu(lignes):
+    statistiques = StatistiquesRapport()
+    for position, ligne in enumerate(lignes):
+        statistiques.ajouter(analyser_ligne(ligne), position)
+    return _resume(statistiques)
+
+
+def test_lignes_ajoutees_seulement(tmp_path, lignes_journal):
+    journal = str(tmp_path / "auth.log")
+    _ecrire(journal, lignes_journal[:1000], "w")
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, PARAMETRES)
+    assert ajoutees == 1000
+    assert _resume(statistiques) == _attendu(lignes_journal[:1000])
+
+    _ecrire(journal, lignes_journal[1000:])
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, PARAMETRES)
+    assert ajoutees == len(lignes_journal) - 1000
+    assert _resume(statistiques) == _attendu(lignes_journal)
+    # Rien de neuf
+    assert cumul.mettre_a_jour(journal, PARAMETRES)[1] == 0
+
+
+def test_ligne_en_cours_d_ecriture(tmp_path):
+    journal = str(tmp_path / "auth.log")
+    with open(journal, "w", encoding="utf-8") as fichier:
+        fichier.write("2026-01-10 23:00:00 USER=bob IP=1.1.1.1 STATUS=FAIL\n2026-01-10 23:00:01 USER=ad")
+    assert cumul.mettre_a_jour(journal, PARAMETRES)[1] == 1
+    with open(journal, "a", encoding="utf-8") as fichier:
+        fichier.write("min IP=1.1.1.1 STATUS=FAIL\n")
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, PARAMETRES)
+    assert ajoutees == 1
+    assert statistiques.finaliser().users == {"bob": [1, 0], "admin": [1, 52]}
+
+
+def test_rotation_entre_deux_lancements(tmp_path, lignes_journal):
+    journal = str(tmp_path / "auth.log")
+    _ecrire(journal, lignes_journal[:1000], "w")
+    cumul.mettre_a_jour(journal, PARAMETRES)
+    # Lignes ajoutées puis rotation : l'ancien fichier est fini avant le nouveau
+    _ecrire(journal, lignes_journal[1000:1500])
+    os.rename(journal, journal + ".1")
+    _ecrire(journal, lignes_journal[1500:], "w")
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, PARAMETRES)
+    assert ajoutees == len(lignes_journal) - 1000
+    assert _resume(statistiques) == _attendu(lignes_journal)
+
+
+def test_troncature(tmp_path, lignes_journal):
+    journal = str(tmp_path / "auth.log")
+    _ecrire(journal, lignes_journal[:1000], "w")
+    cumul.mettre_a_jour(journal, PARAMETRES)
+    _ecrire(journal, lignes_journal[1000:1100], "w")
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, PARAMETRES)
+    assert ajoutees == 100
+    assert _resume(statistiques) == _attendu(lignes_journal[:1100])
+
+
+def test_parametres_changes_repart_de_zero(tmp_path, lignes_journal):
+    journal = str(tmp_path / "auth.log")
+    _ecrire(journal, lignes_journal[:1000], "w")
+    cumul.mettre_a_jour(journal, PARAMETRES)
+    nuit = set(range(0, 8))
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, {"heures": sorted(nuit), "esquisses": None}, nuit)
+    assert ajoutees == 1000
+    assert statistiques.plage_heures == nuit
+    assert set(statistiques.finaliser().heures) <= nuit
+
+
+def test_etat_esquisses_en_json(tmp_path, lignes_journal):
+    journal = str(tmp_path / "auth.log")
+    fabrique = functools.partial(StatistiquesEsquisses, capacite=50)
+    parametres = {"heures": None, "esquisses": {"capacite": 50}}
+    _ecrire(journal, lignes_journal[:1000], "w")
+    cumul.mettre_a_jour(journal, parametres, fabrique=fabrique)
+    with open(cumul.chemin_etat(journal), encoding="utf-8") as fichier:
+        etat = json.load(fichier)
+    assert etat["type"] == "StatistiquesEsquisses" and etat["version"] == cumul.VERSION
+
+    _ecrire(journal, lignes_journal[1000:])
+    statistiques, ajoutees = cumul.mettre_a_jour(journal, parametres, fabrique=fabrique)
+    assert ajoutees == len(lignes_journal) - 1000
+    assert statistiques.finaliser().alertes == _attendu(lignes_journal)[0]
+
+
+def test_etat_illisible_repart_de_zero(tmp_path, lignes_journal):
+    journal = str(tmp_path / "auth.log")
+    _ecrire(journal, lignes_journal[:10], "w")
+    for contenu in ["pas du json", json.dumps({"version": cumul.VERSION, "type": "os.system"}), "[]"]:
+        with open(cumul.chemin_etat(journal), "w", encoding="utf-8") as fichier:
+            fichier.write(contenu)
+        assert cumul.mettre_a_jour(journal, PARAMETRES)[1] == 10
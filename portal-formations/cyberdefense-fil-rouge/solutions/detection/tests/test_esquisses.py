@@ -0,0 +1,181 @@
+import gzip
+import json
+import pickle
+
+import pytest
+
+from detection.esquisses import CountMin, ElementsFrequents, HyperLogLog, StatistiquesEsquisses, empreinte
+from detection.extraction import analyser_ligne
+from detection.pipeline import analyser
+from detection.rapport import StatistiquesRapport, statistiques_sequentielles
+
+
+def test_count_min_fusion_comme_un_seul_flux():
+    entier, premier, second = CountMin(0.01), CountMin(0.01), CountMin(0.01)
+    for i in range(500):
+        h = empreinte(f"ip{i % 37}")
+        entier.ajouter(h)
+        (premier if i < 200 else second).ajouter(h)
+    premier.fusionner(second)
+    assert premier.table == entier.table and premier.total == entier.total == 500
+    # Jamais sous-estimé
+    assert premier.estimer(empreinte("ip0")) >= len(range(0, 500, 37))
+
+
+def test_hyperloglog_fusion_comme_un_seul_flux():
+    entier, premier, second = HyperLogLog(0.05), HyperLogLog(0.05), HyperLogLog(0.05)
+    for i in range(2000):
+        h = empreinte(str(i))
+        entier.ajouter(h)
+        (premier if i % 2 else second).ajouter(h)
+    premier.fusionner(second)
+    assert premier.registres == entier.registres
+    assert abs(premier.estimer() - 2000) < 2000 * 0.15
+
+
+def test_elements_frequents_fusion_exacte_sous_la_capacite():
+    premier, second = ElementsFrequents(10), ElementsFrequents(10)
+    for cle, nombre in [("a", 5), ("b", 2)]:
+        premier.ajouter(cle, nombre)
+    for cle, nombre in [("a", 1), ("c", 4)]:
+        second.ajouter(cle, nombre)
+    assert premier.fusionner(second).classement() == [("a", 6), ("c", 4), ("b", 2)]
+
+
+def test_elements_frequents_garde_les_plus_frequents():
+    premier, second = ElementsFrequents(3), ElementsFrequents(3)
+    for i in range(300):
+        (premier if i < 150 else second).ajouter("lourd" if i % 3 == 0 else f"rare{i}")
+    classement = premier.fusionner(second).classement()
+    assert classement[0][0] == "lourd" and classement[0][1] >= 100
+
+
+@pytest.mark.parametrize("esquisse, autre", [
+    (CountMin(0.01), CountMin(0.001)),
+    (HyperLogLog(0.05), HyperLogLog(0.01)),
+    (ElementsFrequents(3), ElementsFrequents(4)),
+])
+def test_parametres_incompatibles(esquisse, autre):
+    with pytest.raises(ValueError):
+        esquisse.fusionner(autre)
+
+
+def _statistiques(lignes, debut=0, **parametres):
+    statistiques = StatistiquesEsquisses(**parametres)
+    for position, ligne in enumerate(lignes, debut):
+        statistiques.ajouter(analyser_ligne(ligne), position)
+    return statistiques
+
+
+def test_ip_au_seuil_dans_un_morceau_suivant():
+    # Succès de jour (pas d'alerte par eux-mêmes) puis 5 échecs dans un autre morceau
+    succes = [f"2026-01-10 10:00:0{i} USER=bob IP=9.9.9.9 STATUS=SUCCESS" for i in range(3)]
+    echecs = [f"2026-01-10 11:00:0{i} USER=bob IP=9.9.9.9 STATUS=FAIL" for i in range(5)]
+    fusion = _statistiques(succes).fusionner(_statistiques(echecs, len(succes)))
+    assert fusion.finaliser().alertes == 8
+    assert not fusion.en_attente and fusion.perdues == 0
+    assert fusion.nombre_echecs() == 5
+
+
+def test_morceaux_fusionnes_comme_la_lecture_sequentielle(lignes_journal):
+    exactes = statistiques_sequentielles(analyser(lignes_journal)).finaliser()
+    sequentielle = _statistiques(lignes_journal)
+    fusion = StatistiquesEsquisses()
+    for debut in range(0, len(lignes_journal), 700):
+        fusion.fusionner(_statistiques(lignes_journal[debut:debut + 700], debut))
+    for statistiques in (sequentielle, fusion):
+        activite = statistiques.finaliser()
+        assert statistiques.perdues == 0
+        assert activite.alertes == exactes.alertes
+        assert {h: n for h, (n, _) in activite.heures.items()} == {h: n for h, (n, _) in exactes.heures.items()}
+    assert fusion.echecs.table == sequentielle.echecs.table
+
+
+def test_ips_oubliees_comptees_dans_perdues():
+    lignes = [f"2026-01-10 10:00:00 USER=bob IP=10.0.0.{i} STATUS=SUCCESS" for i in range(5)]
+    statistiques = _statistiques(lignes, max_en_attente=2)
+    assert len(statistiques.en_attente) == 2
+    assert statistiques.perdues == 3
+    assert statistiques.finaliser().alertes == 0
+
+
+def test_fusion_parametres_differents():
+    with pytest.raises(ValueError):
+        StatistiquesEsquisses().fusionner(StatistiquesEsquisses(capacite=10))
+
+
+def test_enregistrer_et_charger(tmp_path, lignes_journal):
+    # Lignes en attente (IP sous le seuil) et plage d'heures comprises
+    statistiques = _statistiques(lignes_journal[:1000], plage_heures=set(range(6, 20)), capacite=50)
+    assert statistiques.en_attente
+    chemin = tmp_path / "jour.esq"
+    statistiques.enregistrer(chemin)
+    relues = StatistiquesEsquisses.charger(chemin)
+    assert relues.etat() == statistiques.etat()
+    assert list(relues.en_attente) == list(statistiques.en_attente)
+    # Relues puis complétées : comme si le calcul ne s'était pas interrompu
+    suite = _statistiques(lignes_journal[1000:], 1000, plage_heures=set(range(6, 20)), capacite=50)
+    attendues = _statistiques(lignes_journal, plage_heures=set(range(6, 20)), capacite=50)
+    relues.fusionner(suite)
+    assert relues.finaliser().alertes == attendues.finaliser().alertes
+    assert relues.echecs.table == attendues.echecs.table
+
+
+def test_fichier_json_avec_version(tmp_path):
+    chemin = tmp_path / "jour.esq"
+    _statistiques(["2026-01-10 10:00:00 USER=bob IP=10.0.0.1 STATUS=FAIL"]).enregistrer(chemin)
+    with gzip.open(chemin, "rt", encoding="utf-8") as fichier:
+        donnees = json.load(fichier)
+    assert donnees["format"] == "esquisses" and donnees["version"] == 3
+    assert donnees["top_ips"]["compteurs"] == [[0x0A000001, 1, 0]]
+
+
+class _Piege:
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('pickle exécuté')",))
+
+
+def _reecrire(chemin, modifier):
+    with gzip.open(chemin, "rt", encoding="utf-8") as fichier:
+        donnees = json.load(fichier)
+    modifier(donnees)
+    with gzip.open(chemin, "wt", encoding="utf-8") as fichier:
+        json.dump(donnees, fichier)
+
+
+@pytest.mark.parametrize("modifier", [
+    lambda d: d.update(version=2),
+    lambda d: d.update(format="autre"),
+    lambda d: d["echecs"].update(table=d["echecs"]["table"][:-8]),
+    lambda d: d["ips"].update(bits=30),
+    lambda d: d["top_ips"].update(compteurs=[[[1, 2], 1, 0]]),
+    lambda d: d.pop("en_attente"),
+    lambda d: d["parametres"].update(autre=1),
+])
+def test_fichier_invalide_refuse(tmp_path, modifier):
+    chemin = tmp_path / "jour.esq"
+    _statistiques(["2026-01-10 10:00:00 USER=bob IP=10.0.0.1 STATUS=FAIL"]).enregistrer(chemin)
+    _reecrire(chemin, modifier)
+    with pytest.raises(ValueError):
+        StatistiquesEsquisses.charger(chemin)
+
+
+@pytest.mark.parametrize("compresse", [False, True])
+def test_pickle_jamais_charge(tmp_path, compresse):
+    chemin = tmp_path / "piege.esq"
+    donnees = pickle.dumps((2, _Piege()))
+    chemin.write_bytes(gzip.compress(donnees) if compresse else donnees)
+    with pytest.raises(ValueError):
+        StatistiquesEsquisses.charger(chemin)
+
+
+def test_esquisses_et_rapport_exact_concordent_sur_les_echecs(lignes_journal):
+    exactes = StatistiquesRapport()
+    esquisses = StatistiquesEsquisses()
+    for position, ligne in enumerate(lignes_journal):
+        evenement = analyser_ligne(ligne)
+        exactes.ajouter(evenement, position)
+        esquisses.ajouter(evenement, position)
+    assert esquisses.nombre_echecs() == exactes.nombre_echecs()
+    top = max(exactes.echecs_par_ip.items(), key=lambda x: x[1])
+    assert esquisses.echecs_par_ip[top[0]] == top[1]
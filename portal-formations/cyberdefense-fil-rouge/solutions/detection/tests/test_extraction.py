@@ -0,0 +1,75 @@
+import calendar
+from datetime import datetime
+
+import pytest
+
+from detection.extraction import analyser_ligne, decoder_horodatage, hors_heures
+
+
+def test_analyser_ligne():
+    evenement = analyser_ligne("2026-01-10 09:12:45 sshd[42]: USER=alice IP=192.168.1.10 STATUS=FAIL", 7)
+    assert evenement.numero == 7
+    assert evenement.date == "2026-01-10 09:12:45"
+    assert evenement.heure == 9
+    assert (evenement.ip, evenement.user, evenement.statut) == ("192.168.1.10", "alice", "FAIL")
+    assert evenement.echec
+
+
+def test_analyser_ligne_ordre_des_champs():
+    evenement = analyser_ligne("2026-01-10 19:00:00 IP=::1 STATUS=SUCCESS USER=admin")
+    assert (evenement.ip, evenement.user, evenement.statut) == ("::1", "admin", "SUCCESS")
+    assert not evenement.echec
+
+
+def test_analyser_ligne_incomplete():
+    evenement = analyser_ligne("invalide")
+    assert evenement.date == "DATE_INCONNUE"
+    assert evenement.heure is evenement.ip is evenement.user is evenement.statut is None
+    assert analyser_ligne("").date == "DATE_INCONNUE"
+
+
+@pytest.mark.parametrize("texte, heure", [("00", 0), ("07", 7), ("23", 23), ("24", None), ("25", None),
+                                          ("-3", None), ("xx", None), ("", None)])
+def test_heure_valide_seulement_de_0_a_23(texte, heure):
+    assert analyser_ligne(f"2026-01-10 {texte}:10:00 IP=1.2.3.4 STATUS=SUCCESS").heure == heure
+
+
+@pytest.mark.parametrize("heure, attendu", [(None, False), (0, True), (7, True), (8, False), (17, False),
+                                            (18, True), (23, True)])
+def test_hors_heures(heure, attendu):
+    assert hors_heures(heure) is attendu
+
+
+def _epoch(texte):
+    return calendar.timegm(datetime.strptime(texte, "%Y-%m-%d %H:%M:%S").timetuple())
+
+
+@pytest.mark.parametrize("texte", ["1970-01-01 00:00:00", "2026-01-10 09:12:45", "2024-02-29 23:59:59",
+                                   "2026-12-31 00:00:01"])
+def test_decoder_horodatage(texte):
+    assert decoder_horodatage(texte) == _epoch(texte)
+    # Deuxième appel : réponse mémorisée, identique
+    assert decoder_horodatage(texte) == _epoch(texte)
+
+
+def test_decoder_horodatage_memo_par_jour():
+    # Même jour, secondes différentes, dans le désordre
+    for texte in ["2026-03-01 10:00:00", "2026-03-01 09:59:59", "2026-03-02 00:00:00", "2026-03-01 10:00:00"]:
+        assert decoder_horodatage(texte) == _epoch(texte)
+
+
+@pytest.mark.parametrize("texte", ["2026-02-30 10:00:00", "2026-01-01 24:00:00", "2026-01-01 10:60:00",
+                                   "2026-01-01 1a:00:00", "DATE_INCONNUE", "2026/01/01 10:00:00"])
+def test_decoder_horodatage_invalide(texte):
+    assert decoder_horodatage(texte) is None
+
+
+def test_decoder_horodatage_iso():
+    assert decoder_horodatage("2026-01-10T09:12:45") == _epoch("2026-01-10 09:12:45")
+    assert decoder_horodatage("2026-01-10 09:12") == _epoch("2026-01-10 09:12:00")
+
+
+def test_horodatage_d_un_evenement():
+    evenement = analyser_ligne("2026-01-10 09:12:45 IP=1.2.3.4 STATUS=FAIL")
+    assert evenement.horodatage == _epoch("2026-01-10 09:12:45")
+    assert analyser_ligne("invalide").horodatage is None
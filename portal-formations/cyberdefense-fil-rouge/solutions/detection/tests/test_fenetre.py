@@ -0,0 +1,67 @@
+import pytest
+
+from detection.fenetre import DetecteurFenetre
+
+
+def test_seuil_dans_la_fenetre():
+    detecteur = DetecteurFenetre(seuil=3, fenetre=60)
+    assert [detecteur.ajouter("1.1.1.1", t) for t in (0, 10, 20, 30)] == [False, False, True, True]
+
+
+def test_echecs_trop_espaces():
+    detecteur = DetecteurFenetre(seuil=3, fenetre=60)
+    assert [detecteur.ajouter("1.1.1.1", t) for t in (0, 40, 80, 120)] == [False, False, False, False]
+
+
+def test_limite_de_fenetre_incluse():
+    detecteur = DetecteurFenetre(seuil=2, fenetre=60)
+    detecteur.ajouter("1.1.1.1", 0)
+    assert detecteur.ajouter("1.1.1.1", 60)
+    assert not detecteur.ajouter("1.1.1.1", 121)
+
+
+def test_ip_independantes():
+    detecteur = DetecteurFenetre(seuil=2, fenetre=60)
+    assert not detecteur.ajouter("1.1.1.1", 0)
+    assert not detecteur.ajouter("2.2.2.2", 1)
+    assert detecteur.ajouter("1.1.1.1", 2)
+    assert detecteur.echecs_recents("2.2.2.2") == 1
+
+
+def test_ip_expiree_oubliee():
+    detecteur = DetecteurFenetre(seuil=3, fenetre=60)
+    detecteur.ajouter("1.1.1.1", 0)
+    detecteur.ajouter("2.2.2.2", 100)
+    assert len(detecteur) == 1
+    assert detecteur.ips_oubliees == 1
+    assert detecteur.echecs_recents("1.1.1.1") == 0
+
+
+def test_plafond_d_ips():
+    detecteur = DetecteurFenetre(seuil=2, fenetre=600, max_ips=2)
+    detecteur.ajouter("1.1.1.1", 0)
+    detecteur.ajouter("2.2.2.2", 1)
+    detecteur.ajouter("1.1.1.1", 2)  # 1.1.1.1 redevient la plus récente
+    detecteur.ajouter("3.3.3.3", 3)  # 2.2.2.2, la moins récemment active, est oubliée
+    assert len(detecteur) == 2
+    assert detecteur.echecs_recents("2.2.2.2") == 0
+    assert detecteur.echecs_recents("1.1.1.1") == 2
+
+
+def test_charger_sans_alerte():
+    detecteur = DetecteurFenetre(seuil=3, fenetre=60)
+    detecteur.charger("1.1.1.1", [5, 1, 3, 4])
+    assert detecteur.echecs_recents("1.1.1.1") == 3
+    assert detecteur.ajouter("1.1.1.1", 6)
+
+
+def test_oublier():
+    detecteur = DetecteurFenetre(seuil=2, fenetre=60)
+    detecteur.ajouter("1.1.1.1", 0)
+    detecteur.oublier("1.1.1.1")
+    assert not detecteur.ajouter("1.1.1.1", 1)
+
+
+def test_seuil_invalide():
+    with pytest.raises(ValueError):
+        DetecteurFenetre(seuil=0)
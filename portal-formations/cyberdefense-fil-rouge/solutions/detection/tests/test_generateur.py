@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+from .conftest import GENERATEUR, LIGNES
+
+
+def _generer(chemin, *options):
+    resultat = subprocess.run([sys.executable, GENERATEUR, "--out", str(chemin), *options],
+                              check=True, capture_output=True, text=True, encoding="utf-8")
+    return resultat.stdout
+
+
+def test_meme_graine_meme_journal(dossier_journal, tmp_path):
+    # Mêmes options que le journal des autres tests : mêmes octets
+    options = ["--lines", str(LIGNES), "--days-span", "2", "--bursts", "4"]
+    _generer(tmp_path / "auth.log", *options, "--seed", "7")
+    assert (tmp_path / "auth.log").read_bytes() == (dossier_journal / "data" / "auth.log").read_bytes()
+    _generer(tmp_path / "autre.log", *options, "--seed", "8")
+    assert (tmp_path / "autre.log").read_bytes() != (tmp_path / "auth.log").read_bytes()
+
+
+def test_rafales_annoncees(tmp_path):
+    sortie = _generer(tmp_path / "auth.log", "--lines", "50", "--seed", "1", "--bursts", "1000")
+    with open(tmp_path / "auth.log", encoding="utf-8") as fichier:
+        assert sum(1 for _ in fichier) == 50
+    # Trop de rafales pour 50 lignes : le nombre annoncé est celui réellement écrit
+    assert "1,000 rafales" not in sortie
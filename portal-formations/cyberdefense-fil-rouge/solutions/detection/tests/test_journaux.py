@@ -0,0 +1,66 @@
+import bz2
+import gzip
+import lzma
+import os
+
+import pytest
+
+from detection.journaux import developper, est_compresse, ouvrir
+from detection.pipeline import lire_lignes
+
+
+def _ecrire(chemin, texte, ouvreur=open):
+    with ouvreur(chemin, "wt", encoding="utf-8") as fichier:
+        fichier.write(texte)
+
+
+@pytest.fixture
+def historique(tmp_path):
+    """auth.log.10.gz (le plus ancien) ... auth.log (le plus récent), une ligne chacun."""
+    fichiers = [
+        ("auth.log.10.gz", gzip.open),
+        ("auth.log.9.xz", lzma.open),
+        ("auth.log.2.bz2", bz2.open),
+        ("auth.log.1", open),
+        ("auth.log", open),
+    ]
+    for rang, (nom, ouvreur) in enumerate(fichiers):
+        _ecrire(tmp_path / nom, f"ligne {rang}\n", ouvreur)
+    # Fichiers de travail, à ignorer
+    _ecrire(tmp_path / "auth.log.etat", "")
+    (tmp_path / "auth.log.index").mkdir()
+    return tmp_path, [nom for nom, _ in fichiers]
+
+
+def test_ordre_chronologique(historique):
+    dossier, noms = historique
+    chemins = developper(os.path.join(dossier, "auth.log*"))
+    assert [os.path.basename(c) for c in chemins] == noms
+
+
+def test_liste_et_doublons(historique):
+    dossier, _ = historique
+    chemins = developper([str(dossier / "auth.log"), str(dossier / "auth.log.1"), str(dossier / "auth.log")])
+    assert [os.path.basename(c) for c in chemins] == ["auth.log.1", "auth.log"]
+
+
+def test_motif_sans_fichier(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        developper(os.path.join(tmp_path, "absent*"))
+
+
+def test_lire_lignes_dans_l_ordre(historique):
+    dossier, noms = historique
+    assert list(lire_lignes(os.path.join(dossier, "auth.log*"))) == [f"ligne {i}" for i in range(len(noms))]
+
+
+def test_compression_reconnue_au_contenu(tmp_path):
+    # Extension trompeuse : ce sont les premiers octets qui comptent
+    _ecrire(tmp_path / "auth.log.1", "compressé\n", gzip.open)
+    _ecrire(tmp_path / "auth.log.gz", "en clair\n")
+    assert est_compresse(tmp_path / "auth.log.1")
+    assert not est_compresse(tmp_path / "auth.log.gz")
+    with ouvrir(tmp_path / "auth.log.1", texte=True) as fichier:
+        assert fichier.read() == "compressé\n"
+    with ouvrir(tmp_path / "auth.log.gz") as fichier:
+        assert fichier.read() == "en clair\n".encode("utf-8")
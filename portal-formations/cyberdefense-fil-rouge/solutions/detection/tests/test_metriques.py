@@ -0,0 +1,97 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from detection.metriques import ChronoRegles, Registre
+
+
+def test_format_d_exposition():
+    registre = Registre()
+    registre.compteur("lignes_total", "Lignes lues", source="a.log").ajouter(3)
+    registre.compteur("lignes_total", "Lignes lues", source='b "2"\\').ajouter()
+    registre.jauge("file", "Lots en file").definir(2.0)
+    registre.jauge("retard", "Octets non lus", fonction=lambda: 1.5)
+    assert registre.exporter() == (
+        "# HELP lignes_total Lignes lues\n"
+        "# TYPE lignes_total counter\n"
+        'lignes_total{source="a.log"} 3\n'
+        'lignes_total{source="b \\"2\\"\\\\"} 1\n'
+        "# HELP file Lots en file\n"
+        "# TYPE file gauge\n"
+        "file 2\n"
+        "# HELP retard Octets non lus\n"
+        "# TYPE retard gauge\n"
+        "retard 1.5\n"
+    )
+
+
+def test_meme_serie_meme_objet_et_type_impose():
+    registre = Registre()
+    compteur = registre.compteur("alertes_total", "Alertes", regle="ADMIN")
+    assert registre.compteur("alertes_total", "Alertes", regle="ADMIN") is compteur
+    assert registre.compteur("alertes_total", "Alertes", regle="NUIT") is not compteur
+    with pytest.raises(ValueError):
+        registre.jauge("alertes_total", "Alertes")
+
+
+def test_jauge_en_erreur_omise():
+    registre = Registre()
+
+    def taille():
+        raise FileNotFoundError("en pleine rotation")
+
+    registre.jauge("octets", "Octets", fonction=taille)
+    assert registre.exporter() == "# HELP octets Octets\n# TYPE octets gauge\n"
+
+
+def test_histogramme_tranches_cumulees():
+    registre = Registre()
+    histogramme = registre.histogramme("duree_secondes", "Durée", tranches=(0.5, 0.1, 1), regle="X")
+    for valeur in (0.05, 0.1, 0.3, 0.5, 2.0):
+        histogramme.observer(valeur)
+    lignes = registre.exporter().splitlines()
+    assert lignes[1] == "# TYPE duree_secondes histogram"
+    # Bornes triées, incluses (le = « inférieur ou égal »), +Inf = total
+    assert lignes[2:] == [
+        'duree_secondes_bucket{regle="X",le="0.1"} 2',
+        'duree_secondes_bucket{regle="X",le="0.5"} 4',
+        'duree_secondes_bucket{regle="X",le="1"} 4',
+        'duree_secondes_bucket{regle="X",le="+Inf"} 5',
+        'duree_secondes_sum{regle="X"} 2.95',
+        'duree_secondes_count{regle="X"} 5',
+    ]
+
+
+def test_chrono_une_ligne_sur_n():
+    registre = Registre()
+    chrono = ChronoRegles(registre, echantillon=4)
+    assert [chrono.ligne() for _ in range(9)] == [True, False, False, False, True, False, False, False, True]
+    chrono.observer("ADMIN", 2e-6)
+    chrono.observer("ADMIN", 3e-3)
+    assert 'detection_duree_regle_secondes_count{regle="ADMIN"} 2' in registre.exporter()
+
+
+def test_ecrire_fichier(tmp_path):
+    registre = Registre()
+    registre.compteur("lignes_total", "Lignes").ajouter(7)
+    chemin = str(tmp_path / "detection.prom")
+    registre.ecrire(chemin)
+    with open(chemin, encoding="utf-8") as fichier:
+        assert fichier.read() == registre.exporter()
+    assert not (tmp_path / "detection.prom.tmp").exists()
+
+
+def test_servir_http():
+    registre = Registre()
+    registre.compteur("lignes_total", "Lignes").ajouter(7)
+    serveur = registre.servir(0)
+    url = f"http://127.0.0.1:{serveur.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as reponse:
+            assert reponse.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert reponse.read().decode("utf-8") == registre.exporter()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/autre", timeout=5)
+    finally:
+        registre.fermer()
@@ -0,0 +1,56 @@
+import pytest
+
+from detection import parallele
+from detection.parallele import alertes_paralleles, decouper, echecs_paralleles, statistiques_paralleles
+from detection.pipeline import analyser, juger_avec_totaux, lire_lignes
+from detection.prefiltre import compter_echecs_par_ip
+from detection.rapport import statistiques_sequentielles
+from detection.regles import FICHIER_DEFAUT, MoteurRegles, evaluer_en_flux, evaluer_par_lots
+
+
+@pytest.fixture
+def journal(dossier_journal):
+    return str(dossier_journal / "data" / "auth.log")
+
+
+def test_decouper_aligne_sur_les_lignes(journal):
+    plages = decouper(journal, 7)
+    with open(journal, "rb") as fichier:
+        donnees = fichier.read()
+    assert plages[0][0] == 0 and plages[-1][1] == len(donnees)
+    for (_, fin), (debut, _) in zip(plages, plages[1:]):
+        assert fin == debut and donnees[debut - 1:debut] == b"\n"
+
+
+def test_echecs_paralleles(journal):
+    assert echecs_paralleles(journal, 2) == compter_echecs_par_ip(journal)
+
+
+def test_statistiques_paralleles(journal):
+    attendues = statistiques_sequentielles(analyser(lire_lignes(journal))).finaliser()
+    obtenues = statistiques_paralleles(journal, 3).finaliser()
+    assert obtenues.alertes == attendues.alertes
+    assert {h: n for h, (n, _) in obtenues.heures.items()} == {h: n for h, (n, _) in attendues.heures.items()}
+
+
+@pytest.mark.parametrize("semantique, court_circuit", [("toutes", False), ("premiere", True)])
+def test_alertes_paralleles_dans_l_ordre(journal, monkeypatch, semantique, court_circuit):
+    # Plages de 16 ko : bien plus de tâches que de processus
+    monkeypatch.setattr(parallele, "OCTETS_PAR_TACHE", 16 << 10)
+    moteur = MoteurRegles.depuis_fichier(semantique=semantique)
+    echecs_par_ip = compter_echecs_par_ip(journal)
+    if court_circuit:
+        evaluateur = moteur.court_circuit(echecs_par_ip)
+        attendues = [(e.ligne, v) for e, v in evaluer_en_flux(lire_lignes(journal), evaluateur)]
+        evaluateur = moteur.court_circuit(echecs_par_ip)
+    else:
+        evaluateur = None
+        jugements = juger_avec_totaux(analyser(lire_lignes(journal)), echecs_par_ip)
+        attendues = [(e.ligne, v) for e, v in evaluer_par_lots(jugements, moteur)]
+
+    alertes = list(alertes_paralleles(journal, FICHIER_DEFAUT, semantique, echecs_par_ip, 2, evaluateur))
+    assert [(e.ligne, v) for e, v in alertes] == attendues
+    positions = [e.numero for e, _ in alertes]
+    assert positions == sorted(positions)
+    if court_circuit:
+        assert sum(m["correspondances"] for m in evaluateur.selectivite()) == len(attendues)
@@ -0,0 +1,198 @@
+"""
+Les solutions en flux donnent les mêmes alertes que les solutions d'origine
+(deux lectures complètes du journal avec ``readlines()``), recodées ici
+telles quelles comme référence.
+"""
+
+import gzip
+import re
+import shutil
+
+import pytest
+
+from .conftest import lancer_etape
+
+HEURE_DEBUT = 8
+HEURE_FIN = 18
+ALERTE = re.compile(r"^\[(?P<date>[^\]]*)\] \[(?P<niveau>\w+)\] (?P<raison>.*?) - (?P<ligne>.*)$")
+
+
+# --- solutions d'origine ----------------------------------------------------
+
+def _ip(ligne):
+    debut = ligne.find("IP=")
+    return ligne[debut + 3:].split()[0] if debut != -1 else None
+
+
+def _heure(ligne):
+    parties = ligne.split()
+    if len(parties) >= 2:
+        try:
+            return int(parties[1].split(":")[0])
+        except ValueError:
+            return None
+    return None
+
+
+def _user(ligne):
+    debut = ligne.find("USER=")
+    if debut != -1:
+        partie = ligne[debut + 5:].split()
+        return partie[0] if partie else ""
+    return None
+
+
+def _echecs_par_ip(lignes):
+    echecs_par_ip = {}
+    for ligne in lignes:
+        if "STATUS=FAIL" in ligne:
+            ip = _ip(ligne)
+            if ip:
+                echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + 1
+    return echecs_par_ip
+
+
+def _raisons(ligne, echecs_par_ip):
+    raisons = []
+    ip = _ip(ligne)
+    if ip and echecs_par_ip.get(ip, 0) >= 5:
+        raisons.append("IP avec 5+ échecs")
+    heure = _heure(ligne)
+    if heure is not None and (heure < HEURE_DEBUT or heure >= HEURE_FIN):
+        raisons.append("Connexion hors heures normales")
+    if _user(ligne) == "admin":
+        raisons.append("Tentative sur compte admin")
+    return raisons
+
+
+def reference_etape4(lignes):
+    """Lignes « [raison] ligne » : la première règle qui correspond."""
+    echecs_par_ip = _echecs_par_ip(lignes)
+    sortie = []
+    for ligne in lignes:
+        raisons = _raisons(ligne, echecs_par_ip)
+        if raisons:
+            sortie.append(f"  [{raisons[0]}] {ligne}")
+    return sortie
+
+
+def reference_etape5(lignes):
+    """
+    (date, niveau, raisons, ligne) de chaque alerte. Écarts voulus avec
+    l'origine : libellé « Connexion hors heures normales » et niveau de la
+    règle la plus sévère (l'origine gardait le niveau de la dernière règle).
+    """
+    echecs_par_ip = _echecs_par_ip(lignes)
+    alertes = []
+    for ligne in lignes:
+        raisons = _raisons(ligne, echecs_par_ip)
+        if raisons:
+            parties = ligne.split()
+            date = f"{parties[0]} {parties[1]}" if len(parties) >= 2 else "DATE_INCONNUE"
+            niveau = "WARNING" if raisons == ["Connexion hors heures normales"] else "CRITIQUE"
+            alertes.append((date, niveau, " | ".join(raisons), ligne))
+    return alertes
+
+
+# --- comparaisons -----------------------------------------------------------
+
+def _evenements_suspects(sortie):
+    return [ligne for ligne in sortie.splitlines() if ligne.startswith("  [")]
+
+
+def _alertes(chemin):
+    with open(chemin, encoding="utf-8") as fichier:
+        return [ALERTE.match(ligne.rstrip("\n")).groups() for ligne in fichier if ligne.startswith("[")]
+
+
+def test_reference_non_vide(lignes_journal):
+    # Le journal fixe déclenche les trois règles
+    raisons = {r for _, _, r, _ in reference_etape5(lignes_journal)}
+    assert any("IP avec 5+ échecs" in r for r in raisons)
+    assert any("hors heures" in r for r in raisons)
+    assert any("admin" in r for r in raisons)
+
+
+@pytest.mark.parametrize("options", [(), ("--processus", "2")])
+def test_etape4_identique_a_l_origine(dossier_journal, lignes_journal, options):
+    sortie = lancer_etape(4, dossier_journal, *options)
+    assert _evenements_suspects(sortie) == reference_etape4(lignes_journal)
+
+
+@pytest.mark.parametrize("options", [(), ("--processus", "2")])
+def test_etape5_identique_a_l_origine(dossier_journal, lignes_journal, tmp_path, options):
+    sortie = tmp_path / "alertes.txt"
+    texte = lancer_etape(5, dossier_journal, "--sortie", str(sortie), *options)
+    attendues = reference_etape5(lignes_journal)
+    assert _alertes(sortie) == attendues
+    assert f"{len(attendues)} alertes générées" in texte
+
+
+def test_etape4_selectivite(dossier_journal, lignes_journal):
+    sortie = lancer_etape(4, dossier_journal, "--selectivite")
+    mesures = re.findall(r"^\s+(\w+)\s+(\d+)/(\d+)", sortie, re.MULTILINE)
+    # Court-circuit : chaque ligne passe d'abord par la règle la plus prioritaire
+    assert mesures[0][0] == "IP_SUSPECTE" and int(mesures[0][2]) == len(lignes_journal)
+    assert sum(int(correspondances) for _, correspondances, _ in mesures) == len(reference_etape4(lignes_journal))
+
+
+def test_etape5_historique_compresse(dossier_journal, lignes_journal, tmp_path):
+    # Le même journal coupé en rotations (la plus ancienne compressée) : mêmes alertes
+    (tmp_path / "data").mkdir()
+    moitie = len(lignes_journal) // 2
+    with gzip.open(tmp_path / "data" / "auth.log.1.gz", "wt", encoding="utf-8") as fichier:
+        fichier.write("\n".join(lignes_journal[:moitie]) + "\n")
+    with open(tmp_path / "data" / "auth.log", "w", encoding="utf-8") as fichier:
+        fichier.write("\n".join(lignes_journal[moitie:]) + "\n")
+    attendues = reference_etape5(lignes_journal)
+    for options in [(), ("--processus", "2")]:
+        sortie = tmp_path / "alertes.txt"
+        lancer_etape(5, tmp_path, "data/auth.log*", "--sortie", str(sortie), *options)
+        assert _alertes(sortie) == attendues
+
+
+def _rapport(sortie):
+    # Sans les lignes qui changent d'un lancement à l'autre
+    return [ligne for ligne in sortie.splitlines() if not ligne.startswith(("Rapport généré le", "🗂️"))]
+
+
+def test_etape3_identique_a_l_origine(dossier_journal, lignes_journal):
+    sortie = lancer_etape(3, dossier_journal)
+    attendues = [ligne for ligne in lignes_journal
+                 if (heure := _heure(ligne)) is not None and (heure < HEURE_DEBUT or heure >= HEURE_FIN)]
+    assert [ligne.split(" : ", 1)[1] for ligne in sortie.splitlines() if ligne.startswith("🚨")] == attendues
+
+
+def test_etape7_sequentiel_parallele_index(dossier_journal, tmp_path):
+    (tmp_path / "data").mkdir()
+    shutil.copy(dossier_journal / "data" / "auth.log", tmp_path / "data" / "auth.log")
+    # « IP= » sans valeur : ni échec compté, ni IP suspecte
+    with open(tmp_path / "data" / "auth.log", "a", encoding="utf-8") as fichier:
+        fichier.writelines(f"2026-01-10 10:00:0{i} USER=bob IP= STATUS=FAIL\n" for i in range(6))
+    sequentiel = _rapport(lancer_etape(7, tmp_path))
+    assert _rapport(lancer_etape(7, tmp_path, "--processus", "2")) == sequentiel
+    assert _rapport(lancer_etape(7, tmp_path, "--index")) == sequentiel
+    # Une seconde fois : index déjà à jour
+    assert _rapport(lancer_etape(7, tmp_path, "--index")) == sequentiel
+
+
+def test_etape7_ip_vide_sans_alerte(tmp_path):
+    (tmp_path / "data").mkdir()
+    with open(tmp_path / "data" / "auth.log", "w", encoding="utf-8") as fichier:
+        fichier.writelines(f"2026-01-10 10:00:0{i} USER=bob IP= STATUS=FAIL\n" for i in range(6))
+    for options in [(), ("--index",)]:
+        rapport = _rapport(lancer_etape(7, tmp_path, *options))
+        assert "Nombre total d'alertes détectées : 0" in rapport
+        assert "Nombre total d'échecs d'authentification : 0" in rapport
+
+
+def test_etape5_rotation(dossier_journal, lignes_journal, tmp_path):
+    sortie = tmp_path / "alertes.txt"
+    lancer_etape(5, dossier_journal, "--sortie", str(sortie), "--taille-max", "20000", "--garder", "1000")
+    fichiers = sorted(tmp_path.glob("alertes.txt.*"), key=lambda chemin: -int(chemin.suffix[1:]))
+    assert fichiers
+    assert [alerte for chemin in fichiers + [sortie] for alerte in _alertes(chemin)] == reference_etape5(lignes_journal)
+    # Plus de fichiers que --garder : le lancement le signale
+    texte = lancer_etape(5, dossier_journal, "--sortie", str(tmp_path / "court.txt"), "--taille-max", "20000",
+                         "--garder", "1")
+    assert "alertes effacées par la rotation" in texte
@@ -0,0 +1,26 @@
+from detection.pipeline import analyser, lire_lignes
+from detection.prefiltre import compter_echecs_par_ip, evenements_echec, lignes_contenant
+
+
+def test_compter_echecs_par_ip(dossier_journal):
+    journal = str(dossier_journal / "data" / "auth.log")
+    attendus = {}
+    for evenement in analyser(lire_lignes(journal)):
+        if evenement.echec and evenement.ip:
+            attendus[evenement.ip] = attendus.get(evenement.ip, 0) + 1
+    assert compter_echecs_par_ip(journal) == attendus
+
+
+def test_motif_hors_statut_et_derniere_ligne_sans_retour(tmp_path):
+    journal = tmp_path / "auth.log"
+    journal.write_bytes(b"2026-01-10 09:00:00 USER=a IP=1.1.1.1 STATUS=FAILED\n"
+                        b"2026-01-10 09:00:01 USER=b IP=1.1.1.1 STATUS=SUCCESS\n"
+                        b"2026-01-10 09:00:02 USER=c IP=2.2.2.2 STATUS=FAIL")
+    assert len(list(lignes_contenant(str(journal)))) == 2
+    assert [e.user for e in evenements_echec(str(journal))] == ["c"]
+
+
+def test_fichier_vide(tmp_path):
+    journal = tmp_path / "auth.log"
+    journal.write_bytes(b"")
+    assert compter_echecs_par_ip(str(journal)) == {}
@@ -0,0 +1,112 @@
+import pytest
+
+from detection.extraction import SEUIL_ECHECS, analyser_ligne
+from detection.pipeline import analyser, juger_avec_totaux
+from detection.prefiltre import compter_echecs_par_ip
+from detection.regles import SEMANTIQUES, MoteurRegles, Verdict, evaluer_en_flux, evaluer_par_lots
+
+# Une règle peu sévère avant une règle sévère : les sémantiques divergent
+CONFIG = {
+    "regles": [
+        {"nom": "HORS_HEURES", "type": "plage_horaire", "debut": 8, "fin": 18, "niveau": "WARNING",
+         "libelle": "Hors heures"},
+        {"nom": "ADMIN", "type": "utilisateurs", "utilisateurs": ["admin", "root"], "niveau": "CRITIQUE",
+         "libelle": "Compte admin"},
+        {"nom": "IP_SUSPECTE", "type": "seuil_echecs", "seuil": 3, "niveau": "INFO"},
+    ]
+}
+
+NUIT_ADMIN = analyser_ligne("2026-01-10 23:00:00 USER=admin IP=1.1.1.1 STATUS=FAIL")
+JOUR_ROOT = analyser_ligne("2026-01-10 10:00:00 USER=root IP=2.2.2.2 STATUS=SUCCESS")
+JOUR_ALICE = analyser_ligne("2026-01-10 10:00:00 USER=alice IP=3.3.3.3 STATUS=SUCCESS")
+HEURE_INCONNUE = analyser_ligne("2026-01-10 25:00:00 USER=alice IP=3.3.3.3 STATUS=SUCCESS")
+
+
+def _verdicts(semantique, evenements, ip_suspectes=None):
+    moteur = MoteurRegles(CONFIG, semantique)
+    ip_suspectes = ip_suspectes or [False] * len(evenements)
+    return {e.date + e.user: v for e, v in moteur.evaluer_lot(evenements, ip_suspectes)}
+
+
+def test_premiere():
+    verdicts = _verdicts("premiere", [NUIT_ADMIN, JOUR_ROOT, JOUR_ALICE])
+    assert verdicts == {
+        NUIT_ADMIN.date + "admin": Verdict("WARNING", "Hors heures", ("HORS_HEURES",)),
+        JOUR_ROOT.date + "root": Verdict("CRITIQUE", "Compte admin", ("ADMIN",)),
+    }
+
+
+def test_toutes():
+    verdicts = _verdicts("toutes", [NUIT_ADMIN, JOUR_ALICE], [True, False])
+    assert verdicts == {
+        NUIT_ADMIN.date + "admin": Verdict(
+            "CRITIQUE", "Hors heures | Compte admin | IP_SUSPECTE", ("HORS_HEURES", "ADMIN", "IP_SUSPECTE")
+        ),
+    }
+
+
+def test_severite_max():
+    verdicts = _verdicts("severite_max", [NUIT_ADMIN, JOUR_ALICE], [False, True])
+    assert verdicts == {
+        NUIT_ADMIN.date + "admin": Verdict("CRITIQUE", "Compte admin", ("ADMIN",)),
+        JOUR_ALICE.date + "alice": Verdict("INFO", "IP_SUSPECTE", ("IP_SUSPECTE",)),
+    }
+
+
+@pytest.mark.parametrize("semantique", SEMANTIQUES)
+def test_heure_inconnue_jamais_hors_heures(semantique):
+    assert _verdicts(semantique, [HEURE_INCONNUE]) == {}
+    evaluateur = MoteurRegles(CONFIG, semantique).court_circuit({})
+    assert evaluateur.evaluer(HEURE_INCONNUE.ligne) is None
+
+
+def test_seuil_de_la_regle():
+    assert MoteurRegles(CONFIG).seuil_echecs == 3
+    assert MoteurRegles({"regles": []}).seuil_echecs == SEUIL_ECHECS
+
+
+def test_une_seule_regle_seuil_echecs():
+    config = {"regles": CONFIG["regles"] + [{"nom": "IP_TRES_SUSPECTE", "type": "seuil_echecs", "seuil": 20}]}
+    with pytest.raises(ValueError, match="IP_SUSPECTE et IP_TRES_SUSPECTE"):
+        MoteurRegles(config)
+
+
+@pytest.mark.parametrize("config, semantique", [
+    (CONFIG, "au_hasard"),
+    ({"regles": [{"nom": "X", "type": "inconnu"}]}, None),
+    ({"regles": [{"nom": "X", "type": "utilisateurs", "utilisateurs": [], "niveau": "GRAVE"}]}, None),
+])
+def test_configuration_invalide(config, semantique):
+    with pytest.raises(ValueError):
+        MoteurRegles(config, semantique)
+
+
+@pytest.mark.parametrize("semantique", SEMANTIQUES)
+def test_court_circuit_comme_les_lots(dossier_journal, lignes_journal, semantique):
+    journal = dossier_journal / "data" / "auth.log"
+    moteur = MoteurRegles.depuis_fichier(semantique=semantique)
+    echecs_par_ip = compter_echecs_par_ip(journal)
+    par_lots = [
+        (e.numero, v)
+        for e, v in evaluer_par_lots(juger_avec_totaux(analyser(lignes_journal), echecs_par_ip), moteur, taille_lot=500)
+    ]
+    en_flux = [(e.numero, v) for e, v in evaluer_en_flux(lignes_journal, moteur.court_circuit(echecs_par_ip))]
+    assert par_lots and par_lots == en_flux
+
+
+def test_relever_et_cumuler(lignes_journal):
+    moteur = MoteurRegles.depuis_fichier()
+    moitie = len(lignes_journal) // 2
+    seul = moteur.court_circuit({})
+    premier, second = moteur.court_circuit({}), moteur.court_circuit({})
+    for ligne in lignes_journal:
+        seul.evaluer(ligne)
+    for ligne in lignes_journal[:moitie]:
+        premier.evaluer(ligne)
+    for ligne in lignes_journal[moitie:]:
+        second.evaluer(ligne)
+    premier.cumuler(second.relever())
+    comptes = [(m["regle"], m["evaluations"], m["correspondances"]) for m in seul.selectivite()]
+    assert [(m["regle"], m["evaluations"], m["correspondances"]) for m in premier.selectivite()] == comptes
+    # Relevé remis à zéro
+    assert all(m["evaluations"] == 0 for m in second.selectivite())
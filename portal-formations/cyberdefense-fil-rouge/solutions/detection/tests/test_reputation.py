@@ -0,0 +1,124 @@
+import sqlite3
+import time
+
+import pytest
+
+from detection import reputation
+from detection.reputation import MagasinReputation
+
+
+@pytest.fixture
+def chemin(tmp_path):
+    return str(tmp_path / "reputation.db")
+
+
+def test_upserts_par_paquets(chemin):
+    magasin = MagasinReputation(chemin, seuil=3)
+    # Plus d'IP que TAILLE_REQUETE : les IP existantes sont relues par paquets
+    for i in range(1200):
+        magasin.echec(f"10.0.{i // 256}.{i % 256}", 100 + i)
+    magasin.echec("10.0.0.0", 50)
+    assert len(magasin) == 1200
+    assert magasin.ecrire() == 1200
+    assert magasin.ecritures == 1 and len(magasin) == 0
+    assert magasin.ecrire() == 0
+
+    # Deuxième paquet : cumulé avec ce qui est déjà en base
+    for horodatage in (400, 300, 500, 200):
+        magasin.echec("10.0.0.0", horodatage)
+    magasin.alerte("10.0.0.0", 500, "force brute")
+    assert magasin.ecrire() == 1
+    infos = magasin.infos("10.0.0.0")
+    assert (infos["echecs"], infos["premier"], infos["dernier"]) == (6, 50, 500)
+    assert infos["recents"] == "300 400 500"
+    assert (infos["alertes"], infos["derniere_alerte"]) == (1, 500)
+    assert magasin.infos("192.0.2.1") is None
+    magasin.fermer()
+
+
+def test_recents_bornes_en_memoire(chemin):
+    magasin = MagasinReputation(chemin, seuil=2)
+    for horodatage in range(100):
+        magasin.echec("1.1.1.1", horodatage)
+    assert len(magasin._attente["1.1.1.1"].recents) <= 4 * 2
+    magasin.fermer()
+    magasin = MagasinReputation(chemin, seuil=2)
+    infos = magasin.infos("1.1.1.1")
+    assert (infos["echecs"], infos["premier"], infos["dernier"], infos["recents"]) == (100, 0, 99, "98 99")
+    magasin.fermer()
+
+
+def test_reprise_a_chaud(chemin):
+    magasin = MagasinReputation(chemin, seuil=3)
+    for ip, horodatages in [("ancienne", [10, 20]), ("active", [900, 950, 960, 990]), ("recente", [1000])]:
+        for horodatage in horodatages:
+            magasin.echec(ip, horodatage)
+    magasin.fermer()
+
+    # Redémarrage : seules les IP actives dans la dernière fenêtre, de la moins à la plus récente
+    magasin = MagasinReputation(chemin, seuil=3)
+    assert magasin.recentes(300) == [("active", [950, 960, 990]), ("recente", [1000])]
+    assert magasin.recentes(300, limite=1) == [("recente", [1000])]
+    magasin.fermer()
+    assert MagasinReputation(str(chemin) + ".vide").recentes(300) == []
+
+
+def _echouer(magasin, fois, pendant=None):
+    """Les ``fois`` prochaines écritures échouent ; ``pendant()`` est appelé pendant chacune."""
+    ecrire = magasin._ecrire
+    restant = [fois]
+
+    def _ecrire(attente, historique):
+        if restant[0]:
+            restant[0] -= 1
+            if pendant is not None:
+                pendant()
+            raise sqlite3.OperationalError("database is locked")
+        return ecrire(attente, historique)
+
+    magasin._ecrire = _ecrire
+
+
+def test_reessai_apres_echec_d_ecriture(chemin):
+    magasin = MagasinReputation(chemin, seuil=3)
+    magasin.echec("1.1.1.1", 10)
+    magasin.alerte("1.1.1.1", 10, "admin")
+    # Un échec arrive pendant l'écriture qui échoue : il ne doit ni se perdre ni passer avant
+    _echouer(magasin, 1, pendant=lambda: magasin.echec("1.1.1.1", 20))
+    with pytest.raises(sqlite3.OperationalError):
+        magasin.ecrire()
+    assert magasin.echecs_ecriture == 1 and magasin.infos("1.1.1.1") is None
+    assert magasin.ecrire() == 1
+    infos = magasin.infos("1.1.1.1")
+    assert (infos["echecs"], infos["recents"], infos["alertes"]) == (2, "10 20", 1)
+    assert magasin.echecs_ecriture == 0 and magasin.erreur is None
+    historique = magasin._connexion.execute("SELECT * FROM alertes").fetchall()
+    assert historique == [("1.1.1.1", 10, "admin")]
+    magasin.fermer()
+
+
+def test_echecs_repetes_signales(chemin):
+    magasin = MagasinReputation(chemin)
+    magasin.echec("1.1.1.1", 10)
+    _echouer(magasin, reputation.ECHECS_MAX + 1)
+    for _ in range(reputation.ECHECS_MAX):
+        with pytest.raises(sqlite3.OperationalError):
+            magasin.ecrire()
+    with pytest.raises(RuntimeError, match="écritures de suite ont échoué"):
+        magasin.echec("1.1.1.1", 11)
+    # fermer renvoie l'erreur si la dernière écriture échoue
+    with pytest.raises(sqlite3.OperationalError):
+        magasin.fermer()
+
+
+def test_thread_d_ecriture(chemin):
+    magasin = MagasinReputation(chemin, periode=0.01).demarrer()
+    _echouer(magasin, 2)
+    magasin.echec("1.1.1.1", 10)
+    debut = time.monotonic()
+    while magasin.ecritures == 0:
+        assert time.monotonic() - debut < 5
+        time.sleep(0.01)
+    # Deux échecs, puis l'écriture réussit sans intervention
+    assert magasin.infos("1.1.1.1")["echecs"] == 1
+    magasin.fermer()
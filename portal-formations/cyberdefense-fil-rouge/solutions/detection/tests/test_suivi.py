@@ -0,0 +1,109 @@
+import os
+
+from detection.suivi import AttenteScrutation, SuiveurJournal, ecrire_point_reprise, lire_point_reprise
+
+
+def _ecrire(chemin, texte, mode="a"):
+    with open(chemin, mode, encoding="utf-8") as fichier:
+        fichier.write(texte)
+
+
+def _suiveur(chemin, point_reprise=None):
+    return SuiveurJournal(str(chemin), point_reprise=point_reprise, attente=AttenteScrutation(0))
+
+
+def test_lignes_ajoutees_et_ligne_partielle(tmp_path):
+    journal = tmp_path / "auth.log"
+    _ecrire(journal, "a\nb\n", "w")
+    suiveur = _suiveur(journal)
+    suiveur.ouvrir()
+    assert suiveur.lire_lot(10) == ["a", "b"]
+    assert suiveur.lire_lot(10) == []
+    # Ligne pas encore terminée : rendue seulement une fois le "\n" écrit
+    _ecrire(journal, "c")
+    assert suiveur.lire_lot(10) == []
+    _ecrire(journal, "d\ne\n")
+    assert suiveur.lire_lot(1) == ["cd"]
+    assert suiveur.lire_lot(10) == ["e"]
+    assert suiveur.position == os.path.getsize(journal)
+    suiveur.fermer()
+
+
+def test_rotation(tmp_path):
+    journal = tmp_path / "auth.log"
+    _ecrire(journal, "a\n", "w")
+    suiveur = _suiveur(journal)
+    suiveur.ouvrir()
+    assert suiveur.lire_lot(10) == ["a"]
+    # Lignes écrites juste avant la rotation, puis dans le nouveau fichier
+    _ecrire(journal, "b\nfin")
+    os.rename(journal, str(journal) + ".1")
+    _ecrire(journal, "c\n", "w")
+    assert suiveur.lire_lot(10) == ["b", "fin", "c"]
+    assert suiveur.etat()["inode"] == os.stat(journal).st_ino
+    suiveur.fermer()
+
+
+def test_troncature(tmp_path):
+    journal = tmp_path / "auth.log"
+    _ecrire(journal, "une longue ligne\nune autre\n", "w")
+    suiveur = _suiveur(journal)
+    suiveur.ouvrir()
+    assert len(suiveur.lire_lot(10)) == 2
+    _ecrire(journal, "x\n", "w")
+    assert suiveur.lire_lot(10) == ["x"]
+    assert suiveur.position == 2
+    suiveur.fermer()
+
+
+def test_reprise_au_point_sauvegarde(tmp_path):
+    journal = tmp_path / "auth.log"
+    point_reprise = str(tmp_path / ".auth.log.position")
+    _ecrire(journal, "a\nb\nc\n", "w")
+    suiveur = _suiveur(journal, point_reprise)
+    suiveur.ouvrir()
+    assert suiveur.lire_lot(2) == ["a", "b"]
+    ecrire_point_reprise(point_reprise, suiveur.etat())
+    suiveur.fermer()
+
+    _ecrire(journal, "d\n")
+    suiveur = _suiveur(journal, point_reprise)
+    suiveur.ouvrir()
+    assert suiveur.lire_lot(10) == ["c", "d"]
+    suiveur.fermer()
+
+
+def test_reprise_apres_rotation_pendant_l_arret(tmp_path):
+    journal = tmp_path / "auth.log"
+    point_reprise = str(tmp_path / ".auth.log.position")
+    _ecrire(journal, "a\n", "w")
+    suiveur = _suiveur(journal, point_reprise)
+    suiveur.ouvrir()
+    suiveur.lire_lot(10)
+    ecrire_point_reprise(point_reprise, suiveur.etat())
+    suiveur.fermer()
+
+    # Pendant l'arrêt : fin de l'ancien fichier, rotation, nouveau fichier
+    _ecrire(journal, "b\n")
+    os.rename(journal, str(journal) + ".1")
+    _ecrire(journal, "c\n", "w")
+    suiveur = _suiveur(journal, point_reprise)
+    suiveur.ouvrir()
+    assert suiveur.lire_lot(10) == ["b", "c"]
+    suiveur.fermer()
+
+
+def test_reprise_fichier_tronque_pendant_l_arret(tmp_path):
+    journal = tmp_path / "auth.log"
+    _ecrire(journal, "x\n", "w")
+    suiveur = _suiveur(journal)
+    suiveur.ouvrir({"inode": os.stat(journal).st_ino, "position": 1000})
+    assert suiveur.lire_lot(10) == ["x"]
+    suiveur.fermer()
+
+
+def test_point_reprise_illisible(tmp_path):
+    chemin = tmp_path / "position"
+    assert lire_point_reprise(str(chemin)) is None
+    _ecrire(chemin, "{pas du json", "w")
+    assert lire_point_reprise(str(chemin)) is None
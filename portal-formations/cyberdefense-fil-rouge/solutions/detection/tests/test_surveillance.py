@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from detection.surveillance import SurveillanceMultiple
+
+
+def _ecrire(chemin, lignes, mode="a"):
+    with open(chemin, mode, encoding="utf-8") as fichier:
+        fichier.writelines(f"{ligne}\n" for ligne in lignes)
+
+
+def _executer(surveillance, condition, delai=10.0):
+    """Lance la surveillance jusqu'à ce que ``condition()`` soit vraie, puis l'annule."""
+    async def principal():
+        tache = asyncio.create_task(surveillance.executer())
+        debut = time.monotonic()
+        while not condition():
+            assert time.monotonic() - debut < delai, surveillance.retards()
+            await asyncio.sleep(0.01)
+        tache.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tache
+    asyncio.run(principal())
+
+
+def test_toutes_les_sources_dans_l_ordre_puis_reprise(tmp_path):
+    chemins = [str(tmp_path / f"machine{i}.log") for i in range(3)]
+    for i, chemin in enumerate(chemins):
+        _ecrire(chemin, [f"{i}-{n}" for n in range(250)], "w")
+    point_reprise = str(tmp_path / "reprise.json")
+    recues = {chemin: [] for chemin in chemins}
+
+    def traiter(source, lignes):
+        recues[source.chemin].extend(lignes)
+
+    surveillance = SurveillanceMultiple(chemins, traiter, point_reprise, taille_lot=40, intervalle=0.01)
+    _executer(surveillance, lambda: sum(map(len, recues.values())) == 750)
+    for i, chemin in enumerate(chemins):
+        assert recues[chemin] == [f"{i}-{n}" for n in range(250)]
+    assert all(retard["octets_non_lus"] == 0 and retard["en_file"] == 0 for retard in surveillance.retards())
+    with open(point_reprise, encoding="utf-8") as fichier:
+        assert set(json.load(fichier)) == set(chemins)
+
+    # Redémarrage : seules les lignes écrites pendant l'arrêt sont lues
+    _ecrire(chemins[1], ["1-nouvelle"])
+    recues = {chemin: [] for chemin in chemins}
+    surveillance = SurveillanceMultiple(chemins, traiter, point_reprise, taille_lot=40, intervalle=0.01)
+    _executer(surveillance, lambda: recues[chemins[1]])
+    time.sleep(0.05)
+    assert recues == {chemins[0]: [], chemins[1]: ["1-nouvelle"], chemins[2]: []}
+
+
+def test_contre_pression(tmp_path):
+    chemin = str(tmp_path / "auth.log")
+    _ecrire(chemin, [f"ligne {n}" for n in range(1000)], "w")
+    surveillance = SurveillanceMultiple([chemin], None, taille_lot=10, taille_file=2)
+    source = surveillance.sources[0]
+
+    async def principal():
+        # Personne ne vide la file : le lecteur doit s'arrêter quand elle est pleine
+        surveillance._ouvrir()
+        file = asyncio.Queue(surveillance.taille_file)
+        lecteur = asyncio.create_task(surveillance._lire(source, file))
+        await asyncio.sleep(0.1)
+        assert file.qsize() == 2
+        # Deux lots dans la file, un en attente de place ; le reste n'est pas lu
+        assert source.lues == source.en_file == 30
+        assert surveillance.retards()[0]["octets_non_lus"] > 0
+        lecteur.cancel()
+        source.suiveur.fermer()
+    asyncio.run(principal())
+
+
+def test_retard_par_source(tmp_path):
+    active, calme = str(tmp_path / "active.log"), str(tmp_path / "calme.log")
+    _ecrire(active, [f"ligne {n}" for n in range(1000)], "w")
+    _ecrire(calme, ["seule"], "w")
+    observations = []
+
+    def traiter(source, lignes):
+        observations.append({retard["source"]: retard for retard in surveillance.retards()})
+
+    surveillance = SurveillanceMultiple([active, calme], traiter, taille_lot=10, taille_file=2, intervalle=0.01)
+    _executer(surveillance, lambda: sum(r["traitees"] for r in surveillance.retards()) == 1001)
+
+    assert max(o[active]["octets_non_lus"] for o in observations) > 0
+    assert max(o[active]["en_file"] for o in observations) > 0
+    # La source calme n'est jamais en retard à cause de l'autre
+    assert all(o[calme]["octets_non_lus"] == 0 for o in observations)
+    fin = {retard["source"]: retard for retard in surveillance.retards()}
+    assert fin[active]["lues"] == fin[active]["traitees"] == 1000
+    assert fin[active]["octets_non_lus"] == fin[active]["en_file"] == 0
+    assert fin[calme]["lues"] == fin[calme]["traitees"] == 1
+    assert fin[active]["latence"] >= 0
+
+
+def test_lignes_ajoutees_pendant_la_surveillance(tmp_path):
+    chemin = str(tmp_path / "auth.log")
+    _ecrire(chemin, ["a"], "w")
+    recues = []
+    surveillance = SurveillanceMultiple([chemin], lambda source, lignes: recues.extend(lignes), intervalle=0.01)
+
+    def condition():
+        if recues == ["a"]:
+            _ecrire(chemin, ["b", "c"])
+        return len(recues) == 3
+
+    _executer(surveillance, condition)
+    assert recues == ["a", "b", "c"]
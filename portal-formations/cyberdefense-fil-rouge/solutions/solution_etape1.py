@@ -2,24 +2,19 @@
 # SOLUTION ÉTAPE 1 - COMPRENDRE LES LOGS
 # ===========================================
 
+from detection.prefiltre import evenements_echec
+
 print("🔐 Analyse des logs d'authentification")
 print("=" * 50)
 
-# Ouvrir le fichier en lecture
-with open("data/auth.log", "r") as fichier:
-    lignes = fichier.readlines()
-
 # Compter les échecs
 compteur_echecs = 0
 
-# Parcourir chaque ligne
-for ligne in lignes:
-    ligne = ligne.strip()  # Enlever les espaces et retours à la ligne
-    
-    # Vérifier si c'est un échec
-    if "STATUS=FAIL" in ligne:
-        print(f"⚠️  {ligne}")
-        compteur_echecs += 1
+# Parcourir uniquement les lignes d'échec : le préfiltre saute directement
+# d'un "STATUS=FAIL" au suivant sans décoder les lignes de succès
+for evenement in evenements_echec("data/auth.log"):
+    print(f"⚠️  {evenement.ligne}")
+    compteur_echecs += 1
 
 print(f"\n📊 Total d'échecs : {compteur_echecs}")
 print("\n✅ Analyse terminée")
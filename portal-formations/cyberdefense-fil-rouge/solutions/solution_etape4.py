@@ -1,86 +1,69 @@
 # ===========================================
 # SOLUTION ÉTAPE 4 - RÈGLES DE DÉTECTION (MINI IDS)
 # ===========================================
+# Usage :
+#   python solutions/solution_etape4.py                    # data/auth.log
+#   python solutions/solution_etape4.py 'data/auth.log*' --processus 0
+#       # historique complet ; règles évaluées sur tous les cœurs
 
-HEURE_DEBUT = 8
-HEURE_FIN = 18
+import argparse
 
-def extraire_ip(ligne):
-    """Extrait l'IP d'une ligne de log."""
-    debut_ip = ligne.find("IP=")
-    if debut_ip != -1:
-        partie_ip = ligne[debut_ip + 3:]
-        ip = partie_ip.split()[0]
-        return ip
-    return None
+from detection.parallele import alertes_paralleles, echecs_paralleles
+from detection.pipeline import lire_lignes
+from detection.prefiltre import compter_echecs_par_ip
+from detection.regles import FICHIER_DEFAUT, MoteurRegles, evaluer_en_flux
 
-def extraire_heure(ligne):
-    """Extrait l'heure d'une ligne de log."""
-    parties = ligne.split()
-    if len(parties) >= 2:
-        date_heure = parties[1]
-        heure_str = date_heure.split(":")[0]
-        try:
-            return int(heure_str)
-        except ValueError:
-            return None
-    return None
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "journaux",
+    nargs="*",
+    default=["data/auth.log"],
+    help="Fichiers de logs : liste ou motif (ex. 'data/auth.log*', y compris .gz/.bz2/.xz)",
+)
+parser.add_argument(
+    "--selectivite",
+    action="store_true",
+    help="Afficher la sélectivité et le coût mesurés de chaque règle",
+)
+parser.add_argument("--regles", default=FICHIER_DEFAUT, help="Fichier JSON des règles de détection")
+parser.add_argument(
+    "--processus",
+    type=int,
+    default=1,
+    help="Nombre de processus (1 = lecture séquentielle, 0 = tous les cœurs)",
+)
+args = parser.parse_args()
 
-def extraire_user(ligne):
-    """Extrait le nom d'utilisateur d'une ligne de log."""
-    debut_user = ligne.find("USER=")
-    if debut_user != -1:
-        partie_user = ligne[debut_user + 5:]
-        user = partie_user.split()[0] if partie_user.split() else ""
-        return user
-    return None
-
-def est_suspect(ligne, echecs_par_ip):
-    """
-    Vérifie si une ligne de log est suspecte selon les règles.
-    Retourne (True/False, raison)
-    """
-    # Règle 1 : +5 échecs pour cette IP
-    ip = extraire_ip(ligne)
-    if ip and echecs_par_ip.get(ip, 0) >= 5:
-        return True, "IP avec 5+ échecs"
-    
-    # Règle 2 : Connexion hors heures (8h-18h)
-    heure = extraire_heure(ligne)
-    if heure is not None and (heure < HEURE_DEBUT or heure >= HEURE_FIN):
-        return True, "Connexion hors heures normales"
-    
-    # Règle 3 : Tentative sur USER=admin
-    user = extraire_user(ligne)
-    if user == "admin":
-        return True, "Tentative sur compte admin"
-    
-    return False, None
+# Les règles (+5 échecs, hors heures, compte admin) sont décrites dans un
+# fichier JSON ; pour chaque ligne, la première règle qui correspond l'emporte
+moteur = MoteurRegles.depuis_fichier(args.regles, semantique="premiere")
 
 print("🛡️ Moteur de détection d'intrusion")
 print("=" * 50)
 
-# D'abord, compter les échecs par IP
-echecs_par_ip = {}
-with open("data/auth.log", "r") as fichier:
-    lignes = fichier.readlines()
-
-for ligne in lignes:
-    ligne = ligne.strip()
-    if "STATUS=FAIL" in ligne:
-        ip = extraire_ip(ligne)
-        if ip:
-            echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + 1
-
-# Ensuite, appliquer les règles
 print("\n🚨 Événements suspects détectés :")
-with open("data/auth.log", "r") as fichier:
-    lignes = fichier.readlines()
+# 1re lecture : seules les lignes d'échec sont décodées (préfiltre mmap) ;
+# 2e lecture : règles court-circuitées ligne à ligne, dans l'ordre du fichier.
+# Mémoire : un compteur par IP, quelle que soit la taille du journal
+# Avec --processus, les fichiers (ou des plages d'un fichier seul) sont répartis
+# entre processus et les alertes remises dans l'ordre du fichier
+if args.processus == 1:
+    evaluateur = moteur.court_circuit(compter_echecs_par_ip(args.journaux))
+    alertes = evaluer_en_flux(lire_lignes(args.journaux), evaluateur)
+else:
+    processus = args.processus or None
+    echecs_par_ip = echecs_paralleles(args.journaux, processus)
+    evaluateur = moteur.court_circuit(echecs_par_ip)
+    alertes = alertes_paralleles(args.journaux, args.regles, "premiere", echecs_par_ip, processus, evaluateur)
+for evenement, verdict in alertes:
+    print(f"  [{verdict.raison}] {evenement.ligne}")
 
-for ligne in lignes:
-    ligne = ligne.strip()
-    suspect, raison = est_suspect(ligne, echecs_par_ip)
-    if suspect:
-        print(f"  [{raison}] {ligne}")
+if args.selectivite:
+    print("\n📊 Règles, dans l'ordre d'évaluation :")
+    for mesure in evaluateur.selectivite():
+        print(
+            f"  {mesure['regle']:<20} {mesure['correspondances']:>9}/{mesure['evaluations']:<9} "
+            f"sélectivité {mesure['selectivite']:6.1%}  coût {mesure['cout_ns']:6.0f} ns"
+        )
 
 print("\n✅ Analyse terminée")
@@ -1,108 +1,93 @@
 # ===========================================
 # SOLUTION ÉTAPE 5 - GÉNÉRATION D'ALERTES
 # ===========================================
+# Usage :
+#   python solutions/solution_etape5.py                    # data/auth.log -> alertes.txt
+#   python solutions/solution_etape5.py 'data/auth.log*' --processus 0 --format jsonl
+#       # historique complet ; règles évaluées sur tous les cœurs
 
-HEURE_DEBUT = 8
-HEURE_FIN = 18
+import argparse
 
-def extraire_ip(ligne):
-    debut_ip = ligne.find("IP=")
-    if debut_ip != -1:
-        partie_ip = ligne[debut_ip + 3:]
-        ip = partie_ip.split()[0]
-        return ip
-    return None
+from detection.alertes import FICHIERS_GARDES, FORMATS, EcrivainAlertes
+from detection.parallele import alertes_paralleles, echecs_paralleles
+from detection.pipeline import analyser, juger_avec_totaux, lire_lignes
+from detection.prefiltre import compter_echecs_par_ip
+from detection.regles import FICHIER_DEFAUT, MoteurRegles, evaluer_par_lots
 
-def extraire_heure(ligne):
-    parties = ligne.split()
-    if len(parties) >= 2:
-        date_heure = parties[1]
-        heure_str = date_heure.split(":")[0]
-        try:
-            return int(heure_str)
-        except ValueError:
-            return None
-    return None
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "journaux",
+    nargs="*",
+    default=["data/auth.log"],
+    help="Fichiers de logs : liste ou motif (ex. 'data/auth.log*', y compris .gz/.bz2/.xz)",
+)
+parser.add_argument("--regles", default=FICHIER_DEFAUT, help="Fichier JSON des règles de détection")
+parser.add_argument("--format", choices=FORMATS, default="texte", help="texte ([DATE] [NIVEAU] ...) ou jsonl")
+parser.add_argument("--sortie", default=None, help="Fichier d'alertes (défaut : alertes.txt ou alertes.jsonl)")
+parser.add_argument(
+    "--suppression",
+    type=int,
+    default=0,
+    help="Ne garder qu'une alerte par (IP, règles) toutes les N secondes, les autres sont résumées",
+)
+parser.add_argument("--taille-max", type=int, default=None, help="Rotation du fichier au-delà de N octets")
+parser.add_argument("--duree-max", type=float, default=None, help="Rotation du fichier toutes les N secondes")
+parser.add_argument(
+    "--garder",
+    type=int,
+    default=FICHIERS_GARDES,
+    help=f"Fichiers tournés conservés (défaut : {FICHIERS_GARDES}, les plus anciens sont supprimés)",
+)
+parser.add_argument(
+    "--processus",
+    type=int,
+    default=1,
+    help="Nombre de processus (1 = lecture séquentielle, 0 = tous les cœurs)",
+)
+args = parser.parse_args()
 
-def extraire_user(ligne):
-    debut_user = ligne.find("USER=")
-    if debut_user != -1:
-        partie_user = ligne[debut_user + 5:]
-        user = partie_user.split()[0] if partie_user.split() else ""
-        return user
-    return None
+# Toutes les règles qui correspondent sont citées ; le niveau de l'alerte
+# est celui de la règle la plus sévère
+moteur = MoteurRegles.depuis_fichier(args.regles, semantique="toutes")
 
-def extraire_date(ligne):
-    parties = ligne.split()
-    if len(parties) >= 2:
-        return f"{parties[0]} {parties[1]}"
-    return "DATE_INCONNUE"
-
-def est_suspect(ligne, echecs_par_ip):
-    ip = extraire_ip(ligne)
-    heure = extraire_heure(ligne)
-    user = extraire_user(ligne)
-    date = extraire_date(ligne)
-    
-    raisons = []
-    niveau = "INFO"
-    
-    if ip and echecs_par_ip.get(ip, 0) >= 5:
-        raisons.append("IP avec 5+ échecs")
-        niveau = "CRITIQUE"
-    
-    if heure is not None and (heure < HEURE_DEBUT or heure >= HEURE_FIN):
-        raisons.append("Connexion hors heures")
-        niveau = "WARNING"
-    
-    if user == "admin":
-        raisons.append("Tentative sur compte admin")
-        niveau = "CRITIQUE"
-    
-    if raisons:
-        return True, date, niveau, " | ".join(raisons), ligne
-    return False, None, None, None, None
-
-def generer_alerte(date, niveau, raison, details):
-    """Formate une alerte selon le format demandé."""
-    return f"[{date}] [{niveau}] {raison} - {details}"
+sortie = args.sortie or ("alertes.jsonl" if args.format == "jsonl" else "alertes.txt")
 
 print("🚨 Génération du rapport d'alertes")
 print("=" * 50)
 
-# Compter les échecs par IP
-echecs_par_ip = {}
-with open("data/auth.log", "r") as fichier:
-    lignes = fichier.readlines()
-
-for ligne in lignes:
-    ligne = ligne.strip()
-    if "STATUS=FAIL" in ligne:
-        ip = extraire_ip(ligne)
-        if ip:
-            echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + 1
-
-# Collecter les alertes
-alertes = []
-with open("data/auth.log", "r") as fichier:
-    lignes = fichier.readlines()
-
-for ligne in lignes:
-    ligne = ligne.strip()
-    suspect, date, niveau, raison, details = est_suspect(ligne, echecs_par_ip)
-    if suspect:
-        alerte = generer_alerte(date, niveau, raison, details)
-        alertes.append(alerte)
-
-# Écrire dans le fichier
-with open("alertes.txt", "w", encoding="utf-8") as fichier_alertes:
-    fichier_alertes.write("=" * 60 + "\n")
-    fichier_alertes.write("RAPPORT D'ALERTES DE SÉCURITÉ\n")
-    fichier_alertes.write("=" * 60 + "\n\n")
-    fichier_alertes.write(f"Nombre total d'alertes : {len(alertes)}\n\n")
-    
-    for alerte in alertes:
-        fichier_alertes.write(alerte + "\n")
+# Les alertes sont écrites au fil de l'eau, par paquets : rien n'est gardé en mémoire
+ecrivain = EcrivainAlertes(
+    sortie,
+    format=args.format,
+    suppression=args.suppression,
+    taille_max=args.taille_max,
+    duree_max=args.duree_max,
+    garder=args.garder,
+)
+# 1re lecture : seules les lignes d'échec sont décodées (préfiltre mmap) ;
+# 2e lecture : règles par lots, alertes dans l'ordre du fichier
+# (avec --processus, réparties entre processus puis remises dans cet ordre)
+if args.processus == 1:
+    echecs_par_ip = compter_echecs_par_ip(args.journaux)
+    jugements = juger_avec_totaux(analyser(lire_lignes(args.journaux)), echecs_par_ip, moteur.seuil_echecs)
+    alertes = evaluer_par_lots(jugements, moteur)
+else:
+    processus = args.processus or None
+    echecs_par_ip = echecs_paralleles(args.journaux, processus)
+    alertes = alertes_paralleles(args.journaux, args.regles, "toutes", echecs_par_ip, processus)
+with ecrivain:
+    for evenement, verdict in alertes:
+        ecrivain.ecrire(evenement, verdict)
 
-print(f"✅ {len(alertes)} alertes générées")
-print("✅ Rapport généré : alertes.txt")
+print(f"✅ {ecrivain.ecrites} alertes générées")
+if ecrivain.supprimees:
+    print(f"🔇 {ecrivain.supprimees} alertes similaires supprimées")
+if ecrivain.hors_ordre:
+    print(f"⚠️  {ecrivain.hors_ordre} alertes arrivées hors de l'ordre chronologique (non dédupliquées)")
+if ecrivain.effacees:
+    # Un seul lancement a produit plus de fichiers que --garder : le début est perdu
+    print(
+        f"⚠️  {ecrivain.effacees} alertes effacées par la rotation (seuls {args.garder} fichiers tournés "
+        "sont gardés) : augmentez --garder ou --taille-max"
+    )
+print(f"✅ Rapport généré : {sortie}")
@@ -1,59 +1,199 @@
 # ===========================================
 # SOLUTION ÉTAPE 6 - AUTOMATISATION DE LA SURVEILLANCE
 # ===========================================
+# Usage :
+#   python solutions/solution_etape6.py                      # data/auth.log
+#   python solutions/solution_etape6.py /var/log/hosts/*.log # plusieurs journaux à la fois (asyncio)
+#   python solutions/solution_etape6.py --metriques-port 9108
+#       # compteurs et durées au format Prometheus sur http://127.0.0.1:9108/metrics
+#       # (ou --metriques-fichier pour le collecteur textfile de node_exporter)
+#   python solutions/solution_etape6.py --reputation
+#       # échecs et alertes par IP gardés dans data/reputation.db (SQLite) :
+#       # au redémarrage, les IP actives dans la dernière fenêtre sont rechargées
+#   python solutions/solution_etape6.py --sans-correlation
+#       # seulement la force brute (pas de pulvérisation ni de prise de contrôle)
 
+import argparse
+import asyncio
 import time
 
-HEURE_DEBUT = 8
-HEURE_FIN = 18
+from detection.correlation import MoteurCorrelation
+from detection.extraction import SEUIL_ECHECS, analyser_ligne
+from detection.fenetre import DetecteurFenetre
+from detection.metriques import ChronoRegles, Registre
+from detection.reputation import MagasinReputation
+from detection.suivi import SuiveurJournal
+from detection.surveillance import SurveillanceMultiple
 
-def extraire_ip(ligne):
-    debut_ip = ligne.find("IP=")
-    if debut_ip != -1:
-        partie_ip = ligne[debut_ip + 3:]
-        ip = partie_ip.split()[0]
-        return ip
-    return None
+FICHIER_LOG = "data/auth.log"
+# Position déjà analysée : un redémarrage reprend là où on s'était arrêté
+POINT_REPRISE = "data/.auth.log.position"
+POINT_REPRISE_MULTIPLE = "data/.surveillance.json"
+REPUTATION = "data/reputation.db"
 
-def est_suspect(ligne, echecs_par_ip):
-    ip = extraire_ip(ligne)
-    if ip and echecs_par_ip.get(ip, 0) >= 5:
-        return True
-    return False
+# Règle : 5 échecs d'une même IP en moins de 5 minutes
+FENETRE_SECONDES = 300
+# Plafond mémoire : au-delà, les IP les moins actives sont oubliées
+MAX_IPS_SUIVIES = 100_000
+
+parser = argparse.ArgumentParser()
+parser.add_argument("journaux", nargs="*", default=[FICHIER_LOG], help="Fichiers de logs à surveiller")
+parser.add_argument("--retards", type=float, default=10.0, help="Afficher le retard de chaque journal toutes les N secondes")
+parser.add_argument("--metriques-port", type=int, default=None, help="Servir les métriques sur http://127.0.0.1:PORT/metrics")
+parser.add_argument("--metriques-fichier", default=None, help="Réécrire les métriques dans ce fichier toutes les 10 s")
+parser.add_argument(
+    "--reputation",
+    nargs="?",
+    const=REPUTATION,
+    default=None,
+    help=f"Garder la réputation des IP d'un lancement à l'autre (SQLite, défaut : {REPUTATION})",
+)
+parser.add_argument(
+    "--sans-correlation",
+    action="store_true",
+    help="Désactiver la corrélation (pulvérisation de mots de passe, connexion réussie après des échecs)",
+)
+args = parser.parse_args()
+
+def signaler(evenement, horodatage, regle, message, origine):
+    compteur = alertes.get(regle)
+    if compteur is None:
+        compteur = alertes[regle] = registre.compteur("detection_alertes_total", "Alertes levées", regle=regle)
+    compteur.ajouter()
+    if reputation is not None:
+        reputation.alerte(evenement.ip, horodatage, regle)
+    if origine:
+        print(f"🚨 {message} [{origine}] : {evenement.ligne}")
+    else:
+        print(f"🚨 {message} : {evenement.ligne}")
+
+def traiter_ligne(ligne, origine=None):
+    # Une ligne sur ECHANTILLON est chronométrée, règle par règle
+    mesurer = chrono.ligne()
+    if mesurer:
+        debut = time.perf_counter()
+    evenement = analyser_ligne(ligne.strip())
+    if mesurer:
+        milieu = time.perf_counter()
+        chrono.observer("analyse", milieu - debut)
+    if evenement.statut is None or evenement.heure is None:
+        lignes_invalides.ajouter()
+        return
+
+    if not evenement.ip or (correlation is None and not evenement.echec):
+        return
+    horodatage = evenement.horodatage
+    if horodatage is None:
+        return
+
+    # Compter l'échec et vérifier si l'IP devient suspecte
+    if evenement.echec:
+        if reputation is not None:
+            reputation.echec(evenement.ip, horodatage)
+        suspect = detecteur.ajouter(evenement.ip, horodatage)
+        if mesurer:
+            fin = time.perf_counter()
+            chrono.observer("force_brute", fin - milieu)
+            milieu = fin
+        if suspect:
+            signaler(evenement, horodatage, "force_brute", "NOUVELLE ALERTE", origine)
+
+    # Attaques en plusieurs étapes : état par compte et par IP
+    if correlation is not None:
+        for alerte in correlation.ajouter(evenement, horodatage):
+            signaler(evenement, horodatage, alerte.code, f"ALERTE CORRÉLÉE - {alerte.raison}", origine)
+        if mesurer:
+            chrono.observer("correlation", time.perf_counter() - milieu)
+
+def afficher_retards(retards):
+    print(f"⏱️  {'journal':<40} {'traitées':>12} {'en file':>8} {'non lus (o)':>12} {'latence':>8}")
+    for retard in retards:
+        print(f"    {retard['source']:<40} {retard['traitees']:>12,} {retard['en_file']:>8,} "
+              f"{retard['octets_non_lus']:>12,} {retard['latence']:>7.2f}s")
 
 print("🔄 Surveillance en continu activée")
 print("Appuyez sur Ctrl+C pour arrêter")
 print("=" * 50)
 
-# Compter les échecs par IP (état initial)
-echecs_par_ip = {}
-position_precedente = 0
+# Échecs récents par IP, sur fenêtre glissante et à mémoire bornée,
+# partagés par tous les journaux surveillés
+detecteur = DetecteurFenetre(SEUIL_ECHECS, FENETRE_SECONDES, MAX_IPS_SUIVIES)
+# Pulvérisation et prise de contrôle : états bornés, oubliés après 10 minutes d'inactivité
+correlation = None if args.sans_correlation else MoteurCorrelation()
+
+# Réputation persistante : écrite en tâche de fond, jamais attendue par la boucle
+reputation = None
+if args.reputation:
+    reputation = MagasinReputation(args.reputation, seuil=SEUIL_ECHECS)
+    rechargees = reputation.recentes(FENETRE_SECONDES, limite=MAX_IPS_SUIVIES)
+    for ip, horodatages in rechargees:
+        detecteur.charger(ip, horodatages)
+    reputation.demarrer()
+    print(f"♻️  Réputation : {len(rechargees)} IP récentes rechargées depuis {args.reputation}")
+
+# Métriques : de simples compteurs dans la boucle ; retards, file et mémoire
+# sont calculés seulement quand les métriques sont lues
+registre = Registre()
+lignes_invalides = registre.compteur("detection_lignes_invalides_total", "Lignes sans date ou sans STATUS= reconnus")
+alertes = {}  # règle -> compteur
+chrono = ChronoRegles(registre)
+registre.jauge("detection_ips_suivies", "IP gardées dans la fenêtre glissante", fonction=lambda: len(detecteur))
+registre.jauge("detection_ips_oubliees", "IP oubliées (fenêtre expirée ou plafond atteint)",
+               fonction=lambda: detecteur.ips_oubliees)
+if correlation is not None:
+    registre.jauge("detection_correlation_etats", "Comptes et IP suivis par la corrélation",
+                   fonction=lambda: len(correlation))
+if reputation is not None:
+    registre.jauge("detection_reputation_en_attente", "IP pas encore écrites dans la base de réputation",
+                   fonction=lambda: len(reputation))
+    registre.jauge("detection_reputation_echecs_ecriture", "Écritures de la réputation en échec de suite",
+                   fonction=lambda: reputation.echecs_ecriture)
+if args.metriques_port is not None:
+    registre.servir(args.metriques_port)
+    print(f"📈 Métriques : http://127.0.0.1:{args.metriques_port}/metrics")
+if args.metriques_fichier:
+    registre.ecrire_periodiquement(args.metriques_fichier)
+
+def lignes_lues(chemin):
+    return registre.compteur("detection_lignes_lues_total", "Lignes lues", source=chemin)
 
 try:
-    while True:
-        # Ouvrir le fichier et se positionner à la dernière position lue
-        with open("data/auth.log", "r") as fichier:
-            fichier.seek(position_precedente)
-            nouvelles_lignes = fichier.readlines()
-            
-            # Mettre à jour la position
-            position_precedente = fichier.tell()
-        
-        # Analyser les nouvelles lignes
-        for ligne in nouvelles_lignes:
-            ligne = ligne.strip()
-            
-            if "STATUS=FAIL" in ligne:
-                ip = extraire_ip(ligne)
-                if ip:
-                    echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + 1
-                    
-                    # Vérifier si suspect
-                    if est_suspect(ligne, echecs_par_ip):
-                        print(f"🚨 NOUVELLE ALERTE : {ligne}")
-        
-        print(f"⏱️  Vérification terminée. Prochaine dans 30 secondes...")
-        time.sleep(30)
-        
+    if len(args.journaux) == 1:
+        # Le suiveur se réveille dès que le fichier change (inotify, sinon
+        # vérification toutes les 0,2 s) et gère la rotation / troncature du log
+        suiveur = SuiveurJournal(args.journaux[0], point_reprise=POINT_REPRISE)
+        lues = lignes_lues(suiveur.chemin)
+        registre.jauge("detection_retard_octets", "Octets écrits mais pas encore lus",
+                       fonction=suiveur.octets_restants, source=suiveur.chemin)
+
+        # Analyser chaque nouvelle ligne dès son écriture
+        for ligne in suiveur.lignes():
+            lues.ajouter()
+            traiter_ligne(ligne)
+    else:
+        # Plusieurs journaux : une tâche asyncio par fichier, un seul détecteur
+        def traiter(source, lignes):
+            compteurs[source].ajouter(len(lignes))
+            for ligne in lignes:
+                traiter_ligne(ligne, source.chemin)
+
+        surveillance = SurveillanceMultiple(args.journaux, traiter, point_reprise=POINT_REPRISE_MULTIPLE)
+        compteurs = {}
+        for source in surveillance.sources:
+            compteurs[source] = lignes_lues(source.chemin)
+            registre.jauge("detection_retard_octets", "Octets écrits mais pas encore lus",
+                           fonction=source.suiveur.octets_restants, source=source.chemin)
+            registre.jauge("detection_file_lignes", "Lignes lues en attente de traitement",
+                           fonction=lambda source=source: source.en_file, source=source.chemin)
+            registre.jauge("detection_latence_secondes", "Lecture -> fin du traitement du dernier lot",
+                           fonction=lambda source=source: source.latence, source=source.chemin)
+        asyncio.run(surveillance.executer(afficher_retards, args.retards))
+
 except KeyboardInterrupt:
     print("\n\n✅ Surveillance arrêtée par l'utilisateur")
+finally:
+    try:
+        if reputation is not None:
+            reputation.fermer()
+    finally:
+        registre.fermer()
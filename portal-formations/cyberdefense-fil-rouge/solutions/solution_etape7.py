@@ -1,142 +1,151 @@
 # ===========================================
 # SOLUTION ÉTAPE 7 - ANALYSE GLOBALE & RAPPORT FINAL
 # ===========================================
-
-HEURE_DEBUT = 8
-HEURE_FIN = 18
-
-def extraire_ip(ligne):
-    debut_ip = ligne.find("IP=")
-    if debut_ip != -1:
-        partie_ip = ligne[debut_ip + 3:]
-        ip = partie_ip.split()[0]
-        return ip
-    return None
-
-def extraire_heure(ligne):
-    parties = ligne.split()
-    if len(parties) >= 2:
-        date_heure = parties[1]
-        heure_str = date_heure.split(":")[0]
-        try:
-            return int(heure_str)
-        except ValueError:
-            return None
-    return None
-
-def extraire_user(ligne):
-    debut_user = ligne.find("USER=")
-    if debut_user != -1:
-        partie_user = ligne[debut_user + 5:]
-        user = partie_user.split()[0] if partie_user.split() else ""
-        return user
-    return None
-
-def est_suspect(ligne, echecs_par_ip):
-    ip = extraire_ip(ligne)
-    heure = extraire_heure(ligne)
-    user = extraire_user(ligne)
-    
-    if ip and echecs_par_ip.get(ip, 0) >= 5:
-        return True, "IP_SUSPECTE"
-    if heure is not None and (heure < HEURE_DEBUT or heure >= HEURE_FIN):
-        return True, "HORS_HEURES"
-    if user == "admin":
-        return True, "ADMIN_CIBLE"
-    return False, None
-
-print("📊 Génération du rapport de sécurité")
-print("=" * 50)
-
-# Lire tous les logs
-with open("data/auth.log", "r") as fichier:
-    lignes = fichier.readlines()
-
-# Compter les échecs par IP
-echecs_par_ip = {}
-for ligne in lignes:
-    ligne = ligne.strip()
-    if "STATUS=FAIL" in ligne:
-        ip = extraire_ip(ligne)
-        if ip:
-            echecs_par_ip[ip] = echecs_par_ip.get(ip, 0) + 1
-
-# Collecter les statistiques
-alertes = []
-heures_suspectes = {}
-users_cibles = {}
-
-for ligne in lignes:
-    ligne = ligne.strip()
-    suspect, type_alerte = est_suspect(ligne, echecs_par_ip)
-    
-    if suspect:
-        alertes.append(ligne)
-        
-        # Compter par heure
-        heure = extraire_heure(ligne)
-        if heure is not None:
-            heures_suspectes[heure] = heures_suspectes.get(heure, 0) + 1
-        
-        # Compter par utilisateur
-        user = extraire_user(ligne)
-        if user:
-            users_cibles[user] = users_cibles.get(user, 0) + 1
-
-# Trier les IP par nombre d'échecs (top 5)
-ip_triees = sorted(echecs_par_ip.items(), key=lambda x: x[1], reverse=True)[:5]
-
-# Trier les heures par activité (top 5)
-heures_triees = sorted(heures_suspectes.items(), key=lambda x: x[1], reverse=True)[:5]
-
-# Générer le rapport
-rapport = f"""
-{'='*60}
-RAPPORT DE SÉCURITÉ - ANALYSE GLOBALE
-{'='*60}
-
-📊 STATISTIQUES GÉNÉRALES
-{'─'*60}
-Nombre total d'alertes détectées : {len(alertes)}
-Nombre total d'échecs d'authentification : {sum(echecs_par_ip.values())}
-Nombre d'IP distinctes : {len(echecs_par_ip)}
-
-🚨 TOP 5 DES IP LES PLUS SUSPECTES
-{'─'*60}
-"""
-for i, (ip, nombre) in enumerate(ip_triees, 1):
-    rapport += f"{i}. {ip} : {nombre} échecs\n"
-
-rapport += f"""
-⏰ TOP 5 DES HEURES AVEC ACTIVITÉ SUSPECTE
-{'─'*60}
-"""
-for i, (heure, nombre) in enumerate(heures_triees, 1):
-    rapport += f"{i}. {heure}h00 : {nombre} événements suspects\n"
-
-rapport += f"""
-👤 UTILISATEURS CIBLÉS
-{'─'*60}
-"""
-for user, nombre in sorted(users_cibles.items(), key=lambda x: x[1], reverse=True):
-    rapport += f"  {user} : {nombre} tentatives suspectes\n"
-
-rapport += f"""
-💡 RECOMMANDATIONS
-{'─'*60}
-1. Bloquer les IP avec 5+ échecs ({len([ip for ip, n in echecs_par_ip.items() if n >= 5])} IP concernées)
-2. Renforcer la sécurité du compte admin
-3. Surveiller particulièrement les heures {', '.join([str(h) for h, _ in heures_triees[:3]])}h
-4. Mettre en place une alerte automatique pour les connexions hors heures
-
-{'='*60}
-Rapport généré le : {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-{'='*60}
-"""
-
-# Sauvegarder le rapport
-with open("rapport_securite.txt", "w", encoding="utf-8") as fichier:
-    fichier.write(rapport)
-
-print(rapport)
-print("\n✅ Rapport généré : rapport_securite.txt")
+#
+# Usage :
+#   python solutions/solution_etape7.py                   # un seul cœur
+#   python solutions/solution_etape7.py --processus 32    # en parallèle
+#   python solutions/solution_etape7.py --index --top 10 --heures 22-6
+#       # index en colonnes (data/auth.log.index/), complété à chaque lancement
+#   python solutions/solution_etape7.py --cidr 24          # + classement des /24
+#   python solutions/solution_etape7.py --esquisses --enregistrer lundi.esq
+#       # mémoire bornée, chiffres approchés ; les esquisses de plusieurs jours
+#       # se cumulent avec --cumuler lundi.esq mardi.esq
+#   python solutions/solution_etape7.py 'data/auth.log*' --processus 0
+#       # historique complet (auth.log.3.gz ... auth.log), un fichier par processus
+#   python solutions/solution_etape7.py --incremental
+#       # agrégats gardés dans data/auth.log.etat : seules les nouvelles lignes sont lues
+
+import argparse
+import functools
+
+from detection.esquisses import CAPACITE, DELTA, EPSILON, ERREUR_HLL, StatistiquesEsquisses
+from detection.journaux import developper, est_compresse
+from detection.parallele import statistiques_paralleles
+from detection.pipeline import analyser, lire_lignes
+from detection.rapport import (
+    TOP_N,
+    StatistiquesRapport,
+    construire_rapport,
+    plage_heures,
+    statistiques_sequentielles,
+)
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Rapport de sécurité global")
+    p.add_argument(
+        "journaux",
+        nargs="*",
+        default=["data/auth.log"],
+        help="Fichiers de logs à analyser : liste ou motif (ex. 'data/auth.log*', y compris .gz/.bz2/.xz)",
+    )
+    p.add_argument(
+        "--processus",
+        type=int,
+        default=1,
+        help="Nombre de processus (1 = lecture séquentielle, 0 = tous les cœurs)",
+    )
+    p.add_argument(
+        "--index",
+        action="store_true",
+        help="Utiliser (et compléter) l'index en colonnes au lieu de reparser le texte (NumPy)",
+    )
+    p.add_argument("--top", type=int, default=TOP_N, help="Taille des classements")
+    p.add_argument(
+        "--heures",
+        type=plage_heures,
+        default=None,
+        help="Ne garder que les événements de cette plage d'heures (ex. 22-6, 8-18)",
+    )
+    p.add_argument(
+        "--cidr",
+        type=int,
+        default=None,
+        help="Classer aussi les sous-réseaux IPv4 de ce préfixe (ex. 24, 16)",
+    )
+    p.add_argument("--cidr6", type=int, default=64, help="Préfixe des sous-réseaux IPv6 (avec --cidr)")
+    p.add_argument(
+        "--esquisses",
+        action="store_true",
+        help="Statistiques à mémoire bornée (Count-Min, HyperLogLog, Space-Saving) : chiffres approchés",
+    )
+    p.add_argument("--epsilon", type=float, default=EPSILON, help="Count-Min : erreur relative au total d'échecs")
+    p.add_argument("--delta", type=float, default=DELTA, help="Count-Min : probabilité de dépasser cette erreur")
+    p.add_argument("--erreur-hll", type=float, default=ERREUR_HLL, help="HyperLogLog : erreur relative visée")
+    p.add_argument("--capacite", type=int, default=CAPACITE, help="Space-Saving : clés les plus fréquentes gardées")
+    p.add_argument("--enregistrer", default=None, help="Enregistrer les esquisses calculées dans ce fichier")
+    p.add_argument("--cumuler", nargs="+", default=[], help="Esquisses enregistrées à ajouter (autres jours, autres machines)")
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reprendre les agrégats du lancement précédent et ne lire que les nouvelles lignes",
+    )
+    p.add_argument("--etat", default=None, help="Fichier d'état du mode incrémental (défaut : <journal>.etat)")
+    args = p.parse_args()
+    if args.index and (args.esquisses or args.cumuler or args.incremental):
+        p.error("--index ne se combine pas avec --esquisses, --cumuler ou --incremental")
+    if args.enregistrer and not args.esquisses:
+        p.error("--enregistrer s'utilise avec --esquisses")
+    args.journaux = developper(args.journaux)
+    if (args.index or args.incremental) and (len(args.journaux) != 1 or est_compresse(args.journaux[0])):
+        p.error("--index et --incremental travaillent sur un seul fichier non compressé")
+    args.journal = args.journaux[0]
+    return args
+
+def main():
+    args = parse_args()
+
+    print("📊 Génération du rapport de sécurité")
+    print("=" * 50)
+
+    fabrique = StatistiquesRapport
+    if args.esquisses or args.cumuler:
+        fabrique = functools.partial(
+            StatistiquesEsquisses,
+            epsilon=args.epsilon,
+            delta=args.delta,
+            erreur_hll=args.erreur_hll,
+            capacite=args.capacite,
+        )
+
+    # Collecter les statistiques (échecs par IP, heures, utilisateurs)
+    if args.incremental:
+        from detection import cumul
+
+        parametres = {
+            "heures": sorted(args.heures) if args.heures is not None else None,
+            "esquisses": dict(fabrique.keywords) if fabrique is not StatistiquesRapport else None,
+        }
+        statistiques, ajoutees = cumul.mettre_a_jour(args.journal, parametres, args.heures, fabrique, args.etat)
+        print(f"📥 État du rapport à jour ({ajoutees:,} nouvelles lignes)")
+    elif args.index:
+        from detection import colonnes
+
+        ajoutees = colonnes.mettre_a_jour(args.journal)
+        print(f"🗂️  Index à jour ({ajoutees:,} nouvelles lignes)")
+        index = colonnes.IndexColonnes(colonnes.dossier_index(args.journal))
+        statistiques = colonnes.StatistiquesIndex(index, args.heures)
+    elif args.processus == 1:
+        statistiques = statistiques_sequentielles(analyser(lire_lignes(args.journaux)), args.heures, fabrique)
+    else:
+        statistiques = statistiques_paralleles(args.journaux, args.processus or None, args.heures, fabrique)
+
+    if args.enregistrer:
+        statistiques.enregistrer(args.enregistrer)
+        print(f"💾 Esquisses enregistrées : {args.enregistrer}")
+    for chemin in args.cumuler:
+        statistiques.fusionner(StatistiquesEsquisses.charger(chemin))
+
+    # Générer le rapport
+    reseaux = (args.cidr, args.cidr6) if args.cidr is not None else None
+    rapport = construire_rapport(statistiques, top=args.top, reseaux=reseaux)
+
+    # Sauvegarder le rapport
+    with open("rapport_securite.txt", "w", encoding="utf-8") as fichier:
+        fichier.write(rapport)
+
+    print(rapport)
+    print("\n✅ Rapport généré : rapport_securite.txt")
+
+if __name__ == "__main__":
+    main()
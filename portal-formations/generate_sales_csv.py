@@ -8,150 +8,900 @@ Usage:
   python generate_sales_csv.py --rows 2000000 --out sales_2M.csv --seed 42
 Optional:
   python generate_sales_csv.py --rows 2000000 --out sales_2M.csv --seed 42 --gzip
+
+Block mode (NumPy, for 100M+ rows): columns are drawn 1M rows at a time and
+each block is written in one go. Same schema and distributions, but a
+different random stream than the row-by-row mode:
+  python generate_sales_csv.py --rows 100000000 --out sales_100M.csv --seed 42 --block-size 1000000
+
+Sharded mode (block mode on several cores): shard k gets its own random stream
+spawned from the seed and writes sales_100M.part-0000k.csv; --concat joins the
+parts into --out. For a given seed and shard count the data is the same
+whatever the number of workers:
+  python generate_sales_csv.py --rows 1000000000 --out sales_1B.csv --shards 16 --workers 8
+
+Typed output (block mode, needs pyarrow): Parquet or Arrow IPC with date32
+order_date, float64 price, int8 quantity and dictionary-encoded categories,
+so Spark can skip inferSchema and push predicates down:
+  python generate_sales_csv.py --rows 100000000 --out sales_100M.parquet --format parquet
+
+Parallel gzip (block mode): each block is cut into members of 100k rows,
+compressed in N threads and written one after the other. The result is a
+single valid multi-member .gz (zcat, gzip.open and Spark read it as usual),
+and _sales_100M.csv.gz.idx lists the byte offset, size, first row and row
+count of every member so a reader can seek to or split on member bounds:
+  python generate_sales_csv.py --rows 100000000 --out sales_100M.csv --gzip --gzip-threads 8
+
+Other tables (block mode): the columns and their distributions come from a
+JSON spec file (see dataset_specs/, sales.json is the default one):
+  python generate_sales_csv.py --spec dataset_specs/datalogis_commandes.json --rows 10000000
+
+Spec format: {"name", "output": [column names, in file order], "columns": [...]}.
+Columns are drawn in the order they are listed; each one may only refer to
+columns listed before it. Column types:
+- sequence: row number (+ "start") printed with "format" ("ORD-%07d");
+- categorical: "values" (uniform) or "weights" ({value: weight}, or
+  "values" + a "weights" list; relative, they need not sum to 1); "by": a
+  categorical column, with one weights mapping per value of that column;
+  "sampler": "bisect" (default) or "alias";
+- lookup: "map" applied to the values of the categorical column "from";
+- date: "start" + "days" (inclusive span); optional "months" volume weights;
+- uniform: "min" / "max", or "by" + "ranges"; optional "seasonality"
+  ({"date": column, "months": {month: multiplier}}), "charm"
+  ({"share", "cents"}: price ending in .99) and "decimals";
+- integer: "min" / "max", or "by" + "ranges"; optional "fixed"
+  ({"value", "share"}) and "format" (printed as text, e.g. "C%03d");
+- formula: arithmetic "expr" over numeric columns, optional "decimals";
+- template: "template" text with {column} placeholders.
+Any column can carry "null_when": {"column", "values"} (empty in CSV, null in
+Parquet / Arrow).
 """
 
 import argparse
+import ast
+import bisect
 import csv
 import gzip
+import json
+import os
 import random
+import shutil
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import accumulate
 
-FIELDS = [
-    "order_id",
-    "order_date",
-    "product",
-    "category",
-    "country",
-    "price",
-    "quantity",
-    "channel",
-    "payment",
-]
+try:
+    import numpy as np
+except ImportError:  # only needed for --block-size
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --format parquet / arrow
+    pa = pq = None
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset_specs", "sales.json")
+DEFAULT_BLOCK_SIZE = 1_000_000
+GZIP_MEMBER_ROWS = 100_000  # rows per independently compressed gzip member (--gzip-threads)
+GZIP_LEVEL = 9  # same as gzip.open
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+# Categorical columns with more values than this get a wider dictionary index
+INT8_MAX = 127
 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--rows", type=int, default=2_000_000, help="Number of rows to generate")
-    p.add_argument("--out", type=str, default="sales_2M.csv", help="Output CSV file path")
+    p.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="Output file path (default: sales_2M.csv, or <spec name>.csv with --spec)",
+    )
     p.add_argument("--seed", type=int, default=42, help="Random seed for reproducibility")
+    p.add_argument(
+        "--spec",
+        type=str,
+        default=None,
+        help="JSON spec of the table to generate (default: dataset_specs/sales.json); implies block mode",
+    )
     p.add_argument(
         "--start-date",
         type=str,
-        default="2023-01-01",
-        help="Start date (YYYY-MM-DD) for order_date randomization",
+        default=None,
+        help="Start date (YYYY-MM-DD) for order_date randomization (overrides the spec's first date column)",
     )
     p.add_argument(
         "--days-span",
         type=int,
-        default=730,
-        help="Number of days from start-date to spread dates across",
+        default=None,
+        help="Number of days from start-date to spread dates across (overrides the spec)",
     )
     p.add_argument("--gzip", action="store_true", help="Write gzipped CSV (adds .gz if missing)")
+    p.add_argument(
+        "--gzip-threads",
+        type=int,
+        default=0,
+        help="Compress --gzip output in N threads, as independent gzip members + a block index",
+    )
     p.add_argument("--progress-every", type=int, default=100_000, help="Print progress every N rows")
-    return p.parse_args()
+    p.add_argument(
+        "--block-size",
+        type=int,
+        default=0,
+        help="Generate with NumPy, N rows per block (e.g. 1000000); 0 = row by row",
+    )
+    p.add_argument("--workers", type=int, default=1, help="Processes generating shards in parallel")
+    p.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Number of part files, each with its own random stream (default: --workers)",
+    )
+    p.add_argument("--concat", action="store_true", help="Concatenate the part files into --out (CSV only)")
+    p.add_argument(
+        "--format",
+        choices=sorted(FORMATS),
+        default="csv",
+        help="Output format; parquet / arrow write typed columns (needs pyarrow)",
+    )
+    p.add_argument(
+        "--row-group-size",
+        type=int,
+        default=DEFAULT_BLOCK_SIZE,
+        help="Rows per Parquet row group / Arrow record batch (at most --block-size)",
+    )
+    args = p.parse_args()
+    if args.shards is None:
+        args.shards = args.workers
+    if args.format != "csv":
+        if args.gzip or args.concat:
+            p.error("--gzip and --concat only apply to --format csv")
+        if pa is None:
+            p.error(f"--format {args.format} requires pyarrow: pip install pyarrow")
+    if args.gzip_threads and not args.gzip:
+        p.error("--gzip-threads requires --gzip")
+    if (args.shards > 1 or args.format != "csv" or args.spec or args.gzip_threads) and args.block_size <= 0:
+        # shards, typed formats, specs and parallel gzip are generated in block mode
+        args.block_size = DEFAULT_BLOCK_SIZE
+    if args.block_size > 0 and np is None:
+        p.error("block mode (--block-size, --shards, --format, --spec, --gzip-threads) requires NumPy: pip install numpy")
+    return args
 
 
-def weighted_choice(rng: random.Random, items_with_weights):
-    # items_with_weights = [("France", 0.35), ("Germany", 0.2), ...]
-    r = rng.random()
-    cum = 0.0
-    for item, w in items_with_weights:
-        cum += w
-        if r <= cum:
-            return item
-    return items_with_weights[-1][0]
+# --- weighted sampling -------------------------------------------------------
 
+def cumulative(weights):
+    """Cumulative weights, summed left to right (same floats as a running total)."""
+    return list(accumulate(weights))
 
-def main():
-    args = parse_args()
-    rng = random.Random(args.seed)
 
-    start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
-
-    # Realistic-ish catalog
-    catalog = [
-        ("Smartphone", "Électronique", (199.0, 1299.0)),
-        ("Laptop", "Informatique", (499.0, 2999.0)),
-        ("Casque audio", "Audio", (29.0, 499.0)),
-        ("TV", "Électronique", (249.0, 3999.0)),
-        ("Montre connectée", "Électronique", (79.0, 899.0)),
-        ("Tablette", "Informatique", (129.0, 1499.0)),
-        ("Imprimante", "Informatique", (59.0, 699.0)),
-        ("Enceinte", "Audio", (19.0, 799.0)),
-        ("Console", "Électronique", (199.0, 699.0)),
-        ("Caméra", "Électronique", (49.0, 1499.0)),
-    ]
+def pick_index(cum, r):
+    # First cumulative weight >= r (bisect instead of a linear walk); last one if rounding leaves a gap
+    return min(bisect.bisect_left(cum, r), len(cum) - 1)
 
-    # Weights to mimic market distribution
-    countries = [
-        ("France", 0.34),
-        ("Allemagne", 0.18),
-        ("Espagne", 0.14),
-        ("Italie", 0.14),
-        ("Belgique", 0.10),
-        ("Pays-Bas", 0.06),
-        ("Portugal", 0.04),
-    ]
-    channels = [("Web", 0.55), ("Mobile", 0.35), ("Magasin", 0.10)]
-    payments = [("Carte", 0.72), ("Paypal", 0.18), ("Virement", 0.07), ("Apple Pay", 0.03)]
 
-    # Optional: gzipped output
-    out_path = args.out
-    if args.gzip and not out_path.endswith(".gz"):
-        out_path += ".gz"
+def weighted_indices(u, cum):
+    """Vectorized pick_index over an array of uniforms."""
+    return np.minimum(np.searchsorted(cum, u, side="left"), len(cum) - 1)
+
+
+def alias_table(weights):
+    """Vose's alias method: O(1) draws whatever the number of values."""
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [w * n / total for w in weights]
+    prob, alias = [1.0] * n, list(range(n))
+    small = [i for i, s in enumerate(scaled) if s < 1.0]
+    large = [i for i, s in enumerate(scaled) if s >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return np.array(prob), np.array(alias, dtype=np.intp)
+
+
+def alias_indices(u, prob, alias):
+    # One uniform per draw: integer part = bucket, fractional part = coin
+    scaled = u * len(prob)
+    bucket = np.minimum(scaled.astype(np.intp), len(prob) - 1)
+    return np.where(scaled - bucket < prob[bucket], bucket, alias[bucket])
+
+
+def csv_quote(value):
+    text = str(value)
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def smallest_int_type(lo, hi):
+    for bits in (8, 16, 32):
+        if -(2 ** (bits - 1)) <= lo and hi < 2 ** (bits - 1):
+            return getattr(pa, f"int{bits}")()
+    return pa.int64()
+
+
+# --- spec columns --------------------------------------------------------------
+#
+# Each column consumes a fixed number of uniforms per row (``uniforms``), taken
+# in declaration order from one random() matrix: the output only depends on
+# the seed and the spec, never on the block size.
+#
+# draw() returns an array per row: indices into ``values`` for categorical
+# columns and day offsets for dates, numbers otherwise.
+
+
+class Column:
+    uniforms = 0
+    categorical = False
+
+    def __init__(self, spec, columns):
+        self.name = spec["name"]
+        self.null_when = spec.get("null_when")
+        if self.null_when:
+            parent = columns[self.null_when["column"]]
+            self.null_codes = np.array([parent.values.index(v) for v in self.null_when["values"]])
+
+    def null_mask(self, drawn):
+        if not self.null_when:
+            return None
+        return np.isin(drawn[self.null_when["column"]], self.null_codes)
+
+    def numbers(self, drawn):
+        """Numeric values (for formulas)."""
+        return drawn[self.name]
+
+
+class Sequence(Column):
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        self.format = spec.get("format", "%d")
+        self.start = int(spec.get("start", 0))
+
+    def draw(self, u, drawn, first, n):
+        return np.arange(first + self.start, first + self.start + n)
+
+    def csv(self, values):
+        return self.format, range(int(values[0]), int(values[0]) + len(values)) if len(values) else []
+
+    def arrow(self, values, mask):
+        return pa.array([self.format % i for i in values.tolist()], pa.string(), mask=mask)
+
+    def arrow_type(self):
+        return pa.string()
+
+
+class Categorical(Column):
+    uniforms = 1
+    categorical = True
+
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        self.by = spec.get("by")
+        weights = spec.get("weights")
+        if self.by:
+            # One weights mapping per value of the parent column, over a shared list of values
+            self.parent = columns[self.by]
+            self.values = []
+            for mapping in weights.values():
+                self.values += [v for v in mapping if v not in self.values]
+            tables = [[weights.get(parent_value, {}).get(v, 0.0) for v in self.values]
+                      for parent_value in self.parent.values]
+        elif isinstance(weights, dict):
+            self.values = list(weights)
+            tables = [list(weights.values())]
+        else:
+            self.values = list(spec["values"])
+            tables = [list(weights)] if weights else None
+        self.sampler = spec.get("sampler", "bisect")
+        for code, w in enumerate(tables or []):
+            if not sum(w) > 0:
+                where = f" for {self.by}={self.parent.values[code]!r}" if self.by else ""
+                raise ValueError(f"{self.name}: weights{where} must have a positive total")
+        if tables is None:
+            self.tables = None
+        elif self.sampler == "alias":
+            self.tables = [alias_table(w) for w in tables]
+        else:
+            # Weights need not sum to 1: scale each table like Date does
+            self.tables = [np.array(cumulative(w), dtype=float) for w in tables]
+            for cum in self.tables:
+                cum /= cum[-1]
+
+    def _sample(self, u, table):
+        if table is None:
+            return np.minimum((u * len(self.values)).astype(np.intp), len(self.values) - 1)
+        if self.sampler == "alias":
+            return alias_indices(u, *table)
+        return weighted_indices(u, table)
+
+    def draw(self, u, drawn, first, n):
+        if self.tables is None or len(self.tables) == 1:
+            return self._sample(u[:, 0], self.tables and self.tables[0])
+        parent = drawn[self.by]
+        out = np.empty(n, dtype=np.intp)
+        for code, table in enumerate(self.tables):
+            rows = parent == code
+            out[rows] = self._sample(u[rows, 0], table)
+        return out
+
+    def numbers(self, drawn):
+        return np.array(self.values)[drawn[self.name]]
+
+    def csv(self, values):
+        quoted = [csv_quote(v) for v in self.values]
+        return "%s", map(quoted.__getitem__, values.tolist())
+
+    def arrow_type(self):
+        if all(isinstance(v, int) for v in self.values):
+            return smallest_int_type(min(self.values), max(self.values))
+        if all(isinstance(v, (int, float)) for v in self.values):
+            return pa.float64()
+        index = pa.int8() if len(self.values) <= INT8_MAX else pa.int32()
+        return pa.dictionary(index, pa.string())
+
+    def arrow(self, values, mask):
+        type_ = self.arrow_type()
+        if pa.types.is_dictionary(type_):
+            indices = pa.array(values.astype(type_.index_type.to_pandas_dtype()), type_.index_type, mask=mask)
+            return pa.DictionaryArray.from_arrays(indices, pa.array([str(v) for v in self.values]))
+        return pa.array(np.array(self.values)[values], type_, mask=mask)
+
+
+class Lookup(Categorical):
+    uniforms = 0
+
+    def __init__(self, spec, columns):
+        Column.__init__(self, spec, columns)
+        self.parent = columns[spec["from"]]
+        mapping = spec["map"]
+        # Dictionary in sorted order, like any set of labels
+        self.values = sorted(set(mapping.values()), key=str)
+        self.codes = np.array([self.values.index(mapping[v]) for v in self.parent.values])
+
+    def draw(self, u, drawn, first, n):
+        return self.codes[drawn[self.parent.name]]
+
+
+class Date(Column):
+    uniforms = 1
+
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        self.start = datetime.strptime(spec["start"], "%Y-%m-%d")
+        self.dates = [self.start + timedelta(days=d) for d in range(int(spec["days"]) + 1)]
+        self.strings = [dt.strftime("%Y-%m-%d") for dt in self.dates]
+        self.epoch_day = (self.start - datetime(1970, 1, 1)).days
+        months = spec.get("months")
+        # Volume seasonality: each day weighs its month's weight
+        self.cum = np.array(cumulative([months.get(str(dt.month), 1.0) for dt in self.dates])) if months else None
+        if self.cum is not None:
+            self.cum /= self.cum[-1]
+
+    def multipliers(self, months):
+        """Per-day multiplier table for a {month: multiplier} seasonality curve."""
+        return np.array([months.get(str(dt.month), 1.0) for dt in self.dates])
+
+    def draw(self, u, drawn, first, n):
+        if self.cum is not None:
+            return weighted_indices(u[:, 0], self.cum)
+        return np.minimum((u[:, 0] * len(self.dates)).astype(np.intp), len(self.dates) - 1)
+
+    def csv(self, values):
+        return "%s", map(self.strings.__getitem__, values.tolist())
+
+    def arrow(self, values, mask):
+        return pa.array((values + self.epoch_day).astype(np.int32), pa.date32(), mask=mask)
+
+    def arrow_type(self):
+        return pa.date32()
+
+
+def _ranges(spec, columns):
+    """(parent column or None, lows, highs) from "min" / "max" or "by" + "ranges"."""
+    if "by" in spec:
+        parent = columns[spec["by"]]
+        ranges = [spec["ranges"][v] for v in parent.values]
+        return parent, np.array([lo for lo, _ in ranges]), np.array([hi for _, hi in ranges])
+    return None, np.array([spec["min"]]), np.array([spec["max"]])
+
+
+class Uniform(Column):
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        self.parent, self.lo, hi = _ranges(spec, columns)
+        self.span = hi - self.lo
+        self.decimals = spec.get("decimals")
+        seasonality = spec.get("seasonality")
+        self.season = None
+        if seasonality:
+            self.season = (seasonality["date"], columns[seasonality["date"]].multipliers(seasonality["months"]))
+        self.charm = spec.get("charm")
+        self.uniforms = 2 if self.charm else 1
 
-    opener = gzip.open if out_path.endswith(".gz") else open
+    def draw(self, u, drawn, first, n):
+        code = drawn[self.parent.name] if self.parent else 0
+        value = self.lo[code] + self.span[code] * u[:, 0]
+        if self.season:
+            date, table = self.season
+            value = value * table[drawn[date]]
+        rounded = value if self.decimals is None else np.round(value, self.decimals)
+        if self.charm:
+            return np.where(u[:, 1] < self.charm["share"], np.floor(value) + self.charm["cents"], rounded)
+        return rounded
 
-    with opener(out_path, "wt", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writeheader()
+    def csv(self, values):
+        return ("%s" if self.decimals is None else f"%.{self.decimals}f"), values.tolist()
 
-        for i in range(args.rows):
-            product, category, (pmin, pmax) = rng.choice(catalog)
+    def arrow(self, values, mask):
+        return pa.array(values, pa.float64(), mask=mask)
 
-            # Date spread + slight seasonality (more sales in Nov/Dec)
-            day_offset = rng.randint(0, args.days_span)
-            dt = start_date + timedelta(days=day_offset)
+    def arrow_type(self):
+        return pa.float64()
 
-            # Small seasonal multiplier
-            seasonal = 1.0
-            if dt.month in (11, 12):
-                seasonal = 1.12
-            elif dt.month in (1, 2):
-                seasonal = 0.95
 
-            country = weighted_choice(rng, countries)
-            channel = weighted_choice(rng, channels)
-            payment = weighted_choice(rng, payments)
+class Integer(Column):
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        self.parent, self.lo, hi = _ranges(spec, columns)
+        self.lo = self.lo.astype(np.int64)
+        self.count = hi.astype(np.int64) - self.lo + 1
+        self.fixed = spec.get("fixed")
+        self.format = spec.get("format")
+        # Uniforms: [fixed coin,] value
+        self.uniforms = 2 if self.fixed else 1
+        bounds = [int(self.lo.min()), int(hi.max())] + ([self.fixed["value"]] if self.fixed else [])
+        self.bounds = (min(bounds), max(bounds))
 
-            # Price with realistic rounding (ends .99 sometimes)
-            base_price = rng.uniform(pmin, pmax) * seasonal
-            # push a portion to .99 pricing
-            if rng.random() < 0.45:
-                price = int(base_price) + 0.99
+    def draw(self, u, drawn, first, n):
+        code = drawn[self.parent.name] if self.parent else 0
+        count = self.count[code]
+        value = self.lo[code] + np.minimum((u[:, -1] * count).astype(np.int64), count - 1)
+        if self.fixed:
+            return np.where(u[:, 0] < self.fixed["share"], self.fixed["value"], value)
+        return value
+
+    def csv(self, values):
+        return self.format or "%d", values.tolist()
+
+    def arrow(self, values, mask):
+        if self.format:
+            return pa.array([self.format % v for v in values.tolist()], pa.string(), mask=mask)
+        return pa.array(values, self.arrow_type(), mask=mask)
+
+    def arrow_type(self):
+        return pa.string() if self.format else smallest_int_type(*self.bounds)
+
+
+class Formula(Column):
+    """Arithmetic over numeric columns: + - * / // % ** and parentheses only."""
+
+    OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd)
+
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        self.tree = ast.parse(spec["expr"], mode="eval").body
+        self.columns = columns
+        self.decimals = spec.get("decimals")
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Name):
+                if node.id not in columns:
+                    raise ValueError(f"{self.name}: unknown column {node.id!r} in formula")
+            elif not isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Constant, ast.Load) + self.OPERATORS):
+                raise ValueError(f"{self.name}: unsupported syntax in formula: {ast.dump(node)}")
+
+    def _eval(self, node, drawn):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.columns[node.id].numbers(drawn)
+        if isinstance(node, ast.UnaryOp):
+            operand = self._eval(node.operand, drawn)
+            return -operand if isinstance(node.op, ast.USub) else operand
+        left, right = self._eval(node.left, drawn), self._eval(node.right, drawn)
+        return {
+            ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+            ast.FloorDiv: np.floor_divide, ast.Mod: np.mod, ast.Pow: np.power,
+        }[type(node.op)](left, right)
+
+    def draw(self, u, drawn, first, n):
+        value = np.broadcast_to(self._eval(self.tree, drawn), (n,)).astype(np.float64)
+        return value if self.decimals is None else np.round(value, self.decimals)
+
+    csv = Uniform.csv
+    arrow = Uniform.arrow
+    arrow_type = Uniform.arrow_type
+
+
+class Template(Column):
+    def __init__(self, spec, columns):
+        super().__init__(spec, columns)
+        # "{a} {b}" -> printf "%s %s" over the referenced columns
+        self.format, self.fields = "", []
+        for literal, field, _, _ in string.Formatter().parse(spec["template"]):
+            self.format += literal.replace("%", "%%")
+            if field is not None:
+                self.format += "%s"
+                self.fields.append(columns[field])
+
+    def draw(self, u, drawn, first, n):
+        parts = []
+        for column in self.fields:
+            values = drawn[column.name]
+            if column.categorical:
+                parts.append(map(column.values.__getitem__, values.tolist()))
             else:
-                price = round(base_price, 2)
-
-            quantity = 1 if rng.random() < 0.72 else rng.randint(2, 5)
-
-            row = {
-                "order_id": f"ORD-{i:07d}",
-                "order_date": dt.strftime("%Y-%m-%d"),
-                "product": product,
-                "category": category,
-                "country": country,
-                "price": f"{price:.2f}",
-                "quantity": str(quantity),
-                "channel": channel,
-                "payment": payment,
-            }
-            writer.writerow(row)
-
-            if args.progress_every and (i + 1) % args.progress_every == 0:
-                print(f"Generated {i+1:,} / {args.rows:,} rows...")
+                parts.append(values.tolist())
+        return np.array([self.format % row for row in zip(*parts)], dtype=object)
+
+    def csv(self, values):
+        return "%s", map(csv_quote, values.tolist())
+
+    def arrow(self, values, mask):
+        return pa.array(values.tolist(), pa.string(), mask=mask)
+
+    def arrow_type(self):
+        return pa.string()
+
+
+COLUMN_TYPES = {
+    "sequence": Sequence,
+    "categorical": Categorical,
+    "lookup": Lookup,
+    "date": Date,
+    "uniform": Uniform,
+    "integer": Integer,
+    "formula": Formula,
+    "template": Template,
+}
+
+
+class Spec:
+    """Compiled spec: columns in draw order, plus the output order."""
+
+    def __init__(self, config):
+        self.name = config["name"]
+        self.columns = {}
+        for column_spec in config["columns"]:
+            kind = column_spec["type"]
+            if kind not in COLUMN_TYPES:
+                raise ValueError(f"{column_spec['name']}: unknown column type {kind!r}")
+            self.columns[column_spec["name"]] = COLUMN_TYPES[kind](column_spec, self.columns)
+        self.output = [self.columns[name] for name in config.get("output", list(self.columns))]
+        self.uniforms_per_row = sum(column.uniforms for column in self.columns.values())
+
+
+def load_config(args):
+    """The JSON spec, with --start-date / --days-span applied to its first date column."""
+    with open(args.spec or DEFAULT_SPEC, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    for column_spec in config["columns"]:
+        if column_spec["type"] == "date":
+            if args.start_date:
+                column_spec["start"] = args.start_date
+            if args.days_span is not None:
+                column_spec["days"] = args.days_span
+            break
+    return config
+
+
+def draw_block(spec, rng, first, n):
+    """
+    Columns of ``n`` rows numbered from ``first``: {name: array}, {name: null mask}.
+    Every row consumes exactly spec.uniforms_per_row doubles from ``rng``.
+    """
+    u = rng.random((n, spec.uniforms_per_row))
+    drawn, nulls = {}, {}
+    offset = 0
+    for column in spec.columns.values():
+        drawn[column.name] = column.draw(u[:, offset:offset + column.uniforms], drawn, first, n)
+        offset += column.uniforms
+        mask = column.null_mask(drawn)
+        if mask is not None:
+            nulls[column.name] = mask
+    return drawn, nulls
+
+
+# --- row-by-row mode (sales only) -----------------------------------------------
+
+def generate_rows(f, args, config):
+    """The original one-row-at-a-time generator (random.Random, no NumPy), fed from the sales spec."""
+    c = {column["name"]: column for column in config["columns"]}
+    catalog = [(p, c["category"]["map"][p], tuple(c["price"]["ranges"][p])) for p in c["product"]["values"]]
+    countries, channels, payments = (
+        (list(c[name]["weights"]), cumulative(c[name]["weights"].values())) for name in ("country", "channel", "payment")
+    )
+    start_date = datetime.strptime(c["order_date"]["start"], "%Y-%m-%d")
+    days_span = c["order_date"]["days"]
+    seasonal = c["price"]["seasonality"]["months"]
+    charm, fixed = c["price"]["charm"], c["quantity"]["fixed"]
+    qmin, qmax = c["quantity"]["min"], c["quantity"]["max"]
+
+    rng = random.Random(args.seed)
+    writer = csv.DictWriter(f, fieldnames=config["output"])
+    writer.writeheader()
+
+    for i in range(args.rows):
+        product, category, (pmin, pmax) = rng.choice(catalog)
+
+        # Date spread + slight seasonality (more sales in Nov/Dec)
+        day_offset = rng.randint(0, days_span)
+        dt = start_date + timedelta(days=day_offset)
+
+        country = countries[0][pick_index(countries[1], rng.random())]
+        channel = channels[0][pick_index(channels[1], rng.random())]
+        payment = payments[0][pick_index(payments[1], rng.random())]
+
+        # Price with realistic rounding (ends .99 sometimes)
+        base_price = rng.uniform(pmin, pmax) * seasonal.get(str(dt.month), 1.0)
+        # push a portion to .99 pricing
+        if rng.random() < charm["share"]:
+            price = int(base_price) + charm["cents"]
+        else:
+            price = round(base_price, 2)
+
+        quantity = fixed["value"] if rng.random() < fixed["share"] else rng.randint(qmin, qmax)
+
+        row = {
+            "order_id": f"ORD-{i:07d}",
+            "order_date": dt.strftime("%Y-%m-%d"),
+            "product": product,
+            "category": category,
+            "country": country,
+            "price": f"{price:.2f}",
+            "quantity": str(quantity),
+            "channel": channel,
+            "payment": payment,
+        }
+        writer.writerow(row)
+
+        if args.progress_every and (i + 1) % args.progress_every == 0:
+            print(f"Generated {i+1:,} / {args.rows:,} rows...")
+
+
+# --- block mode ----------------------------------------------------------------
+
+def index_path(path):
+    # Leading underscore: Spark / Hadoop skip it when reading the whole directory
+    head, tail = os.path.split(path)
+    return os.path.join(head, f"_{tail}.idx")
+
+
+def write_index(path, members):
+    with open(index_path(path), "w", encoding="utf-8") as f:
+        f.write("offset,size,first_row,rows\n")
+        f.writelines(f"{offset},{size},{first_row},{rows}\n" for offset, size, first_row, rows in members)
+
+
+def read_index(path):
+    with open(index_path(path), "r", encoding="utf-8") as f:
+        next(f)
+        return [tuple(map(int, line.split(","))) for line in f]
+
+
+class CsvSink:
+    """
+    Writes blocks as CSV text, one write per block (same layout as csv.DictWriter).
+    With ``threads``, a .gz path gets independent gzip members of GZIP_MEMBER_ROWS
+    rows compressed in a thread pool (zlib releases the GIL), plus a member index.
+    """
+
+    def __init__(self, path, spec, header=True, threads=0):
+        self.path = path
+        self.spec = spec
+        header_line = ",".join(column.name for column in spec.output) + "\r\n" if header else ""
+        self.pool = None
+        if threads and path.endswith(".gz"):
+            self.f = open(path, "wb")
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+            self.in_flight = 2 * threads  # members compressing at once, not the whole file
+            self.pending = deque()  # (future, rows), in file order
+            self.members = []       # (offset, size, first_row, rows)
+            self.offset = self.rows = 0
+            self.header = header_line  # goes at the start of the first member
+            return
+        opener = gzip.open if path.endswith(".gz") else open
+        self.f = opener(path, "wt", newline="", encoding="utf-8")
+        self.f.write(header_line)
+
+    def write(self, drawn, nulls):
+        formats, columns = [], []
+        for column in self.spec.output:
+            fmt, values = column.csv(drawn[column.name])
+            mask = nulls.get(column.name)
+            if mask is not None:
+                # Nullable column: pre-formatted, empty when null
+                fmt, values = "%s", ["" if null else fmt % v for v, null in zip(values, mask.tolist())]
+            formats.append(fmt)
+            columns.append(values)
+        line = ",".join(formats) + "\r\n"  # csv.DictWriter line terminator
+        if self.pool is None:
+            self.f.write("".join([line % row for row in zip(*columns)]))
+            return
+
+        lines = [line % row for row in zip(*columns)]
+        for start in range(0, len(lines), GZIP_MEMBER_ROWS):
+            chunk = lines[start:start + GZIP_MEMBER_ROWS]
+            data = (self.header + "".join(chunk)).encode("utf-8")
+            self.header = ""
+            # mtime=0: the same seed gives the same bytes
+            self.pending.append((self.pool.submit(gzip.compress, data, GZIP_LEVEL, mtime=0), len(chunk)))
+            while len(self.pending) > self.in_flight:
+                self._write_member()
+
+    def _write_member(self):
+        future, rows = self.pending.popleft()
+        data = future.result()
+        self.f.write(data)
+        self.members.append((self.offset, len(data), self.rows, rows))
+        self.offset += len(data)
+        self.rows += rows
+
+    def close(self):
+        if self.pool is not None:
+            try:
+                while self.pending:
+                    self._write_member()
+            finally:
+                self.pool.shutdown()
+            write_index(self.path, self.members)
+        self.f.close()
+
+
+class ArrowSink:
+    """Writes blocks as typed columns to a Parquet or Arrow IPC file."""
+
+    def __init__(self, path, spec, fmt, row_group_size):
+        self.spec = spec
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([(column.name, column.arrow_type()) for column in spec.output])
+        if fmt == "parquet":
+            # Only the low-cardinality (categorical) columns are dictionary-encoded
+            dictionary = [column.name for column in spec.output if pa.types.is_dictionary(column.arrow_type())]
+            self.writer = pq.ParquetWriter(path, self.schema, use_dictionary=dictionary)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, drawn, nulls):
+        table = pa.Table.from_arrays(
+            [column.arrow(drawn[column.name], nulls.get(column.name)) for column in self.spec.output],
+            schema=self.schema,
+        )
+        if isinstance(self.writer, pq.ParquetWriter):
+            self.writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self.writer.write_table(table, max_chunksize=self.row_group_size)
+
+    def close(self):
+        self.writer.close()
+
+
+def open_sink(path, args, spec, header=True):
+    if args.format == "csv":
+        return CsvSink(path, spec, header, args.gzip_threads)
+    return ArrowSink(path, spec, args.format, args.row_group_size)
+
+
+def generate_blocks(sink, args, spec, rng=None, first=0, rows=None, progress=True):
+    """
+    Rows drawn with NumPy one block at a time and handed to ``sink``. Rows are
+    numbered from ``first`` (a shard writes ``rows`` rows with its own ``rng``).
+    """
+    if rng is None:
+        rng = np.random.default_rng(args.seed)
+    if rows is None:
+        rows = args.rows
+
+    done = 0
+    next_progress = args.progress_every if progress else 0
+    while done < rows:
+        n = min(args.block_size, rows - done)
+        sink.write(*draw_block(spec, rng, first + done, n))
+        done += n
+
+        while next_progress and done >= next_progress:
+            print(f"Generated {next_progress:,} / {rows:,} rows...")
+            next_progress += args.progress_every
+
+
+def part_path(out_path, shard):
+    # sales.csv.gz -> sales.part-00003.csv.gz; only the file name's trailing extension counts
+    head, name = os.path.split(out_path)
+    stem, gz = (name[:-3], ".gz") if name.endswith(".gz") else (name, "")
+    for ext in FORMATS.values():
+        if stem.endswith(ext) and len(stem) > len(ext):
+            stem, gz = stem[: -len(ext)], ext + gz
+            break
+    return os.path.join(head, f"{stem}.part-{shard:05d}{gz}")
+
+
+def write_blocks(path, args, rng=None, first=0, rows=None, header=True, progress=True):
+    spec = Spec(load_config(args))
+    sink = open_sink(path, args, spec, header)
+    try:
+        generate_blocks(sink, args, spec, rng, first, rows, progress)
+    finally:
+        sink.close()
+
+
+def generate_shard(task):
+    args, shard, seed_seq, first, rows, path, header = task
+    write_blocks(path, args, np.random.default_rng(seed_seq), first, rows, header, progress=False)
+    return path, rows
+
+
+def generate_shards(args, out_path):
+    """
+    Shard k writes rows [k * rows // shards, (k + 1) * rows // shards) with a
+    stream spawned from the seed: order_id stays contiguous across parts and the
+    data does not depend on how many workers run.
+    """
+    seeds = np.random.SeedSequence(args.seed).spawn(args.shards)
+    bounds = [k * args.rows // args.shards for k in range(args.shards + 1)]
+    tasks = [
+        # Concatenated parts keep a single header (gzip members can't be edited afterwards)
+        (args, k, seeds[k], bounds[k], bounds[k + 1] - bounds[k], part_path(out_path, k),
+         k == 0 or not args.concat)
+        for k in range(args.shards)
+    ]
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, args.shards))) as pool:
+        paths = []
+        for k, (path, rows) in enumerate(pool.map(generate_shard, tasks)):
+            print(f"Shard {k + 1} / {args.shards}: {path} ({rows:,} rows)")
+            paths.append(path)
+
+    if not args.concat:
+        return paths
+    # Plain byte concatenation: valid CSV, and valid multi-member gzip
+    members, offset = [], 0
+    with open(out_path, "wb") as out:
+        for k, path in enumerate(paths):
+            with open(path, "rb") as part:
+                shutil.copyfileobj(part, out, 16 * 1024 * 1024)
+            os.remove(path)
+            if args.gzip_threads:
+                # Part indexes shifted to the part's place in the joined file
+                members += [(offset + o, size, bounds[k] + first_row, rows)
+                            for o, size, first_row, rows in read_index(path)]
+                os.remove(index_path(path))
+                offset = out.tell()
+    if args.gzip_threads:
+        write_index(out_path, members)
+    return [out_path]
+
+
+def main():
+    args = parse_args()
+
+    out_path = args.out
+    if out_path is None:
+        out_path = "sales_2M.csv" if args.spec is None else f"{load_config(args)['name']}.csv"
+    if args.format != "csv" and out_path.endswith(".csv"):
+        out_path = out_path[: -len(".csv")] + FORMATS[args.format]
+    # Optional: gzipped output
+    if args.gzip and not out_path.endswith(".gz"):
+        out_path += ".gz"
+
+    if args.shards > 1:
+        paths = generate_shards(args, out_path)
+        print(f"✅ Done: {', '.join(paths) if len(paths) <= 4 else f'{len(paths)} part files'} ({args.rows:,} rows)")
+        return
+
+    if args.block_size > 0:
+        write_blocks(out_path, args)
+    else:
+        opener = gzip.open if out_path.endswith(".gz") else open
+        with opener(out_path, "wt", newline="", encoding="utf-8") as f:
+            generate_rows(f, args, load_config(args))
 
     print(f"✅ Done: {out_path} ({args.rows:,} rows)")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,221 @@
+"""Tests for generate_sales_csv.py: output independent of workers and block size, formats, specs."""
+
+import csv
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import generate_sales_csv
+from generate_sales_csv import part_path
+
+pytest.importorskip("numpy")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "generate_sales_csv.py")
+ROWS = 20_000
+SHARDS = 4
+
+
+def generate(directory, name, *options):
+    subprocess.run(
+        [sys.executable, SCRIPT, "--rows", str(ROWS), "--seed", "7", "--out", name, *options],
+        cwd=directory, check=True, capture_output=True,
+    )
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_block_size_does_not_change_output(tmp_path):
+    # 20k rows: a partial last block with 3000, three full blocks and a partial one with 7000
+    generate(tmp_path, "a.csv", "--block-size", "3000")
+    generate(tmp_path, "b.csv", "--block-size", "7000")
+    generate(tmp_path, "c.csv", "--block-size", str(ROWS))
+    assert read_bytes(tmp_path / "a.csv") == read_bytes(tmp_path / "b.csv") == read_bytes(tmp_path / "c.csv")
+
+
+def test_block_mode_schema(tmp_path):
+    generate(tmp_path, "a.csv", "--block-size", "5000")
+    generate(tmp_path, "rows.csv")
+    with open(tmp_path / "a.csv", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    with open(tmp_path / "rows.csv", encoding="utf-8") as f:
+        header = f.readline().rstrip("\n")
+    # Same header as the row-by-row mode, one line per row, ids in order
+    assert lines[0] == header
+    assert len(lines) == ROWS + 1
+    assert [line.split(",", 1)[0] for line in lines[1:3]] == ["ORD-0000000", "ORD-0000001"]
+
+
+@pytest.mark.parametrize("out, shard, expected", [
+    ("sales.csv", 3, "sales.part-00003.csv"),
+    ("sales.csv.gz", 0, "sales.part-00000.csv.gz"),
+    ("data/sales_100M.parquet", 12, os.path.join("data", "sales_100M.part-00012.parquet")),
+    ("sales", 1, "sales.part-00001"),
+    ("sales.gz", 1, "sales.part-00001.gz"),
+    # Only the file name's extension counts, never a directory name
+    ("out.csv.d/sales", 2, os.path.join("out.csv.d", "sales.part-00002")),
+    (".csv", 0, ".csv.part-00000"),
+])
+def test_part_path(out, shard, expected):
+    assert part_path(out, shard) == expected
+
+
+def test_shards_independent_of_workers_and_block_size(tmp_path):
+    generate(tmp_path, "a.csv", "--shards", str(SHARDS), "--workers", "1", "--block-size", "3000")
+    generate(tmp_path, "b.csv", "--shards", str(SHARDS), "--workers", str(SHARDS), "--block-size", "7000")
+    for shard in range(SHARDS):
+        assert read_bytes(tmp_path / part_path("a.csv", shard)) == read_bytes(tmp_path / part_path("b.csv", shard))
+
+
+def test_concat_header_once(tmp_path):
+    generate(tmp_path, "a.csv", "--shards", str(SHARDS), "--workers", "2", "--concat")
+    with open(tmp_path / "a.csv", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == ROWS + 1
+    assert sum(line.startswith("order_id,") for line in lines) == 1
+    ids = [line.split(",", 1)[0] for line in lines[1:]]
+    assert ids == sorted(ids) and len(set(ids)) == ROWS
+
+
+def test_parquet_shards_independent_of_workers(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    generate(tmp_path, "a.parquet", "--format", "parquet", "--shards", "2", "--workers", "1")
+    generate(tmp_path, "b.parquet", "--format", "parquet", "--shards", "2", "--workers", "2")
+    for shard in range(2):
+        a = pq.read_table(tmp_path / part_path("a.parquet", shard))
+        b = pq.read_table(tmp_path / part_path("b.parquet", shard))
+        assert a.equals(b)
+
+
+def test_parquet_typed_and_same_rows_as_csv(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    pa = pytest.importorskip("pyarrow")
+    generate(tmp_path, "a.parquet", "--format", "parquet", "--block-size", "7000", "--row-group-size", "3000")
+    generate(tmp_path, "a.csv", "--block-size", "7000")
+    table = pq.read_table(tmp_path / "a.parquet")
+    assert table.schema.field("order_date").type == pa.date32()
+    assert table.schema.field("price").type == pa.float64()
+    assert table.schema.field("quantity").type == pa.int8()
+    assert pa.types.is_dictionary(table.schema.field("category").type)
+    # Row groups never straddle blocks: 3000 + 3000 + 1000 twice, then 3000 + 3000
+    assert pq.ParquetFile(tmp_path / "a.parquet").metadata.num_row_groups == 8
+    with open(tmp_path / "a.csv", encoding="utf-8") as f:
+        header, *lines = f.read().splitlines()
+    assert header.split(",") == table.column_names
+    for line, row in zip(lines, table.to_pylist()):
+        order_id, order_date, product, category, country, price, quantity, channel, payment = line.split(",")
+        assert (row["order_id"], row["order_date"].isoformat(), row["product"], row["category"]) == (
+            order_id, order_date, product, category)
+        assert (row["country"], row["channel"], row["payment"]) == (country, channel, payment)
+        assert (row["price"], row["quantity"]) == (float(price), int(quantity))
+
+
+def test_arrow_same_table_as_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ipc = pytest.importorskip("pyarrow.ipc")
+    generate(tmp_path, "a.parquet", "--format", "parquet")
+    generate(tmp_path, "a.arrow", "--format", "arrow")
+    with ipc.open_file(tmp_path / "a.arrow") as reader:
+        assert reader.read_all().equals(pq.read_table(tmp_path / "a.parquet"))
+
+
+def draw(columns, rows=100_000, seed=0):
+    spec = generate_sales_csv.Spec({"name": "t", "columns": columns})
+    drawn, _ = generate_sales_csv.draw_block(spec, generate_sales_csv.np.random.default_rng(seed), 0, rows)
+    return spec, drawn
+
+
+def shares(spec, drawn, name):
+    column = spec.columns[name]
+    counts = {value: 0 for value in column.values}
+    for code in drawn[name].tolist():
+        counts[column.values[code]] += 1
+    return {value: count / len(drawn[name]) for value, count in counts.items()}
+
+
+@pytest.mark.parametrize("sampler", ["bisect", "alias"])
+def test_categorical_weights_are_relative(sampler):
+    spec, drawn = draw([
+        {"name": "a", "type": "categorical", "weights": {"x": 3, "y": 1}, "sampler": sampler},
+        {"name": "b", "type": "categorical", "values": ["x", "y", "z"], "weights": [2, 0, 2], "sampler": sampler},
+    ])
+    assert shares(spec, drawn, "a") == pytest.approx({"x": 0.75, "y": 0.25}, abs=0.01)
+    assert shares(spec, drawn, "b") == pytest.approx({"x": 0.5, "y": 0.0, "z": 0.5}, abs=0.01)
+
+
+@pytest.mark.parametrize("sampler", ["bisect", "alias"])
+def test_categorical_weights_by_parent(sampler):
+    spec, drawn = draw([
+        {"name": "segment", "type": "categorical", "weights": {"pro": 1, "perso": 3}},
+        {"name": "channel", "type": "categorical", "by": "segment", "sampler": sampler,
+         "weights": {"pro": {"web": 1}, "perso": {"web": 2, "shop": 6}}},
+    ])
+    channel = spec.columns["channel"]
+    segment = drawn["segment"] == spec.columns["segment"].values.index("pro")
+    web = drawn["channel"] == channel.values.index("web")
+    assert web[segment].all()
+    assert web[~segment].mean() == pytest.approx(0.25, abs=0.01)
+
+
+def test_categorical_weights_must_have_a_positive_total():
+    with pytest.raises(ValueError, match="a: weights must have a positive total"):
+        draw([{"name": "a", "type": "categorical", "weights": {"x": 0, "y": 0}}])
+    # A parent value with no mapping has nothing to draw from
+    with pytest.raises(ValueError, match="b: weights for a='y'"):
+        draw([
+            {"name": "a", "type": "categorical", "values": ["x", "y"]},
+            {"name": "b", "type": "categorical", "by": "a", "weights": {"x": {"p": 1}}},
+        ])
+
+
+@pytest.mark.parametrize("spec", sorted(os.listdir(os.path.join(HERE, "dataset_specs"))))
+def test_shipped_specs(tmp_path, spec):
+    path = os.path.join(HERE, "dataset_specs", spec)
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    subprocess.run(
+        [sys.executable, SCRIPT, "--rows", "2000", "--spec", path, "--out", "a.csv", "--block-size", "700"],
+        cwd=tmp_path, check=True, capture_output=True,
+    )
+    with open(tmp_path / "a.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == config.get("output", [column["name"] for column in config["columns"]])
+    assert len(rows) == 2001 and all(len(row) == len(rows[0]) for row in rows)
+
+
+def test_parallel_gzip_same_content(tmp_path):
+    generate(tmp_path, "a.csv", "--block-size", "5000", "--gzip")
+    generate(tmp_path, "b.csv", "--block-size", "5000", "--gzip", "--gzip-threads", "3")
+    with gzip.open(tmp_path / "a.csv.gz", "rb") as a, gzip.open(tmp_path / "b.csv.gz", "rb") as b:
+        assert a.read() == b.read()
+    # One index entry per independently compressed member
+    members = generate_sales_csv.read_index(str(tmp_path / "b.csv.gz"))
+    assert sum(member[3] for member in members) == ROWS
+
+
+def test_gzip_members_readable_alone(tmp_path):
+    generate(tmp_path, "a.csv", "--block-size", "5000")
+    generate(tmp_path, "b.csv", "--block-size", "5000", "--gzip", "--gzip-threads", "3")
+    data = read_bytes(tmp_path / "b.csv.gz")
+    with gzip.open(tmp_path / "b.csv.gz", "rb") as f:
+        assert f.read() == read_bytes(tmp_path / "a.csv")
+    members = generate_sales_csv.read_index(str(tmp_path / "b.csv.gz"))
+    # Members are contiguous and cover the whole file and every row
+    assert members[0][:3] == (0, members[0][1], 0)
+    assert sum(member[1] for member in members) == len(data)
+    for (offset, size, first_row, rows), following in zip(members, members[1:] + [None]):
+        if following:
+            assert following[0] == offset + size and following[2] == first_row + rows
+        # Seek to a member and decompress it on its own: its rows start at first_row
+        lines = gzip.decompress(data[offset:offset + size]).decode("utf-8").splitlines()
+        if first_row == 0:
+            lines = lines[1:]
+        assert len(lines) == rows
+        assert lines[0].startswith(f"ORD-{first_row:07d},")